@@ -62,6 +62,9 @@ def create_app(config_name: str = None) -> Flask:
     # Configura error handlers
     _register_error_handlers(app)
     
+    # Carrega o catálogo de títulos antes das primeiras buscas
+    _warm_up_title_catalog()
+    
     return app
 
 
@@ -82,6 +85,15 @@ def _init_extensions(app: Flask) -> None:
     cache.init_app(app, config={'CACHE_TYPE': 'SimpleCache'})
 
 
+def _warm_up_title_catalog() -> None:
+    """Carrega o índice do catálogo offline de títulos em segundo plano."""
+    from services.title_catalog import get_title_catalog
+    
+    catalog = get_title_catalog()
+    if catalog:
+        catalog.warm_up()
+
+
 def _setup_google_credentials() -> None:
     """Configura as credenciais do Google Cloud."""
     credentials_json = os.getenv('GOOGLE_CREDENTIALS_JSON')
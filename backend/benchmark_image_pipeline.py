@@ -0,0 +1,105 @@
+"""
+Benchmark da preparação das imagens para o modelo de visão.
+
+Compara a codificação antiga de `AIService._encode_image` (PNG em resolução
+total) com o pré-processador (redução para IMAGE_MAX_EDGE, JPEG/WebP sem
+metadados), em bytes e milissegundos, e mede o custo de um reenvio da
+mesma imagem (acerto do cache por hash).
+
+Uso:
+    python benchmark_image_pipeline.py
+    python benchmark_image_pipeline.py --repeat 10 --max-edge 768 --quality 80
+"""
+import argparse
+import base64
+import random
+import timeit
+from io import BytesIO
+from typing import Dict
+
+from PIL import Image, ImageDraw, ImageFilter
+
+from core.constants import IMAGE_MAX_EDGE, IMAGE_QUALITY
+from services.image_preprocessor import ImagePreprocessor
+
+
+def legacy_encode_image(raw: bytes) -> str:
+    """Cópia da implementação anterior de AIService._encode_image."""
+    image = Image.open(BytesIO(raw))
+    buffered = BytesIO()
+    image.save(buffered, format="PNG")
+    return base64.b64encode(buffered.getvalue()).decode('utf-8')
+
+
+def _scene(size, seed: int = 42) -> Image.Image:
+    """Imagem com formas e ruído, parecida com um print ou foto de uma cena."""
+    rng = random.Random(seed)
+    image = Image.new("RGB", size, (20, 24, 40))
+    draw = ImageDraw.Draw(image)
+    for _ in range(200):
+        x, y = rng.randrange(size[0]), rng.randrange(size[1])
+        w, h = rng.randrange(20, size[0] // 4), rng.randrange(20, size[1] // 4)
+        color = tuple(rng.randrange(256) for _ in range(3))
+        draw.ellipse((x, y, x + w, y + h), fill=color)
+    return image.filter(ImageFilter.GaussianBlur(2))
+
+
+def _encoded(image: Image.Image, image_format: str, **params) -> bytes:
+    buffered = BytesIO()
+    image.save(buffered, format=image_format, **params)
+    return buffered.getvalue()
+
+
+def build_cases() -> Dict[str, bytes]:
+    """Uploads de exemplo: fotos de celular, prints e imagens já pequenas."""
+    exif = Image.Exif()
+    exif[0x010F] = "Câmera"
+    exif[0x0110] = "Modelo 12 Pro"
+    return {
+        'foto 4032x3024 (JPEG)': _encoded(_scene((4032, 3024)), "JPEG", quality=92, exif=exif),
+        'print 2560x1440 (PNG)': _encoded(_scene((2560, 1440), seed=7), "PNG"),
+        'pôster 1000x1500 (JPEG)': _encoded(_scene((1000, 1500), seed=3), "JPEG", quality=90),
+        'miniatura 400x300 (PNG)': _encoded(_scene((400, 300), seed=1), "PNG"),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark da preparação de imagens para o modelo de visão')
+    parser.add_argument('--repeat', type=int, default=5, help='Execuções por caso')
+    parser.add_argument('--max-edge', type=int, default=IMAGE_MAX_EDGE, help='Lado máximo, em pixels')
+    parser.add_argument('--quality', type=int, default=IMAGE_QUALITY, help='Qualidade da compressão')
+    args = parser.parse_args()
+
+    formats = ('JPEG', 'WEBP')
+    print(
+        f"{'caso':<26}{'original':>10}{'PNG antigo':>22}"
+        + ''.join(f"{name:>22}" for name in formats)
+        + f"{'reenvio':>12}"
+    )
+    for case, raw in build_cases().items():
+        legacy_bytes = len(base64.b64decode(legacy_encode_image(raw)))
+        legacy_ms = timeit.timeit(lambda: legacy_encode_image(raw), number=args.repeat) / args.repeat * 1000
+        row = f"{case:<26}{_kb(len(raw)):>10}{_kb(legacy_bytes) + f' {legacy_ms:7.1f} ms':>22}"
+
+        for image_format in formats:
+            # Cache de uma entrada vazio a cada execução: mede o processamento real
+            def prepare():
+                return ImagePreprocessor(args.max_edge, image_format, args.quality, cache_max_entries=1).prepare(raw)
+            size = len(prepare().data)
+            ms = timeit.timeit(prepare, number=args.repeat) / args.repeat * 1000
+            row += f"{_kb(size) + f' {ms:7.1f} ms':>22}"
+
+        cached = ImagePreprocessor(args.max_edge, 'JPEG', args.quality)
+        cached.prepare(raw)
+        hit_ms = timeit.timeit(lambda: cached.prepare(raw), number=args.repeat) / args.repeat * 1000
+        row += f"{hit_ms:>9.2f} ms"
+        print(row)
+    print(f"\nlado máximo {args.max_edge}px, qualidade {args.quality}; reenvio = acerto do cache por hash (JPEG)")
+
+
+def _kb(size: int) -> str:
+    return f"{size / 1024:.0f} KB"
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+"""
+Benchmark da extração de JSON das respostas da IA.
+
+Compara a implementação antiga de `clean_json_response` (que ainda exigia
+um segundo `json.loads` no ChatService) com o extrator de passada única,
+em respostas grandes, com markdown em volta e malformadas.
+
+Uso:
+    python benchmark_json_extractor.py
+    python benchmark_json_extractor.py --repeat 50
+"""
+import argparse
+import json
+import timeit
+from typing import Any, Dict, Optional
+
+from utils.json_extractor import JSONExtractor, extract_json
+
+
+def legacy_clean_json_response(text: str) -> Optional[str]:
+    """Cópia da implementação anterior de AIService.clean_json_response."""
+    if "```json" in text:
+        text = text.split("```json")[1].strip()
+    if "```" in text:
+        text = text.split("```")[0].strip()
+
+    try:
+        match_start = text.find('{')
+        if match_start == -1:
+            return None
+
+        open_braces = 0
+        last_brace_index = -1
+        for i in range(match_start, len(text)):
+            if text[i] == '{':
+                open_braces += 1
+            elif text[i] == '}':
+                open_braces -= 1
+                if open_braces == 0:
+                    last_brace_index = i
+                    break
+
+        if last_brace_index != -1:
+            potential_json = text[match_start:last_brace_index+1]
+            json.loads(potential_json)
+            return potential_json
+    except (json.JSONDecodeError, IndexError):
+        return None
+
+    return None
+
+
+def legacy_parse(text: str) -> Optional[Dict[str, Any]]:
+    """Fluxo antigo completo: limpa, valida e decodifica de novo no ChatService."""
+    json_str = legacy_clean_json_response(text)
+    return json.loads(json_str) if json_str else None
+
+
+def streamed_parse(text: str, chunk_size: int = 16) -> Optional[Dict[str, Any]]:
+    """Extrator alimentado em pedaços, como no streaming da IA."""
+    extractor = JSONExtractor()
+    for i in range(0, len(text), chunk_size):
+        if extractor.feed(text[i:i + chunk_size]) is not None:
+            break
+    return extractor.result
+
+
+def build_cases() -> Dict[str, str]:
+    """Respostas de exemplo, das típicas às patológicas."""
+    movie = json.dumps({"type": "movie", "content": {"title": "Matrix", "year": "1999"}})
+    long_text = json.dumps({"type": "text", "content": "Um filme muito bom. " * 5000})
+    recommendations = json.dumps({
+        "type": "recommendations",
+        "content": [
+            {"title": f"Filme {i}", "year": str(1950 + i % 70), "reason": "Tem {chaves} na explicação"}
+            for i in range(500)
+        ]
+    })
+    return {
+        'pequena': movie,
+        'markdown': f"Claro! Aqui está:\n```json\n{movie}\n```\nEspero ter ajudado.",
+        'texto grande': long_text,
+        'recomendações grandes': recommendations,
+        'chaves em strings': json.dumps({"type": "text", "content": "use } e { à vontade"}),
+        'prosa + malformado': "Resposta: {type: movie} " * 2000 + movie,
+        'truncada': long_text[: len(long_text) // 2],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark da extração de JSON das respostas da IA')
+    parser.add_argument('--repeat', type=int, default=20, help='Execuções por caso')
+    args = parser.parse_args()
+
+    implementations = {
+        'antiga': legacy_parse,
+        'passada única': extract_json,
+        'streaming': streamed_parse,
+    }
+
+    print(f"{'caso':<24}{'bytes':>9}" + ''.join(f"{name:>16}" for name in implementations))
+    for case, text in build_cases().items():
+        row = f"{case:<24}{len(text):>9}"
+        for function in implementations.values():
+            try:
+                ok = function(text) is not None
+            except json.JSONDecodeError:
+                ok = False
+            seconds = timeit.timeit(lambda: _safe(function, text), number=args.repeat) / args.repeat
+            row += f"{seconds * 1000:>11.3f} ms{'' if ok else ' ✗':<3}"
+        print(row)
+    print("\n✗ = nenhum objeto extraído")
+
+
+def _safe(function, text):
+    try:
+        return function(text)
+    except json.JSONDecodeError:
+        return None
+
+
+if __name__ == '__main__':
+    main()
@@ -1,12 +1,16 @@
 """
 Controller para operações de chat API REST.
 """
-from flask import Blueprint, request, jsonify
+import json
+from typing import Any, List, Tuple
+
+from flask import Blueprint, Response, request, jsonify, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt_identity
 
 from services.chat_service import ChatService
 from services.movie_service import MovieService
 from dto.chat_dto import ChatRequestDTO
+from core.constants import TMDB_BATCH_MAX_IDS
 from core.exceptions import ChatCineException, ValidationError, NotFoundError
 from extensions import limiter, cache
 
@@ -51,13 +55,69 @@ def chat():
         }), 500
 
 
+def _sse(event: str, data: Any) -> str:
+    """Formata um evento Server-Sent Events."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@chat_bp.route('/chat/stream', methods=['POST'])
+# @jwt_required()  # Desabilitado temporariamente para testes
+@limiter.limit("10 per minute")
+def chat_stream():
+    """
+    Processa mensagem do chat respondendo via Server-Sent Events.
+    
+    Eventos: 'delta' (trecho de resposta em texto), 'status' (progresso),
+    'final' (resposta completa, igual à de /chat) e 'error'.
+    """
+    try:
+        # current_user_id = get_jwt_identity()  # Desabilitado para testes
+        current_user_id = 1  # ID fixo para testes
+        
+        request_dto = ChatRequestDTO(
+            message=request.form.get("message", "").strip(),
+            file=request.files.get("file")
+        )
+        turn = chat_service.start_turn(request=request_dto, user_id=current_user_id)
+    except ValidationError as e:
+        return jsonify({"type": "error", "content": e.message}), e.status_code
+    except ChatCineException as e:
+        return jsonify({"type": "text", "content": e.message}), e.status_code
+    except Exception as e:
+        return jsonify({
+            "type": "text",
+            "content": "Desculpe, ocorreu um erro inesperado."
+        }), 500
+    
+    def generate():
+        try:
+            for event, data in chat_service.stream_turn(turn):
+                if event in ("delta", "status"):
+                    data = {"content": data}
+                yield _sse(event, data)
+        except Exception as e:
+            yield _sse("error", {
+                "type": "text",
+                "content": "Desculpe, ocorreu um erro inesperado."
+            })
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @chat_bp.route('/movie/<int:movie_id>', methods=['GET'])
 # @jwt_required()  # Desabilitado temporariamente para testes
-@cache.cached(timeout=3600)
+@cache.cached(timeout=3600, query_string=True)
 def get_movie_by_id(movie_id: int):
     """Busca filme por ID."""
     try:
-        movie = movie_service.get_movie_by_id(movie_id)
+        media_type = request.args.get("media_type", "movie")
+        if media_type not in ("movie", "tv"):
+            raise ValidationError("Tipo de mídia inválido.")
+        movie = movie_service.get_movie_by_id(movie_id, media_type)
         if movie:
             return jsonify({"type": "movie", "content": movie.to_dict()}), 200
         raise NotFoundError("Não consegui encontrar detalhes sobre este filme.")
@@ -70,6 +130,51 @@ def get_movie_by_id(movie_id: int):
         }), 500
 
 
+def _parse_movie_ids(raw_ids: str, default_media_type: str) -> List[Tuple[int, str]]:
+    """
+    Converte o parâmetro `ids` em pares (movie_id, media_type).
+    
+    Aceita IDs separados por vírgula, com prefixo opcional de tipo
+    (ex: "603,550,tv:1399").
+    """
+    items = []
+    for token in filter(None, (part.strip() for part in raw_ids.split(","))):
+        media_type, _, movie_id = token.rpartition(":")
+        media_type = media_type or default_media_type
+        if media_type not in ("movie", "tv") or not movie_id.isdigit():
+            raise ValidationError(f"ID inválido: {token}")
+        items.append((int(movie_id), media_type))
+    
+    if not items:
+        raise ValidationError("Informe ao menos um ID.")
+    if len(items) > TMDB_BATCH_MAX_IDS:
+        raise ValidationError(f"Informe no máximo {TMDB_BATCH_MAX_IDS} IDs por requisição.")
+    return items
+
+
+@chat_bp.route('/movies', methods=['GET'])
+# @jwt_required()  # Desabilitado temporariamente para testes
+def get_movies_by_ids():
+    """Busca vários filmes por ID (ex: /movies?ids=603,550,tv:1399)."""
+    try:
+        items = _parse_movie_ids(
+            request.args.get("ids", ""),
+            request.args.get("media_type", "movie")
+        )
+        results = movie_service.get_movies_by_ids(items)
+        return jsonify({
+            "type": "movies",
+            "content": [result.to_dict() for result in results]
+        }), 200
+    except ChatCineException as e:
+        return jsonify({"type": "text", "content": e.message}), e.status_code
+    except Exception as e:
+        return jsonify({
+            "type": "text",
+            "content": "Ocorreu um erro ao buscar informações dos filmes."
+        }), 500
+
+
 @chat_bp.route('/recommendations/<int:movie_id>', methods=['GET'])
 # @jwt_required()  # Desabilitado temporariamente para testes
 @cache.cached(timeout=3600)
@@ -88,3 +193,18 @@ def get_recommendations(movie_id: int):
             "type": "text",
             "content": "Ocorreu um erro ao buscar recomendações."
         }), 500
+
+
+@chat_bp.route('/stats/ai', methods=['GET'])
+def get_ai_stats():
+    """Retorna métricas do serviço de IA."""
+    stats = chat_service.ai_service.get_stats()
+    stats['summaries'] = chat_service.summary_service.stats()
+    stats['fast_path'] = chat_service.fast_path.stats()
+    return jsonify(stats), 200
+
+
+@chat_bp.route('/stats/tmdb', methods=['GET'])
+def get_tmdb_stats():
+    """Retorna métricas do cliente TMDB."""
+    return jsonify(movie_service.get_stats()), 200
@@ -3,10 +3,72 @@ Constantes da aplicação.
 """
 # Limites e configurações
 MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
-CHAT_HISTORY_LIMIT = 6
+CHAT_HISTORY_LIMIT = 20  # mensagens lidas do banco; o orçamento de tokens decide quantas vão ao prompt
+CHAT_PROMPT_TOKEN_BUDGET = 4000  # tokens de entrada por requisição (prompt do sistema + histórico + mensagem)
+
+# Resumo contínuo das sessões longas (CHAT_SUMMARY_ENABLED)
+CHAT_SUMMARY_EVERY_TURNS = 3  # turnos (pergunta + resposta) fora da janela recente que disparam um novo resumo
+CHAT_SUMMARY_RECENT_MESSAGES = 6  # mensagens mais recentes que nunca entram no resumo
+CHAT_SUMMARY_MAX_TOKENS = 300
 RATE_LIMIT_PER_MINUTE = 10
 CACHE_TIMEOUT_SECONDS = 3600  # 1 hora
 
+# Cliente HTTP do TMDB
+TMDB_POOL_SIZE = 10  # conexões mantidas por host
+TMDB_MAX_RETRIES = 2
+TMDB_RETRY_BACKOFF = 0.3  # segundos (backoff exponencial)
+TMDB_CONNECT_TIMEOUT = 3.05
+TMDB_READ_TIMEOUT = 10
+
+# Circuit breaker do TMDB
+TMDB_BREAKER_FAILURE_RATE = 0.5  # taxa de falhas que abre o circuito
+TMDB_BREAKER_MIN_CALLS = 5  # chamadas mínimas na janela antes de avaliar a taxa
+TMDB_BREAKER_WINDOW_SIZE = 20
+TMDB_BREAKER_WINDOW_SECONDS = 60
+TMDB_BREAKER_OPEN_SECONDS = 15  # dobra a cada teste com falha
+TMDB_BREAKER_MAX_OPEN_SECONDS = 300
+
+# Cota de requisições ao TMDB compartilhada pelos workers do host (token bucket)
+TMDB_RATE_LIMIT_PER_SECOND = 35
+TMDB_RATE_LIMIT_BURST = 20
+TMDB_RATE_LIMIT_BACKGROUND_RESERVE = 5  # tokens que só o chat pode usar
+TMDB_RATE_LIMIT_MAX_WAIT = {  # espera máxima na fila (segundos)
+    'chat': 2.0,
+    'background': 10.0
+}
+
+# Hedge de requisições ao TMDB (opcional, TMDB_HEDGING_ENABLED)
+TMDB_HEDGE_PERCENTILE = 0.95  # dispara a cópia após o p95 da latência recente
+TMDB_HEDGE_MAX_RATE = 0.1  # no máximo 10% das chamadas recentes com hedge
+TMDB_HEDGE_MIN_SAMPLES = 20
+TMDB_HEDGE_MIN_DELAY = 0.05  # segundos
+
+# Cache persistente de respostas do TMDB (segundos)
+TMDB_CACHE_TTLS = {
+    'search': 6 * 3600,
+    'details': 24 * 3600,
+    'recommendations': 24 * 3600
+}
+TMDB_CACHE_STALE_SECONDS = 7 * 24 * 3600  # janela de stale-while-revalidate
+TMDB_CACHE_MAX_ENTRIES = 20000
+
+# Campos que o resultado de /search/multi não traz e ficam pendentes no modo rápido
+TMDB_SEARCH_PENDING_FIELDS = ['genres', 'imdb_id']
+
+# Cache negativo de títulos que o TMDB não resolve
+TMDB_NEGATIVE_CACHE_TTL = 600  # 10 minutos
+TMDB_NEGATIVE_CACHE_MAX_ENTRIES = 2000
+
+# Busca de detalhes em lote (GET /api/movies?ids=...)
+TMDB_BATCH_MAX_IDS = 50
+
+# Catálogo offline de títulos (exportações diárias de IDs do TMDB)
+TMDB_EXPORTS_URL = "http://files.tmdb.org/p/exports"
+TMDB_CATALOG_MIN_POPULARITY = 1.0  # títulos menos populares ficam fora do índice em memória
+TMDB_CATALOG_MIN_SCORE = 0.75  # similaridade mínima (Dice de trigramas) para aceitar um título
+TMDB_CATALOG_MAX_POSTINGS = 5000  # trigramas mais comuns que isso não entram na busca aproximada
+TMDB_CATALOG_MAX_CANDIDATES = 50  # candidatos com a similaridade calculada por inteiro
+
 # Tipos MIME permitidos
 ALLOWED_IMAGE_TYPES = [
     'image/jpeg',
@@ -32,11 +94,66 @@ ALLOWED_FILE_TYPES = ALLOWED_IMAGE_TYPES + ALLOWED_VIDEO_TYPES + ALLOWED_AUDIO_T
 # Tipos de resposta da IA
 AI_RESPONSE_TYPES = ['movie', 'recommendations', 'text']
 
+# Modelo do Groq
+GROQ_MODEL = "llama-3.3-70b-versatile"
+GROQ_SMALL_MODEL = "llama-3.1-8b-instant"  # turnos fáceis (AI_MODEL_TIERING_ENABLED)
+GROQ_VISION_MODEL = "meta-llama/llama-4-scout-17b-16e-instruct"  # turnos com imagem
+
+# Imagens enviadas ao modelo de visão
+IMAGE_MAX_EDGE = 1024  # pixels no lado maior
+IMAGE_FORMAT = 'JPEG'  # ou 'WEBP'
+IMAGE_QUALITY = 85
+IMAGE_CACHE_MAX_ENTRIES = 64  # imagens preparadas em memória, por hash do conteúdo
+IMAGE_PROMPT_TOKENS = 1000  # estimativa de tokens de uma imagem no orçamento do prompt
+IMAGE_PREP_TIMEOUT = 10.0  # segundos esperando a preparação da imagem
+
+# Provedores de IA (AI_PROVIDERS) e failover entre eles
+AI_REQUEST_TIME_BUDGET = 30.0  # segundos para todas as tentativas de uma requisição
+AI_PROVIDER_MIN_ATTEMPT_SECONDS = 1.0  # tempo mínimo restante para tentar o próximo provedor
+AI_PROVIDER_BREAKER_FAILURE_RATE = 0.5
+AI_PROVIDER_BREAKER_MIN_CALLS = 5
+AI_PROVIDER_BREAKER_OPEN_SECONDS = 30
+
+# Reparo de respostas da IA fora do formato JSON
+JSON_REPAIR_MAX_REASKS = 1  # novos pedidos à IA por turno, depois do conserto local
+
+# Roteamento entre os modelos
+MODEL_TIER_WINDOW_SIZE = 100  # chamadas recentes consideradas por modelo
+MODEL_TIER_MIN_SAMPLES = 10  # latências de cada modelo antes de compará-las
+MODEL_TIER_MAX_ERROR_RATE = 0.3  # acima disso o modelo pequeno deixa de ser usado
+
+# Cache de respostas da IA (só respostas validadas)
+COMPLETION_CACHE_TTL = 24 * 3600  # 1 dia
+COMPLETION_CACHE_MAX_ENTRIES = 5000
+
+# Cache semântico de perguntas de um só turno (identificação e recomendações)
+SEMANTIC_CACHE_DIMENSIONS = 1024
+SEMANTIC_CACHE_THRESHOLD = 0.9  # similaridade de cosseno mínima para reaproveitar a resposta
+SEMANTIC_CACHE_MAX_ENTRIES = 5000
+SEMANTIC_CACHE_AUDIT_RATE = 0.05  # fração dos acertos conferida com a IA (falsos positivos)
+
 # Roles de mensagem
 MESSAGE_ROLE_USER = 'user'
 MESSAGE_ROLE_ASSISTANT = 'assistant'
 
 # Prompt do sistema para IA (Groq)
+SUMMARY_PROMPT = """
+You maintain a running summary of a conversation between a user and ChatCine, a movie assistant.
+You receive the previous summary (if any) and the messages that happened after it.
+Write the updated summary in the language of the conversation, in at most 120 words of plain text (no JSON, no lists).
+Keep what matters to continue the conversation: movies and series already identified or recommended (with year),
+the user's tastes and restrictions, and any open question. Drop greetings and repeated details.
+"""
+
+JSON_REPAIR_PROMPT = """
+Your previous reply could not be used: {error}.
+Rewrite it as a single valid JSON object that follows the response structure above, keeping the same meaning.
+Reply with the JSON object only.
+
+Previous reply:
+{reply}
+"""
+
 SYSTEM_PROMPT = """
 # GUIDELINES FOR ChatCine - CINEMA ASSISTANT
 
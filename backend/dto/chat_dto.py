@@ -10,19 +10,21 @@ class ChatMessageDTO:
     """DTO para mensagem de chat."""
     role: str
     content: str | Dict[str, Any]
+    token_count: Optional[int] = None
     
     @classmethod
     def from_model(cls, message) -> 'ChatMessageDTO':
         """Cria DTO a partir do modelo."""
         import json
         content = json.loads(message.content) if message.role == 'assistant' else message.content
-        return cls(role=message.role, content=content)
+        return cls(role=message.role, content=content, token_count=message.token_count)
     
     def to_dict(self) -> dict:
         """Converte para dicionário."""
         return {
             'role': self.role,
-            'content': self.content
+            'content': self.content,
+            'token_count': self.token_count
         }
 
 
@@ -51,3 +53,14 @@ class ChatRequestDTO:
         """Verifica se há conteúdo na requisição."""
         return bool(self.message or self.file)
 
+
+
+@dataclass
+class ChatTurnDTO:
+    """DTO com o contexto de um turno de chat já iniciado."""
+    session: Any
+    new_session_id: Optional[int]
+    user_message: str
+    image_file: Optional[Any]
+    history: List[Dict[str, Any]]
+    fast_path: Optional[Any] = None  # FastPathMatch do pré-classificador, se houver
@@ -2,7 +2,7 @@
 DTOs para operações com filmes.
 """
 from typing import Optional, List
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 
 @dataclass
@@ -17,6 +17,12 @@ class MovieDTO:
     overview: Optional[str] = None
     imdb_id: Optional[str] = None
     media_type: str = "movie"
+    # Campos ainda não preenchidos (ex: montado só com o resultado da busca)
+    pending_fields: List[str] = field(default_factory=list)
+    
+    def is_complete(self) -> bool:
+        """Verifica se todos os campos já foram preenchidos."""
+        return not self.pending_fields
     
     def to_dict(self) -> dict:
         """Converte para dicionário."""
@@ -29,7 +35,26 @@ class MovieDTO:
             'rating': self.rating,
             'overview': self.overview,
             'imdb_id': self.imdb_id,
-            'media_type': self.media_type
+            'media_type': self.media_type,
+            'pending_fields': list(self.pending_fields)
+        }
+
+
+@dataclass
+class MovieLookupDTO:
+    """DTO para o resultado de um item da busca de detalhes em lote."""
+    id: int
+    media_type: str = "movie"
+    movie: Optional[MovieDTO] = None
+    error: Optional[str] = None
+    
+    def to_dict(self) -> dict:
+        """Converte para dicionário."""
+        return {
+            'id': self.id,
+            'media_type': self.media_type,
+            'content': self.movie.to_dict() if self.movie else None,
+            'error': self.error
         }
 
 
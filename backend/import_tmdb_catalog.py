@@ -0,0 +1,81 @@
+"""
+Script para importar o catálogo offline de títulos do TMDB.
+
+Baixa (ou lê de arquivos locais) as exportações diárias de IDs de filmes
+e séries e carrega tudo no catálogo usado pelo MovieService para resolver
+títulos sem chamar a busca do TMDB.
+
+Uso:
+    python import_tmdb_catalog.py                    # exportação de ontem
+    python import_tmdb_catalog.py --date 2024-05-15
+    python import_tmdb_catalog.py --movies movie_ids.json.gz --tv tv_series_ids.json.gz
+"""
+import argparse
+import os
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import requests
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from core.constants import TMDB_EXPORTS_URL
+from services.title_catalog import TitleCatalog, DEFAULT_CATALOG_PATH
+
+# Nome dos arquivos de exportação por tipo de mídia
+EXPORT_FILES = {
+    'movie': 'movie_ids_{date}.json.gz',
+    'tv': 'tv_series_ids_{date}.json.gz'
+}
+
+
+def download_export(media_type: str, date: datetime, target_dir: Path) -> Path:
+    """Baixa um arquivo de exportação do TMDB."""
+    filename = EXPORT_FILES[media_type].format(date=date.strftime('%m_%d_%Y'))
+    target = target_dir / filename
+    if target.exists():
+        print(f"✅ {filename} já baixado")
+        return target
+    
+    print(f"⬇️  Baixando {filename}...")
+    with requests.get(f"{TMDB_EXPORTS_URL}/{filename}", stream=True, timeout=(5, 60)) as response:
+        response.raise_for_status()
+        with open(target, 'wb') as f:
+            for chunk in response.iter_content(chunk_size=1 << 20):
+                f.write(chunk)
+    return target
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Importa as exportações diárias de IDs do TMDB.")
+    parser.add_argument('--date', help="Data da exportação (AAAA-MM-DD). Padrão: ontem (UTC)")
+    parser.add_argument('--movies', help="Arquivo local de exportação de filmes")
+    parser.add_argument('--tv', help="Arquivo local de exportação de séries")
+    parser.add_argument(
+        '--catalog',
+        default=os.getenv("TMDB_CATALOG_PATH", str(DEFAULT_CATALOG_PATH)),
+        help="Caminho do catálogo SQLite"
+    )
+    args = parser.parse_args()
+    
+    if args.date:
+        date = datetime.strptime(args.date, '%Y-%m-%d')
+    else:
+        date = datetime.now(timezone.utc) - timedelta(days=1)
+    
+    download_dir = Path(args.catalog).parent / 'exports'
+    download_dir.mkdir(parents=True, exist_ok=True)
+    
+    catalog = TitleCatalog(args.catalog)
+    sources = {'movie': args.movies, 'tv': args.tv}
+    for media_type, local_path in sources.items():
+        path = Path(local_path) if local_path else download_export(media_type, date, download_dir)
+        imported = catalog.import_export(str(path), media_type)
+        print(f"📚 {imported} títulos importados de {path.name} ({media_type})")
+    
+    print(f"✅ Catálogo atualizado: {catalog.count()} títulos em {args.catalog}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,14 +1,26 @@
 """
 Script para inicializar o banco de dados.
 Cria as tabelas e pode popular com dados iniciais.
+
+Uso:
+    python init_db.py            # apaga e recria todas as tabelas
+    python init_db.py --upgrade  # mantém os dados e só acrescenta as colunas novas
 """
+import sys
+
 from app import create_app
 from extensions import db
-from models import User, ChatSession, ChatMessage
+from models import User, ChatSession, ChatMessage, add_missing_columns
 
 app = create_app()
 
 with app.app_context():
+    if '--upgrade' in sys.argv:
+        # Bancos criados antes das colunas novas dos modelos
+        added = add_missing_columns(db.engine)
+        print(f"✅ Colunas acrescentadas: {', '.join(added)}" if added else "✅ Banco de dados já está atualizado.")
+        sys.exit(0)
+    
     # Remove todas as tabelas e recria (para desenvolvimento)
     db.drop_all()
     # Cria todas as tabelas
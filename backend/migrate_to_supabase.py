@@ -11,7 +11,7 @@ sys.path.insert(0, str(Path(__file__).parent))
 
 from sqlalchemy import create_engine, MetaData
 from sqlalchemy.orm import sessionmaker
-from models import User, ChatSession, ChatMessage
+from models import User, ChatSession, ChatMessage, add_missing_columns
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -29,6 +29,10 @@ def migrate_data():
     
     sqlite_url = f'sqlite:///{sqlite_path}'
     sqlite_engine = create_engine(sqlite_url)
+    # Bancos antigos não têm as colunas novas dos modelos (e as consultas falhariam)
+    added = add_missing_columns(sqlite_engine)
+    if added:
+        print(f"🔧 Colunas acrescentadas ao SQLite: {', '.join(added)}")
     SqliteSession = sessionmaker(bind=sqlite_engine)
     sqlite_session = SqliteSession()
     
@@ -92,6 +96,8 @@ def migrate_data():
                 print(f"   ⚠️  Sessão {old_session.id} tem user_id inválido, pulando...")
                 continue
             
+            # O resumo não é copiado: summary_message_id aponta para IDs do SQLite,
+            # e a sessão ganha um novo resumo quando ficar longa
             new_session = ChatSession(
                 user_id=user_map.get(old_session.user_id) if old_session.user_id else None,
                 session_key=old_session.session_key
@@ -116,7 +122,8 @@ def migrate_data():
             new_message = ChatMessage(
                 session_id=session_map[old_message.session_id],
                 role=old_message.role,
-                content=old_message.content
+                content=old_message.content,
+                token_count=getattr(old_message, 'token_count', None)
             )
             supabase_session.add(new_message)
             migrated += 1
@@ -133,7 +140,7 @@ def migrate_data():
         print(f"   Usuários: {len(users)}")
         print(f"   Sessões: {len(sessions)}")
         print(f"   Mensagens: {migrated}")
-        
+    
     except Exception as e:
         print(f"❌ Erro durante migração: {e}")
         supabase_session.rollback()
@@ -20,10 +20,16 @@ CREATE TABLE IF NOT EXISTS chat_sessions (
     id SERIAL PRIMARY KEY,
     user_id INTEGER REFERENCES users(id) ON DELETE CASCADE,
     session_key VARCHAR(255) UNIQUE,
+    summary TEXT,
+    summary_message_id INTEGER,
     created_at TIMESTAMP WITH TIME ZONE DEFAULT TIMEZONE('utc', NOW()) NOT NULL,
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT TIMEZONE('utc', NOW()) NOT NULL
 );
 
+-- Bancos criados antes do resumo contínuo das conversas
+ALTER TABLE chat_sessions ADD COLUMN IF NOT EXISTS summary TEXT;
+ALTER TABLE chat_sessions ADD COLUMN IF NOT EXISTS summary_message_id INTEGER;
+
 -- Índices para chat_sessions
 CREATE INDEX IF NOT EXISTS idx_chat_sessions_user_id ON chat_sessions(user_id);
 CREATE INDEX IF NOT EXISTS idx_chat_sessions_session_key ON chat_sessions(session_key);
@@ -34,9 +40,20 @@ CREATE TABLE IF NOT EXISTS chat_messages (
     session_id INTEGER NOT NULL REFERENCES chat_sessions(id) ON DELETE CASCADE,
     role VARCHAR(20) NOT NULL,
     content TEXT NOT NULL,
+    token_count INTEGER,
     created_at TIMESTAMP WITH TIME ZONE DEFAULT TIMEZONE('utc', NOW()) NOT NULL
 );
 
+-- Bancos criados antes da coluna token_count (tokens estimados do texto que
+-- vai ao prompt, calculados na escrita): adiciona a coluna e preenche as
+-- mensagens antigas do usuário com a mesma estimativa do backend (4 + 1 token
+-- a cada 4 caracteres). As respostas do assistente vão ao prompt em JSON
+-- compacto (só título, ano e ID), que o SQL não reproduz: ficam nulas e o
+-- backend estima o texto compacto na leitura
+ALTER TABLE chat_messages ADD COLUMN IF NOT EXISTS token_count INTEGER;
+UPDATE chat_messages SET token_count = 4 + CEIL(LENGTH(content) / 4.0)
+WHERE token_count IS NULL AND role = 'user';
+
 -- Índices para chat_messages
 CREATE INDEX IF NOT EXISTS idx_chat_messages_session_id ON chat_messages(session_id);
 CREATE INDEX IF NOT EXISTS idx_chat_messages_created_at ON chat_messages(created_at);
@@ -112,6 +129,8 @@ CREATE POLICY "Users can create own messages" ON chat_messages
 COMMENT ON TABLE users IS 'Tabela de usuários do ChatCine';
 COMMENT ON TABLE chat_sessions IS 'Sessões de chat dos usuários';
 COMMENT ON TABLE chat_messages IS 'Mensagens trocadas no chat';
+COMMENT ON COLUMN chat_sessions.summary IS 'Resumo da conversa até summary_message_id, enviado à IA no lugar dessas mensagens';
+COMMENT ON COLUMN chat_messages.token_count IS 'Tokens estimados do conteúdo, usados no orçamento do prompt';
 
 -- Dados de exemplo (opcional - remova em produção)
 -- INSERT INTO users (email, password_hash, profile_pic_url) VALUES
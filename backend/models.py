@@ -3,7 +3,9 @@ Modelos de dados usando SQLAlchemy.
 Define a estrutura do banco de dados.
 """
 from datetime import datetime, timezone
+from typing import List
 from flask_login import UserMixin
+from sqlalchemy import inspect, text
 from werkzeug.security import generate_password_hash, check_password_hash
 from extensions import db
 
@@ -66,6 +68,8 @@ class ChatSession(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True, index=True)  # Nullable para sessões anônimas
     session_key = db.Column(db.String(255), nullable=True, unique=True, index=True)  # Chave única para sessões anônimas
+    summary = db.Column(db.Text, nullable=True)  # Resumo da conversa até summary_message_id (enviado à IA no lugar dessas mensagens)
+    summary_message_id = db.Column(db.Integer, nullable=True)  # Última mensagem coberta pelo resumo
     created_at = db.Column(db.DateTime, default=utcnow, nullable=False)
     updated_at = db.Column(db.DateTime, default=utcnow, onupdate=utcnow, nullable=False)
     
@@ -84,7 +88,40 @@ class ChatMessage(db.Model):
     session_id = db.Column(db.Integer, db.ForeignKey('chat_sessions.id'), nullable=False, index=True)
     role = db.Column(db.String(20), nullable=False)  # 'user' ou 'assistant'
     content = db.Column(db.Text, nullable=False)  # JSON string para mensagens da IA
+    token_count = db.Column(db.Integer, nullable=True)  # tokens estimados do content, calculados na escrita
     created_at = db.Column(db.DateTime, default=utcnow, nullable=False, index=True)
     
     def __repr__(self) -> str:
         return f'<ChatMessage {self.id} - {self.role}>'
+
+
+# Colunas acrescentadas aos modelos depois da criação das tabelas: (tabela, coluna, tipo SQL)
+ADDED_COLUMNS = [
+    ('chat_messages', 'token_count', 'INTEGER'),
+    ('chat_sessions', 'summary', 'TEXT'),
+    ('chat_sessions', 'summary_message_id', 'INTEGER'),
+]
+
+
+def add_missing_columns(engine) -> List[str]:
+    """
+    Acrescenta às tabelas existentes as colunas de ADDED_COLUMNS que faltam.
+    
+    Idempotente: bancos já atualizados não mudam. Colunas novas ficam nulas
+    (token_count nulo é estimado na leitura; sessões sem resumo ganham um
+    quando ficarem longas).
+    
+    Returns:
+        Colunas acrescentadas, como 'tabela.coluna'
+    """
+    inspector = inspect(engine)
+    added = []
+    with engine.begin() as connection:
+        for table, column, sql_type in ADDED_COLUMNS:
+            if not inspector.has_table(table):
+                continue
+            if column in {existing['name'] for existing in inspector.get_columns(table)}:
+                continue
+            connection.execute(text(f'ALTER TABLE {table} ADD COLUMN {column} {sql_type}'))
+            added.append(f'{table}.{column}')
+    return added
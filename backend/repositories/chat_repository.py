@@ -3,6 +3,8 @@ Repository para operações com chat.
 """
 from typing import List, Optional
 from models import ChatSession, ChatMessage
+from utils.history import history_text
+from utils.tokens import estimate_tokens
 from .base import BaseRepository
 
 
@@ -47,6 +49,10 @@ class ChatSessionRepository(BaseRepository[ChatSession]):
         """Busca sessão por ID."""
         return self.session.query(ChatSession).filter_by(id=session_id).first()
     
+    def update_summary(self, session: ChatSession, summary: str, message_id: int) -> ChatSession:
+        """Guarda o resumo da conversa até a mensagem `message_id`."""
+        return self.update(session, summary=summary, summary_message_id=message_id)
+    
     def get_user_sessions(self, user_id: int, limit: int = 10) -> List[ChatSession]:
         """Busca sessões de um usuário."""
         return self.session.query(ChatSession)\
@@ -62,11 +68,13 @@ class ChatMessageRepository(BaseRepository[ChatMessage]):
     def __init__(self):
         super().__init__(ChatMessage)
     
-    def get_session_history(self, session_id: int, limit: int = 6) -> List[ChatMessage]:
-        """Obtém histórico de mensagens de uma sessão."""
-        messages = self.session.query(ChatMessage)\
-            .filter_by(session_id=session_id)\
-            .order_by(ChatMessage.created_at.desc())\
+    def get_session_history(self, session_id: int, limit: int = 6, after_id: Optional[int] = None) -> List[ChatMessage]:
+        """Obtém histórico de mensagens de uma sessão (só as posteriores a `after_id`, se informado)."""
+        query = self.session.query(ChatMessage).filter_by(session_id=session_id)
+        if after_id:
+            query = query.filter(ChatMessage.id > after_id)
+        messages = query\
+            .order_by(ChatMessage.created_at.desc(), ChatMessage.id.desc())\
             .limit(limit)\
             .all()
         
@@ -74,11 +82,19 @@ class ChatMessageRepository(BaseRepository[ChatMessage]):
         messages.reverse()
         return messages
     
+    def get_messages_after(self, session_id: int, after_id: Optional[int] = None) -> List[ChatMessage]:
+        """Mensagens de uma sessão posteriores a `after_id`, em ordem cronológica."""
+        query = self.session.query(ChatMessage).filter_by(session_id=session_id)
+        if after_id:
+            query = query.filter(ChatMessage.id > after_id)
+        return query.order_by(ChatMessage.created_at, ChatMessage.id).all()
+    
     def create_message(self, session_id: int, role: str, content: str) -> ChatMessage:
-        """Cria uma nova mensagem."""
+        """Cria uma nova mensagem, já com a contagem de tokens da versão usada no prompt."""
         return self.create(
             session_id=session_id,
             role=role,
-            content=content
+            content=content,
+            token_count=estimate_tokens(history_text(role, content))
         )
 
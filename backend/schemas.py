@@ -1,18 +1,25 @@
 """
 Schemas Marshmallow para validação e serialização de dados JSON.
 """
-from marshmallow import Schema, fields, validate, ValidationError
+from marshmallow import EXCLUDE, Schema, fields, validate, ValidationError
 from typing import Any
 
 
 class MovieContentSchema(Schema):
     """Schema para conteúdo de filme identificado pela IA."""
+    class Meta:
+        # O histórico mostra à IA o ID do TMDB das respostas anteriores; se ela o repetir, é ignorado
+        unknown = EXCLUDE
+    
     title = fields.Str(required=True, validate=validate.Length(min=1, max=200))
     year = fields.Str(required=True, validate=validate.Length(min=4, max=4))
 
 
 class RecommendationItemSchema(Schema):
     """Schema para item de recomendação."""
+    class Meta:
+        unknown = EXCLUDE
+    
     title = fields.Str(required=True)
     year = fields.Str(required=True)
 
@@ -54,10 +61,10 @@ def validate_ai_response(data: dict[str, Any]) -> dict[str, Any]:
     
     Args:
         data: Dicionário com resposta da IA
-        
+    
     Returns:
         Dados validados
-        
+    
     Raises:
         ValidationError: Se os dados não são válidos
     """
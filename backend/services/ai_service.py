@@ -3,14 +3,30 @@ Serviço para integração com APIs de IA (Groq).
 """
 import os
 import json
-from typing import Optional, List, Dict, Any
-from groq import Groq
-from PIL import Image
-import base64
-from io import BytesIO
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, List, Dict, Any, Iterator
 
-from core.constants import SYSTEM_PROMPT
+from core.constants import (
+    SYSTEM_PROMPT, SUMMARY_PROMPT, JSON_REPAIR_PROMPT, JSON_REPAIR_MAX_REASKS, GROQ_MODEL, GROQ_SMALL_MODEL, CHAT_PROMPT_TOKEN_BUDGET,
+    CHAT_SUMMARY_MAX_TOKENS, IMAGE_PROMPT_TOKENS, IMAGE_PREP_TIMEOUT, MODEL_TIER_WINDOW_SIZE, MODEL_TIER_MIN_SAMPLES, MODEL_TIER_MAX_ERROR_RATE
+)
 from core.exceptions import ExternalAPIError
+from services.completion_cache import build_completion_cache
+from services.image_preprocessor import PendingImage, PreparedImage, build_image_preprocessor
+from services.llm_providers import build_provider_pool
+from services.model_router import ModelRouter, Route, TIER_LARGE, TIER_SMALL, TIER_VISION
+from services.prompt_budget import PromptBudget
+from services.response_repair import ResponseRepairer
+from services.semantic_cache import build_semantic_cache
+from schemas import validate_ai_response
+from utils.history import history_text
+from utils.json_extractor import JSONExtractor, extract_json
+from utils.text import normalize_title
+from utils.tokens import estimate_tokens
+
+# Executor das conferências de acertos do cache semântico
+_audit_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='semantic-audit')
 
 
 class AIService:
@@ -18,27 +34,135 @@ class AIService:
     
     def __init__(self):
         """Inicializa o serviço de IA."""
-        self.api_key = os.getenv("GROQ_API_KEY")
-        if self.api_key:
-            try:
-                self.client = Groq(api_key=self.api_key)
-            except Exception as e:
-                # Se houver erro na inicialização, permite continuar sem cliente
-                print(f"⚠️  Aviso: Erro ao inicializar Groq: {e}")
-                self.client = None
-        else:
-            self.client = None
+        # Provedores de IA (Groq, endpoints compatíveis com a OpenAI...) com failover
+        self.llm = build_provider_pool()
+        # Pede um objeto JSON aos provedores que têm modo JSON
+        self.json_mode = os.getenv("AI_JSON_MODE_ENABLED", "true").lower() == "true"
+        # Respostas fora do formato: conserto local e, no máximo, um novo pedido à IA
+        self.response_repair = ResponseRepairer(
+            reask=self._reask_json,
+            max_reasks=int(os.getenv("JSON_REPAIR_MAX_REASKS", JSON_REPAIR_MAX_REASKS))
+        )
+        
+        # Imagens reduzidas e recodificadas para o modelo de visão
+        self.images = build_image_preprocessor()
+        # Cache de respostas validadas para prompts repetidos
+        self.completion_cache = build_completion_cache()
+        # Cache semântico para perguntas de um só turno
+        self.semantic_cache = build_semantic_cache()
+        # Orçamento de tokens do prompt (o histórico ocupa o que sobrar)
+        self.prompt_budget = PromptBudget(int(os.getenv('CHAT_PROMPT_TOKEN_BUDGET', CHAT_PROMPT_TOKEN_BUDGET)))
+        self._system_prompt_tokens = estimate_tokens(SYSTEM_PROMPT)
+        # Turnos fáceis vão para um modelo menor e mais rápido
+        self.model_router = None
+        if os.getenv("AI_MODEL_TIERING_ENABLED", "true").lower() == "true":
+            self.model_router = ModelRouter(
+                small_model=os.getenv("GROQ_SMALL_MODEL", GROQ_SMALL_MODEL),
+                large_model=GROQ_MODEL,
+                window_size=MODEL_TIER_WINDOW_SIZE,
+                min_samples=MODEL_TIER_MIN_SAMPLES,
+                max_error_rate=MODEL_TIER_MAX_ERROR_RATE
+            )
     
     def is_configured(self) -> bool:
-        """Verifica se o serviço está configurado."""
-        return bool(self.api_key and self.client)
+        """Verifica se o serviço está configurado (algum provedor de IA disponível)."""
+        return bool(self.llm.providers)
     
-    def _encode_image(self, image_file) -> str:
-        """Codifica imagem em base64."""
-        image = Image.open(image_file.stream)
-        buffered = BytesIO()
-        image.save(buffered, format="PNG")
-        return base64.b64encode(buffered.getvalue()).decode('utf-8')
+    def _prepare_image(self, image_file) -> Optional[PreparedImage]:
+        """
+        Obtém a imagem pronta para o modelo de visão.
+        
+        Uploads vindos do ChatService já estão sendo preparados em segundo plano
+        (PendingImage); outros arquivos são preparados aqui.
+        
+        Returns:
+            PreparedImage ou None (vídeo, arquivo ilegível ou preparação demorada demais)
+        """
+        if isinstance(image_file, PendingImage):
+            try:
+                return image_file.result(IMAGE_PREP_TIMEOUT)
+            except Exception as e:
+                print(f"⚠️ Imagem não ficou pronta a tempo: {e}")
+                return None
+        if not (getattr(image_file, 'mimetype', None) or '').startswith('image/'):
+            return None
+        return self.images.prepare_safely(image_file.read())
+    
+    def _build_messages(
+        self,
+        user_message: str,
+        image_file: Optional[Any] = None,
+        chat_history: Optional[List[Dict[str, Any]]] = None,
+        report: bool = True
+    ) -> List[Dict[str, str]]:
+        """
+        Monta a lista de mensagens enviada ao modelo.
+        
+        O histórico entra da mensagem mais recente para a mais antiga enquanto
+        couber no orçamento de tokens do prompt. Uma entrada com role "summary"
+        (resumo das mensagens mais antigas) sempre entra, logo após o prompt do
+        sistema. Com `report=False` (ex: só para calcular a chave do cache) o
+        uso do orçamento não é registrado.
+        """
+        # Adiciona mensagem atual
+        image = self._prepare_image(image_file) if image_file else None
+        current: Dict[str, Any]
+        if image:
+            # A imagem vai ao modelo de visão junto com o texto
+            text = user_message or "Identifique o filme ou a série desta imagem."
+            current = {
+                "role": "user",
+                "content": [
+                    {"type": "text", "text": text},
+                    {"type": "image_url", "image_url": {"url": image.data_url}}
+                ]
+            }
+            current_tokens = estimate_tokens(text) + IMAGE_PROMPT_TOKENS
+        elif image_file:
+            # Vídeos (ou imagens ilegíveis) não vão ao modelo: ele trabalha com a descrição
+            current = {
+                "role": "user", 
+                "content": f"{user_message}\n\n[O usuário enviou uma imagem. Descreva o que você vê ou identifique o filme baseado na descrição fornecida.]"
+            }
+            current_tokens = estimate_tokens(current["content"])
+        else:
+            current = {"role": "user", "content": user_message}
+            current_tokens = estimate_tokens(user_message)
+        
+        # Adiciona histórico de conversa
+        # (respostas do assistente em versão compacta: só título, ano e ID do TMDB)
+        history = [
+            {
+                "role": message["role"],
+                "content": history_text(message["role"], message.get('content', '')),
+                "token_count": message.get("token_count")
+            }
+            for message in chat_history or []
+            if message["role"] in ("user", "assistant")
+        ]
+        summary = next(
+            (message["content"] for message in chat_history or [] if message["role"] == "summary"),
+            None
+        )
+        summary_message = {"role": "system", "content": f"Conversation so far: {summary}"} if summary else None
+        
+        fixed_tokens = self._system_prompt_tokens + current_tokens
+        if summary_message:
+            fixed_tokens += estimate_tokens(summary_message["content"])
+        history, usage = self.prompt_budget.fit(fixed_tokens, history, record=report)
+        if report:
+            print(
+                f"🧮 Prompt: {usage['used']}/{usage['budget']} tokens, "
+                f"{usage['kept']} mensagens do histórico ({usage['dropped']} descartadas)"
+            )
+        
+        # Prepara mensagens para o chat
+        messages = [{"role": "system", "content": SYSTEM_PROMPT}]
+        if summary_message:
+            messages.append(summary_message)
+        messages.extend({"role": m["role"], "content": m["content"]} for m in history)
+        messages.append(current)
+        return messages
     
     def generate_response(
         self,
@@ -53,90 +177,335 @@ class AIService:
             user_message: Mensagem do usuário
             image_file: Arquivo de imagem opcional
             chat_history: Histórico de conversa
-            
+        
         Returns:
             Resposta da IA como string JSON
         """
         if not self.is_configured():
-            raise ExternalAPIError("GROQ_API_KEY não configurada.")
+            raise ExternalAPIError("Nenhum provedor de IA configurado (GROQ_API_KEY).")
         
-        # Prepara mensagens para o chat
-        messages = [{"role": "system", "content": SYSTEM_PROMPT}]
+        messages = self._build_messages(user_message, image_file, chat_history)
         
-        # Adiciona histórico de conversa
-        if chat_history:
-            for message in chat_history[-6:]:
-                if message["role"] == "user":
-                    messages.append({"role": "user", "content": message['content']})
-                elif message["role"] == "assistant":
-                    content = message.get('content', '')
-                    if isinstance(content, dict):
-                        content = json.dumps(content)
-                    messages.append({"role": "assistant", "content": str(content)})
+        # Turnos fáceis tentam primeiro o modelo pequeno
+        route = self.model_router.route(user_message, image_file) if self.model_router else None
+        if route and route.tier == TIER_SMALL:
+            text = self._try_small_model(route, messages)
+            if text is not None:
+                return text
         
-        # Adiciona mensagem atual
-        # Nota: Groq ainda não tem suporte completo para visão, então apenas texto por enquanto
-        if image_file:
-            # Para imagens, informa ao usuário que precisa descrever
-            messages.append({
-                "role": "user", 
-                "content": f"{user_message}\n\n[O usuário enviou uma imagem. Descreva o que você vê ou identifique o filme baseado na descrição fornecida.]"
-            })
-        else:
-            messages.append({"role": "user", "content": user_message})
+        # Usa o modelo mais recente e poderoso de cada provedor (ou o de visão)
+        return self._complete(self._main_tier(messages), messages)
+    
+    def _main_tier(self, messages: List[Dict[str, Any]]) -> str:
+        """Modelo dos turnos que não vão para o pequeno: o de visão quando a imagem vai no prompt."""
+        return TIER_VISION if isinstance(messages[-1]["content"], list) else TIER_LARGE
+    
+    def _complete(self, tier: str, messages: List[Dict[str, str]]) -> str:
+        """Gera a resposta sem streaming (com failover), registrando a latência do modelo no roteador."""
+        started = time.monotonic()
+        try:
+            text = self.llm.complete(tier, messages, temperature=0.7, max_tokens=2048, json_mode=self.json_mode)
+        except ExternalAPIError:
+            self._record_tier(tier, time.monotonic() - started, ok=False)
+            raise
+        self._record_tier(tier, time.monotonic() - started, ok=True)
+        return text
+    
+    def _record_tier(self, tier: str, seconds: float, ok: bool) -> None:
+        """Registra a chamada no roteador (o modelo de visão fica fora da comparação pequeno x grande)."""
+        if self.model_router and tier in self.model_router.models:
+            self.model_router.record(tier, seconds, ok)
+    
+    def _try_small_model(self, route: Route, messages: List[Dict[str, str]]) -> Optional[str]:
+        """
+        Gera a resposta com o modelo pequeno.
+        
+        Returns:
+            A resposta, se for válida e confiável; None se o turno deve ir ao modelo grande
+        """
+        try:
+            text = self._complete(TIER_SMALL, messages)
+        except ExternalAPIError as e:
+            print(f"⚠️ Modelo pequeno falhou, usando o grande: {e}")
+            self.model_router.record_escalation('error')
+            return None
+        
+        data = self.parse_json_response(text)
+        try:
+            if data is None:
+                raise ValueError("a resposta não contém um objeto JSON")
+            parsed = validate_ai_response(data)
+        except Exception:
+            self.model_router.record_escalation('invalid')
+            return None
+        if not self.model_router.accepts(route, parsed):
+            self.model_router.record_escalation('low_confidence')
+            return None
+        return text
+    
+    def generate_response_stream(
+        self,
+        user_message: str,
+        image_file: Optional[Any] = None,
+        chat_history: Optional[List[Dict[str, Any]]] = None
+    ) -> Iterator[str]:
+        """
+        Gera a resposta da IA em pedaços, conforme o provedor os envia.
+        
+        Args:
+            user_message: Mensagem do usuário
+            image_file: Arquivo de imagem opcional
+            chat_history: Histórico de conversa
         
-        # Usa o modelo mais recente e poderoso do Groq
-        model = "llama-3.3-70b-versatile"
+        Yields:
+            Trechos de texto da resposta (concatenados formam a string JSON)
+        """
+        if not self.is_configured():
+            raise ExternalAPIError("Nenhum provedor de IA configurado (GROQ_API_KEY).")
+        
+        messages = self._build_messages(user_message, image_file, chat_history)
         
+        # Com o modelo pequeno a resposta vem inteira (é curta e rápida), para
+        # que possa ser validada antes de qualquer trecho chegar ao usuário
+        route = self.model_router.route(user_message, image_file) if self.model_router else None
+        if route and route.tier == TIER_SMALL:
+            text = self._try_small_model(route, messages)
+            if text is not None:
+                yield text
+                return
+        
+        tier = self._main_tier(messages)
+        started = time.monotonic()
         try:
-            response = self.client.chat.completions.create(
-                model=model,
-                messages=messages,
-                temperature=0.7,
-                max_tokens=2048
+            yield from self.llm.stream(
+                tier, messages, temperature=0.7, max_tokens=2048, json_mode=self.json_mode
             )
-            return response.choices[0].message.content.strip()
+        except ExternalAPIError:
+            self._record_tier(tier, time.monotonic() - started, ok=False)
+            raise
+        self._record_tier(tier, time.monotonic() - started, ok=True)
+    
+    def _completion_key(
+        self,
+        user_message: str,
+        image_file: Optional[Any],
+        chat_history: Optional[List[Dict[str, Any]]]
+    ) -> Optional[str]:
+        """Chave do turno no cache de respostas (None se o turno não usa o cache)."""
+        if not self.completion_cache:
+            return None
+        if image_file:
+            # Imagens nunca entram: decide antes de montar as mensagens, que
+            # esperariam a preparação da imagem terminar
+            self.completion_cache.is_cacheable([], has_image=True)
+            return None
+        messages = self._build_messages(user_message, image_file, chat_history, report=False)
+        if not self.completion_cache.is_cacheable(messages):
+            return None
+        return self.completion_cache.key(messages, GROQ_MODEL)
+    
+    def summarize(self, previous_summary: Optional[str], messages: List[Dict[str, Any]]) -> str:
+        """
+        Atualiza o resumo de uma conversa com novas mensagens.
+        
+        Args:
+            previous_summary: Resumo atual da sessão (None se ainda não há)
+            messages: Mensagens posteriores ao resumo, em ordem cronológica
+        
+        Returns:
+            Novo resumo em texto
+        """
+        if not self.is_configured():
+            raise ExternalAPIError("Nenhum provedor de IA configurado (GROQ_API_KEY).")
+        
+        transcript = "\n".join(
+            f"{message['role']}: {history_text(message['role'], message['content'])}"
+            for message in messages
+        )
+        prompt = f"Previous summary:\n{previous_summary or '(none)'}\n\nNew messages:\n{transcript}"
+        
+        return self.llm.complete(
+            TIER_LARGE,
+            [
+                {"role": "system", "content": SUMMARY_PROMPT},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=0.2,
+            max_tokens=CHAT_SUMMARY_MAX_TOKENS
+        )
+    
+    def _reask_json(self, reply: str, error: str) -> str:
+        """Pede de novo, ao modelo pequeno, a resposta no formato JSON (só a resposta inválida vai no prompt)."""
+        return self.llm.complete(
+            TIER_SMALL,
+            [
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": JSON_REPAIR_PROMPT.format(error=error, reply=reply)}
+            ],
+            temperature=0.0,
+            max_tokens=2048,
+            json_mode=self.json_mode
+        )
+    
+    def resolve_response(
+        self,
+        text: str,
+        parsed: Optional[Dict[str, Any]] = None,
+        record: bool = True
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Decodifica e valida a resposta da IA, reparando-a se vier fora do formato.
+        
+        Args:
+            text: Texto da resposta da IA
+            parsed: Objeto já decodificado durante o streaming, se houver
+            record: Se o resultado entra nas estatísticas de reparo
+        
+        Returns:
+            Resposta validada ou None se não houve conserto
+        """
+        data, _ = self.response_repair.resolve(text, parsed, record=record)
+        return data
+    
+    def get_cached_response(
+        self,
+        user_message: str,
+        image_file: Optional[Any] = None,
+        chat_history: Optional[List[Dict[str, Any]]] = None
+    ) -> Optional[str]:
+        """
+        Busca no cache uma resposta já validada para o mesmo turno.
+        
+        Returns:
+            Resposta como string JSON ou None
+        """
+        key = self._completion_key(user_message, image_file, chat_history)
+        return self.completion_cache.get(key) if key else None
+    
+    def cache_response(
+        self,
+        user_message: str,
+        image_file: Optional[Any],
+        chat_history: Optional[List[Dict[str, Any]]],
+        response_text: str
+    ) -> None:
+        """Guarda uma resposta que já passou por validate_ai_response."""
+        key = self._completion_key(user_message, image_file, chat_history)
+        if key:
+            self.completion_cache.set(key, response_text)
+    
+    def _is_single_turn(self, image_file: Optional[Any], chat_history: Optional[List[Dict[str, Any]]]) -> bool:
+        """Turno sem imagem e sem respostas anteriores da IA (nem resumo) no histórico."""
+        return not image_file and not any(
+            message["role"] in ("assistant", "summary") for message in chat_history or []
+        )
+    
+    def find_similar_response(
+        self,
+        user_message: str,
+        image_file: Optional[Any] = None,
+        chat_history: Optional[List[Dict[str, Any]]] = None
+    ) -> Optional[str]:
+        """
+        Busca no cache semântico a resposta de uma pergunta parecida.
+        
+        Parte dos acertos é conferida em segundo plano com a IA para medir
+        falsos positivos (SEMANTIC_CACHE_AUDIT_RATE).
+        
+        Returns:
+            Resposta como string JSON ou None
+        """
+        if not self.semantic_cache or not self._is_single_turn(image_file, chat_history):
+            return None
+        match = self.semantic_cache.lookup(user_message)
+        if not match:
+            return None
+        print(f"🧠 Cache semântico: '{user_message}' ~ '{match['query']}' ({match['similarity']:.3f})")
+        if match['audit'] and self.is_configured():
+            _audit_executor.submit(self._audit_semantic_match, match, user_message)
+        return match['response']
+    
+    def remember_resolved_response(
+        self,
+        user_message: str,
+        image_file: Optional[Any],
+        chat_history: Optional[List[Dict[str, Any]]],
+        response_text: str,
+        tmdb_id: Optional[int] = None
+    ) -> None:
+        """Guarda no cache semântico uma resposta validada e confirmada (ex: filme achado no TMDB)."""
+        if self.semantic_cache and self._is_single_turn(image_file, chat_history):
+            self.semantic_cache.add(user_message, response_text, tmdb_id)
+    
+    def _audit_semantic_match(self, match: Dict[str, Any], user_message: str) -> None:
+        """Compara um acerto do cache semântico com a resposta real da IA."""
+        try:
+            data = self.parse_json_response(self.generate_response(user_message))
+            if data is None:
+                raise ValueError("a resposta não contém um objeto JSON")
+            fresh = validate_ai_response(data)
+            cached = json.loads(match['response'])
         except Exception as e:
-            raise ExternalAPIError(f"Erro na API do Groq: {str(e)}")
+            print(f"⚠️ Falha ao conferir acerto do cache semântico: {e}")
+            return
+        self.semantic_cache.record_audit(match, self._same_answer(cached, fresh))
+    
+    def _same_answer(self, cached: Dict[str, Any], fresh: Dict[str, Any]) -> bool:
+        """Duas respostas estruturadas apontam para o(s) mesmo(s) título(s)."""
+        if cached.get("type") != fresh.get("type"):
+            return False
+        
+        def titles(response):
+            content = response.get("content")
+            items = content if isinstance(content, list) else [content]
+            return {
+                normalize_title(item.get("title", "")) for item in items if isinstance(item, dict)
+            }
+        
+        cached_titles, fresh_titles = titles(cached), titles(fresh)
+        if not cached_titles or not fresh_titles:
+            return cached == fresh
+        overlap = len(cached_titles & fresh_titles) / len(cached_titles | fresh_titles)
+        return overlap >= 0.5
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Retorna métricas do serviço de IA para monitoramento."""
+        return {
+            'completion_cache': self.completion_cache.stats() if self.completion_cache else None,
+            'semantic_cache': self.semantic_cache.stats() if self.semantic_cache else None,
+            'prompt_budget': self.prompt_budget.stats(),
+            'model_tiers': self.model_router.stats() if self.model_router else None,
+            'providers': self.llm.stats(),
+            'response_repair': self.response_repair.stats(),
+            'images': self.images.stats()
+        }
+    
+    def parse_json_response(self, text: str) -> Optional[Dict[str, Any]]:
+        """
+        Extrai e decodifica o objeto JSON da resposta da IA em uma passada.
+        
+        Args:
+            text: Resposta que pode conter JSON (com ou sem markdown em volta)
+        
+        Returns:
+            Objeto decodificado ou None
+        """
+        return extract_json(text)
     
     def clean_json_response(self, text: str) -> Optional[str]:
         """
         Limpa e extrai JSON de uma string.
         
+        Prefira parse_json_response, que já devolve o objeto decodificado.
+        
         Args:
             text: String que pode conter JSON
-            
+        
         Returns:
             String JSON válida ou None
         """
-        # Remove markdown code blocks
-        if "```json" in text:
-            text = text.split("```json")[1].strip()
-        if "```" in text:
-            text = text.split("```")[0].strip()
-        
-        # Extrai JSON
-        try:
-            match_start = text.find('{')
-            if match_start == -1:
-                return None
-            
-            open_braces = 0
-            last_brace_index = -1
-            for i in range(match_start, len(text)):
-                if text[i] == '{':
-                    open_braces += 1
-                elif text[i] == '}':
-                    open_braces -= 1
-                    if open_braces == 0:
-                        last_brace_index = i
-                        break
-            
-            if last_brace_index != -1:
-                potential_json = text[match_start:last_brace_index+1]
-                json.loads(potential_json)  # Valida
-                return potential_json
-        except (json.JSONDecodeError, IndexError):
+        extractor = JSONExtractor()
+        if not text or extractor.feed(text) is None or extractor.span is None:
             return None
-        
-        return None
+        start, end = extractor.span
+        return text[start:end]
@@ -0,0 +1,283 @@
+"""
+Versão assíncrona (asyncio) do serviço de filmes do TMDB.
+"""
+import asyncio
+from typing import Optional, Dict, Any, Awaitable, Callable, Hashable, Set
+
+import httpx
+
+from dto.movie_dto import MovieDTO, RecommendationsDTO
+from core.exceptions import ExternalAPIError
+from services.movie_service import MovieServiceBase
+from utils.http_client import RETRY_STATUS_CODES, MAX_RETRY_AFTER_SLEEP, parse_retry_after
+from utils.rate_limiter import background_priority
+
+
+class AsyncMovieService(MovieServiceBase):
+    """
+    Serviço assíncrono para buscar informações de filmes.
+    
+    Usa um único httpx.AsyncClient (pool de conexões com keep-alive) para
+    todas as chamadas, permitindo várias buscas simultâneas em um só worker.
+    Os DTOs, o cache persistente e as exceções são os mesmos do MovieService;
+    as leituras e gravações no SQLite e o catálogo offline rodam em threads
+    (asyncio.to_thread), fora do event loop.
+    
+    Uso:
+        async with AsyncMovieService() as service:
+            movies = await asyncio.gather(*(service.search_movie(t) for t in titles))
+    """
+    
+    def __init__(self):
+        """Inicializa o serviço assíncrono."""
+        super().__init__()
+        self._client: Optional[httpx.AsyncClient] = None
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self._refreshing = set()
+        self._prefetching: Set[asyncio.Task] = set()
+    
+    async def __aenter__(self) -> 'AsyncMovieService':
+        return self
+    
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+    
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Cliente HTTP compartilhado, criado sob demanda."""
+        if self._client is None:
+            connect_timeout, read_timeout = self.timeout
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+                limits=httpx.Limits(
+                    max_connections=self.pool_size,
+                    max_keepalive_connections=self.pool_size
+                )
+            )
+        return self._client
+    
+    async def aclose(self) -> None:
+        """Fecha o pool de conexões (cancelando os pré-carregamentos pendentes)."""
+        for task in list(self._prefetching):
+            task.cancel()
+        if self._prefetching:
+            await asyncio.gather(*self._prefetching, return_exceptions=True)
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+    
+    async def _request(self, path: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Executa um GET na API do TMDB com retry e backoff em 429/5xx.
+        
+        Raises:
+            httpx.HTTPError: Em falhas de rede ou HTTP
+            ExternalAPIError: Se a cota esgotar ou o circuit breaker estiver aberto
+        """
+        # Circuito aberto falha na hora, sem gastar cota nem esperar na fila
+        self._check_circuit()
+        try:
+            if self.rate_limiter is not None:
+                priority, max_wait = self._quota_request()
+                if not await self.rate_limiter.acquire_async(priority, max_wait):
+                    raise self._quota_exceeded()
+            for attempt in range(self.max_retries + 1):
+                delay = self.retry_backoff * (2 ** attempt)
+                is_last = attempt == self.max_retries
+                try:
+                    response = await self.client.get(path, params=self._query_params(params))
+                except httpx.TransportError:
+                    if is_last:
+                        self._record_outcome(None)
+                        raise
+                else:
+                    if response.status_code not in RETRY_STATUS_CODES or is_last:
+                        self._record_outcome(response.status_code, response.headers.get("Retry-After"))
+                        response.raise_for_status()
+                        return response.json()
+                    retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                    if retry_after is not None:
+                        delay = max(delay, min(retry_after, MAX_RETRY_AFTER_SLEEP))
+                await asyncio.sleep(delay)
+        except BaseException:
+            # Cancelamento, cota esgotada ou erro sem resultado registrado: não
+            # deixa a chamada de teste do circuito presa
+            self._release_circuit()
+            raise
+        # Inalcançável: a última tentativa sempre retorna ou levanta
+        raise ExternalAPIError("Erro ao acessar o TMDB: tentativas esgotadas.")
+    
+    async def _cached_request(
+        self,
+        endpoint: str,
+        path: str,
+        params: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """Executa um GET passando pelo cache persistente (com stale-while-revalidate)."""
+        key = self._cache_key(path, params)
+        entry = await asyncio.to_thread(self._cache_lookup, endpoint, key)
+        if entry is not None:
+            if entry.is_stale and key not in self._refreshing and self._should_revalidate():
+                self._refreshing.add(key)
+                asyncio.get_running_loop().create_task(self._refresh(endpoint, path, params, key))
+            return entry.value
+        
+        data = await self._request(path, params)
+        await asyncio.to_thread(self._store, endpoint, key, data)
+        return data
+    
+    async def _refresh(self, endpoint: str, path: str, params: Optional[Dict[str, Any]], key: str) -> None:
+        """Revalida uma entrada stale em segundo plano."""
+        try:
+            with background_priority():
+                data = await self._request(path, params)
+            await asyncio.to_thread(self._store, endpoint, key, data)
+        except (httpx.HTTPError, ExternalAPIError) as e:
+            print(f"⚠️ Falha ao revalidar cache do TMDB ({path}): {e}")
+        finally:
+            self._refreshing.discard(key)
+    
+    async def _coalesce(self, key: Hashable, factory: Callable[[], Awaitable[Any]]) -> Any:
+        """Compartilha uma mesma corrotina em andamento entre chamadores da mesma chave."""
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(factory())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(task)
+    
+    async def search_movie(
+        self,
+        movie_name: str,
+        year: Optional[str] = None,
+        fast: Optional[bool] = None
+    ) -> Optional[MovieDTO]:
+        """
+        Busca informações de um filme pelo nome.
+        
+        Args:
+            movie_name: Nome do filme
+            year: Ano de lançamento, usado para escolher entre remakes
+            fast: Usa o modo rápido (padrão: TMDB_FAST_SEARCH)
+        
+        Returns:
+            MovieDTO ou None se não encontrado
+        """
+        if not self.is_configured():
+            raise ExternalAPIError("TMDB_API_KEY não configurada.")
+        
+        fast = fast if fast is not None else self.fast_search
+        year = str(year) if year else None
+        return await self._coalesce(
+            ("search",) + self._search_key(movie_name, year, fast),
+            lambda: self._search_movie(movie_name, year, fast)
+        )
+    
+    async def _search_movie(self, movie_name: str, year: Optional[str], fast: bool) -> Optional[MovieDTO]:
+        """Executa a busca no TMDB (sem coalescência)."""
+        if self._is_known_miss(movie_name, year):
+            return None
+        
+        match = await asyncio.to_thread(self._catalog_lookup, movie_name, year)
+        if match:
+            return await self.get_movie_by_id(match.tmdb_id, match.media_type)
+        
+        try:
+            data = await self._cached_request("search", "/search/multi", {'query': movie_name})
+            result = self._pick_search_result(data, movie_name, year, require_year=bool(year))
+            if not result and year:
+                result = await self._search_by_year(movie_name, year)
+        except httpx.HTTPError as e:
+            raise ExternalAPIError(f"Erro ao buscar no TMDB: {str(e)}")
+        
+        if not result and year:
+            # O ano informado pode estar errado: aceita o melhor resultado sem ele
+            result = self._pick_search_result(data, movie_name)
+        if not result:
+            self._remember_miss(movie_name, year)
+            return None
+        media_type = result["media_type"]
+        
+        if fast:
+            movie_dto = self._build_movie_from_search(result, media_type)
+            self.prefetch_details(movie_dto.id, media_type)
+            return movie_dto
+        return await self.get_movie_by_id(result["id"], media_type)
+    
+    def prefetch_details(self, movie_id: int, media_type: str = "movie") -> None:
+        """Aquece o cache de detalhes em segundo plano (como no MovieService)."""
+        async def prefetch():
+            try:
+                with background_priority():
+                    await self.get_movie_by_id(movie_id, media_type)
+            except ExternalAPIError as e:
+                print(f"⚠️ Falha ao pré-carregar detalhes ({media_type}/{movie_id}): {e.message}")
+        
+        # Guarda a referência para a task não ser coletada antes de terminar
+        task = asyncio.get_running_loop().create_task(prefetch())
+        self._prefetching.add(task)
+        task.add_done_callback(self._prefetching.discard)
+    
+    async def _search_by_year(self, movie_name: str, year: str) -> Optional[Dict[str, Any]]:
+        """Refaz a busca com os filtros de ano do TMDB (filmes e depois séries)."""
+        for path, params, media_type in self._year_search_requests(movie_name, year):
+            data = await self._cached_request("search", path, params)
+            result = self._pick_search_result(data, movie_name, year, media_type=media_type)
+            if result:
+                return result
+        return None
+    
+    async def get_movie_by_id(self, movie_id: int, media_type: str = "movie") -> Optional[MovieDTO]:
+        """
+        Busca detalhes de um filme pelo ID.
+        
+        Args:
+            movie_id: ID do filme no TMDB
+            media_type: Tipo de mídia ('movie' ou 'tv')
+        
+        Returns:
+            MovieDTO ou None se não encontrado
+        """
+        if not self.is_configured():
+            raise ExternalAPIError("TMDB_API_KEY não configurada.")
+        
+        return await self._coalesce(
+            ("details", media_type, int(movie_id), self.language),
+            lambda: self._get_movie_by_id(movie_id, media_type)
+        )
+    
+    async def _get_movie_by_id(self, movie_id: int, media_type: str) -> Optional[MovieDTO]:
+        """Executa a busca de detalhes no TMDB (sem coalescência)."""
+        path, params = self._details_request(movie_id, media_type)
+        try:
+            item = await self._cached_request("details", path, params)
+        except httpx.HTTPError as e:
+            raise ExternalAPIError(f"Erro ao buscar detalhes no TMDB: {str(e)}")
+        movie_dto = self._build_movie_dto(item, media_type)
+        await asyncio.to_thread(self._remember_year, movie_dto)
+        return movie_dto
+    
+    async def get_recommendations(self, movie_id: int, media_type: str = "movie") -> RecommendationsDTO:
+        """
+        Busca recomendações baseadas em um filme.
+        
+        Args:
+            movie_id: ID do filme
+            media_type: Tipo de mídia
+        
+        Returns:
+            RecommendationsDTO com lista de recomendações
+        """
+        if not self.is_configured():
+            raise ExternalAPIError("TMDB_API_KEY não configurada.")
+        
+        try:
+            data = await self._cached_request(
+                "recommendations",
+                f"/{media_type}/{movie_id}/recommendations",
+                {'page': 1}
+            )
+        except httpx.HTTPError as e:
+            raise ExternalAPIError(f"Erro ao buscar recomendações no TMDB: {str(e)}")
+        return self._build_recommendations(data, media_type)
@@ -2,17 +2,27 @@
 Serviço de lógica de negócio para chat.
 """
 import json
-from typing import List, Dict, Any, Optional
+import os
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Iterator, Tuple
 
 from repositories.chat_repository import ChatSessionRepository, ChatMessageRepository
-from dto.chat_dto import ChatRequestDTO, ChatHistoryDTO, ChatMessageDTO
+from dto.chat_dto import ChatRequestDTO, ChatHistoryDTO, ChatMessageDTO, ChatTurnDTO
 from dto.movie_dto import MovieDTO
 from services.ai_service import AIService
+from services.fast_path import FastPath, MODE_ON, ALL_RULES
 from services.movie_service import MovieService
 from services.speech_service import SpeechService
-from schemas import validate_ai_response
+from services.summary_service import SummaryService
 from core.constants import CHAT_HISTORY_LIMIT, MESSAGE_ROLE_USER, MESSAGE_ROLE_ASSISTANT
-from core.exceptions import ValidationError, ExternalAPIError
+from core.exceptions import ChatCineException, ValidationError, ExternalAPIError
+from utils.json_stream import AIResponseStream
+
+# Buscas no TMDB iniciadas enquanto a IA ainda gera a resposta
+_speculation_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='tmdb-speculative')
+
+# Busca especulativa em andamento: (título, ano, future)
+SpeculativeSearch = Tuple[str, Optional[str], Future]
 
 
 class ChatService:
@@ -24,10 +34,20 @@ class ChatService:
         self.message_repo = ChatMessageRepository()
         self.ai_service = AIService()
         self.movie_service = MovieService()
+        # Resumo contínuo das sessões longas, atualizado em segundo plano
+        self.summary_service = SummaryService(self.ai_service)
         try:
             self.speech_service = SpeechService()
         except ExternalAPIError:
             self.speech_service = None
+        # Busca o filme no TMDB assim que título e ano aparecem no streaming
+        self.speculative_search = os.getenv("CHAT_SPECULATIVE_SEARCH", "true").lower() == "true"
+        # Pedidos diretos de um título ("filme Duna") respondidos sem a IA
+        self.fast_path = FastPath(
+            mode=os.getenv("CHAT_FAST_PATH_MODE", "shadow").lower(),
+            rules=os.getenv("CHAT_FAST_PATH_RULES", ",".join(ALL_RULES)).split(","),
+            catalog=self.movie_service.catalog
+        )
     
     def process_message(
         self,
@@ -42,10 +62,49 @@ class ChatService:
             session_id: ID da sessão (se já existe)
             request: DTO com dados da requisição
             user_id: ID do usuário (se autenticado, opcional)
-            
+        
         Returns:
             Resposta da IA como dicionário (pode incluir '_session_id' se nova sessão foi criada)
         """
+        turn = self.start_turn(session_id, request, user_id)
+        
+        cached = self._cached_response(turn)
+        if cached:
+            return self._complete_turn(turn, cached, from_cache=True)
+        
+        fast = self._fast_path_response(turn)
+        if fast:
+            return fast
+        
+        if self.speculative_search:
+            for event, data in self._generate_turn(turn):
+                if event == 'final':
+                    return data
+        
+        # Gera resposta da IA
+        ai_response_text = self.ai_service.generate_response(
+            turn.user_message,
+            turn.image_file,
+            turn.history
+        )
+        
+        return self._complete_turn(turn, ai_response_text)
+    
+    def start_turn(
+        self,
+        session_id: int = None,
+        request: ChatRequestDTO = None,
+        user_id: int = None
+    ) -> ChatTurnDTO:
+        """
+        Valida a requisição, resolve a sessão e salva a mensagem do usuário.
+        
+        Separado da geração da resposta para que erros de validação sejam
+        levantados antes de o streaming começar.
+        
+        Returns:
+            ChatTurnDTO com o que é preciso para gerar a resposta
+        """
         if not request or not request.has_content():
             raise ValidationError("Mensagem ou arquivo vazio.")
         
@@ -76,32 +135,184 @@ class ChatService:
                     user_message = f"Áudio transcrito: '{audio_text}'.\n\n{user_message}" if user_message else f"Áudio transcrito: '{audio_text}'."
                 else:
                     raise ExternalAPIError("Não consegui entender o áudio.")
-            elif request.file.mimetype.startswith(('image/', 'video/')):
+            elif request.file.mimetype.startswith('image/'):
+                # A imagem é preparada em segundo plano enquanto a sessão e o histórico são carregados
+                image_file = self.ai_service.images.submit(request.file)
+            elif request.file.mimetype.startswith('video/'):
                 image_file = request.file
         
         # Salva mensagem do usuário
         self.message_repo.create_message(session.id, MESSAGE_ROLE_USER, user_message)
         
-        # Obtém histórico
-        history = self._get_chat_history(session.id)
+        # Obtém histórico (resumo + mensagens recentes)
+        history = self._get_chat_history(session)
+        self.summary_service.schedule(session.id)
         
-        # Gera resposta da IA
-        ai_response_text = self.ai_service.generate_response(
-            user_message,
-            image_file,
-            history
+        return ChatTurnDTO(
+            session=session,
+            new_session_id=new_session_id,
+            user_message=user_message,
+            image_file=image_file,
+            history=history
         )
+    
+    def stream_turn(self, turn: ChatTurnDTO) -> Iterator[Tuple[str, Any]]:
+        """
+        Gera a resposta de um turno em modo streaming.
         
-        # Limpa e valida JSON
-        json_str = self.ai_service.clean_json_response(ai_response_text)
-        if not json_str:
-            raise ExternalAPIError("Problema ao formatar resposta da IA.")
+        Yields:
+            Pares (evento, dados):
+            - ('delta', texto): trecho de uma resposta do tipo "text"
+            - ('status', texto): aviso de progresso (ex: identificando o filme)
+            - ('final', resposta): resposta completa, igual à de process_message
+            - ('error', resposta): erro ocorrido depois do início do streaming
+        """
+        try:
+            cached = self._cached_response(turn)
+            if cached:
+                yield 'final', self._complete_turn(turn, cached, from_cache=True)
+                return
+            fast = self._fast_path_response(turn)
+            if fast:
+                yield 'final', fast
+                return
+            yield from self._generate_turn(turn)
+        except ChatCineException as e:
+            yield 'error', {"type": "text", "content": e.message}
+    
+    def _generate_turn(self, turn: ChatTurnDTO) -> Iterator[Tuple[str, Any]]:
+        """
+        Consome o streaming da IA emitindo os eventos de stream_turn.
+        
+        Com a busca especulativa ligada, o search_movie começa assim que o
+        título e o ano são emitidos, em paralelo com o resto da geração.
+        Erros são levantados normalmente.
+        """
+        parser = AIResponseStream()
+        announced = False
+        speculative: Optional[SpeculativeSearch] = None
+        for chunk in self.ai_service.generate_response_stream(
+            turn.user_message,
+            turn.image_file,
+            turn.history
+        ):
+            delta = parser.feed(chunk)
+            if delta:
+                yield 'delta', delta
+            if parser.response_type == "movie" and not announced:
+                announced = True
+                yield 'status', "Identificando o filme…"
+            if parser.movie_hint and speculative is None and self.speculative_search:
+                title, year = parser.movie_hint
+                future = _speculation_executor.submit(self.movie_service.search_movie, title, year=year)
+                speculative = (title, year, future)
+        
+        yield 'final', self._complete_turn(turn, parser.buffer.strip(), speculative, parsed=parser.result)
+    
+    def _fast_path_response(self, turn: ChatTurnDTO) -> Optional[Dict[str, Any]]:
+        """
+        Responde pedidos diretos de um título sem chamar a IA (modo "on").
+        
+        Em modo "shadow" só guarda o reconhecimento no turno, para comparar
+        com a resposta da IA. Se o título não for achado no TMDB (ou o TMDB
+        estiver indisponível), o turno segue para a IA.
+        """
+        turn.fast_path = self.fast_path.match(turn.user_message, turn.image_file)
+        match = turn.fast_path
+        if not match or self.fast_path.mode != MODE_ON:
+            return None
         
         try:
-            parsed_json = json.loads(json_str)
-            parsed_json = validate_ai_response(parsed_json)
-        except Exception as e:
-            raise ValidationError(f"Erro ao validar resposta da IA: {str(e)}")
+            movie = self.movie_service.search_movie(match.title, year=match.year)
+        except ExternalAPIError as e:
+            print(f"⚠️ Atalho ({match.rule}) sem TMDB, seguindo para a IA: {e.message}")
+            movie = None
+        year = None
+        if movie:
+            # Sem data de lançamento o TMDB devolve "N/A": vale o ano do pedido, se houver
+            year = movie.year if movie.year and len(movie.year) == 4 and movie.year.isdigit() else match.year
+        self.fast_path.record_served(match, bool(year))
+        if not year:
+            return None
+        print(f"⚡ Atalho ({match.rule}): '{match.title}' resolvido sem a IA")
+        
+        # Não há resposta da IA para comparar nem para guardar nos caches
+        turn.fast_path = None
+        found: Future = Future()
+        found.set_result(movie)
+        parsed = {"type": "movie", "content": {"title": movie.title, "year": year}}
+        return self._complete_turn(
+            turn,
+            json.dumps(parsed),
+            speculative=(movie.title, year, found),
+            from_cache=True,
+            parsed=parsed,
+            validated=True
+        )
+    
+    def _cached_response(self, turn: ChatTurnDTO) -> Optional[str]:
+        """Resposta já validada para o mesmo turno (ou para uma pergunta parecida), se houver."""
+        return (
+            self.ai_service.get_cached_response(turn.user_message, turn.image_file, turn.history)
+            or self.ai_service.find_similar_response(turn.user_message, turn.image_file, turn.history)
+        )
+    
+    def _search_movie(
+        self,
+        title: str,
+        year: Optional[str],
+        speculative: Optional[SpeculativeSearch] = None
+    ) -> Optional[MovieDTO]:
+        """Busca o filme, reaproveitando a busca especulativa se ela for pelo mesmo título e ano."""
+        year = str(year) if year else None
+        if speculative and speculative[:2] == (title, year):
+            return speculative[2].result()
+        return self.movie_service.search_movie(title, year=year)
+    
+    def _complete_turn(
+        self,
+        turn: ChatTurnDTO,
+        ai_response_text: str,
+        speculative: Optional[SpeculativeSearch] = None,
+        from_cache: bool = False,
+        parsed: Optional[Dict[str, Any]] = None,
+        validated: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Valida e salva a resposta da IA, buscando os detalhes do filme se houver.
+        
+        `parsed` é o objeto já decodificado durante o streaming, quando houver;
+        assim o texto da resposta não é decodificado de novo. Com `validated`,
+        `parsed` foi montado pelo próprio backend (atalho) e não passa pelo
+        reparo, que poderia consultar a IA.
+        """
+        session = turn.session
+        
+        # Extrai e valida JSON (uma única decodificação), reparando respostas fora do formato
+        if validated and parsed is not None:
+            parsed_json: Optional[Dict[str, Any]] = parsed
+        else:
+            parsed_json = self.ai_service.resolve_response(ai_response_text, parsed, record=not from_cache)
+        if parsed_json is None:
+            raise ExternalAPIError("Problema ao formatar resposta da IA.")
+        
+        # Modo sombra: mede se o atalho teria dado a mesma resposta
+        if turn.fast_path and not from_cache:
+            self.fast_path.record_shadow(turn.fast_path, parsed_json)
+        
+        # Só respostas validadas entram no cache
+        validated_text = json.dumps(parsed_json)
+        if not from_cache:
+            self.ai_service.cache_response(
+                turn.user_message,
+                turn.image_file,
+                turn.history,
+                validated_text
+            )
+            if parsed_json.get("type") == "recommendations":
+                self.ai_service.remember_resolved_response(
+                    turn.user_message, turn.image_file, turn.history, validated_text
+                )
         
         # Salva resposta da IA
         self.message_repo.create_message(
@@ -113,9 +324,16 @@ class ChatService:
         # Se identificou filme, busca detalhes
         if parsed_json.get("type") == "movie" and parsed_json.get("content"):
             movie_title = parsed_json["content"].get("title")
+            movie_year = parsed_json["content"].get("year")
             if movie_title:
-                movie_details = self.movie_service.search_movie(movie_title)
+                movie_details = self._search_movie(movie_title, movie_year, speculative)
                 if movie_details:
+                    if not from_cache:
+                        # Pergunta resolvida para um ID do TMDB: entra no cache semântico
+                        self.ai_service.remember_resolved_response(
+                            turn.user_message, turn.image_file, turn.history,
+                            validated_text, movie_details.id
+                        )
                     parsed_json["content"] = movie_details.to_dict()
                     # Atualiza mensagem salva
                     self.message_repo.create_message(
@@ -135,14 +353,25 @@ class ChatService:
                     return error_response
         
         result = parsed_json.copy()
-        if new_session_id:
-            result['_session_id'] = new_session_id
+        if turn.new_session_id:
+            result['_session_id'] = turn.new_session_id
         
         return result
     
-    def _get_chat_history(self, session_id: int) -> List[Dict[str, Any]]:
-        """Obtém histórico de chat formatado."""
-        messages = self.message_repo.get_session_history(session_id, CHAT_HISTORY_LIMIT)
-        history_dto = ChatHistoryDTO.from_messages(messages)
-        return history_dto.to_list()
+    def _get_chat_history(self, session) -> List[Dict[str, Any]]:
+        """
+        Obtém histórico de chat formatado.
+        
+        Mensagens já incorporadas ao resumo da sessão são substituídas por uma
+        entrada {"role": "summary", "content": resumo} no início.
+        """
+        messages = self.message_repo.get_session_history(
+            session.id,
+            CHAT_HISTORY_LIMIT,
+            after_id=session.summary_message_id
+        )
+        history = ChatHistoryDTO.from_messages(messages).to_list()
+        if session.summary:
+            history.insert(0, {"role": "summary", "content": session.summary})
+        return history
 
@@ -0,0 +1,130 @@
+"""
+Cache de respostas da IA para prompts repetidos.
+
+A chave é o hash da versão do prompt do sistema, do modelo e das mensagens
+enviadas (histórico aparado + mensagem atual), com o texto normalizado.
+Só respostas que passaram por validate_ai_response devem ser gravadas.
+"""
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from core.constants import SYSTEM_PROMPT, COMPLETION_CACHE_TTL, COMPLETION_CACHE_MAX_ENTRIES
+from utils.sqlite_cache import SQLiteCache
+from utils.text import strip_accents
+
+DEFAULT_COMPLETION_CACHE_PATH = Path(__file__).parent.parent / 'instance' / 'completion_cache.db'
+
+# Muda sempre que o prompt do sistema muda, invalidando as respostas antigas
+SYSTEM_PROMPT_VERSION = hashlib.sha256(SYSTEM_PROMPT.encode('utf-8')).hexdigest()[:12]
+
+
+def normalize_message(text: str) -> str:
+    """Normaliza o texto de uma mensagem para a chave do cache."""
+    return ' '.join(strip_accents(text or '').lower().split())
+
+
+class CompletionCache:
+    """Cache persistente de respostas validadas da IA."""
+    
+    NAMESPACE = 'completions'
+    
+    def __init__(
+        self,
+        path: str,
+        ttl: float = COMPLETION_CACHE_TTL,
+        max_entries: int = COMPLETION_CACHE_MAX_ENTRIES,
+        skip_conversational: bool = True
+    ):
+        """
+        Inicializa o cache.
+        
+        Args:
+            path: Caminho do arquivo SQLite
+            ttl: Tempo de vida das respostas, em segundos
+            max_entries: Número máximo de respostas guardadas
+            skip_conversational: Ignora turnos que dependem de mensagens anteriores
+        """
+        self.ttl = ttl
+        self.skip_conversational = skip_conversational
+        self._store = SQLiteCache(path, max_entries=max_entries)
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._stores = 0
+        self._skipped = 0
+    
+    def is_cacheable(self, messages: List[Dict[str, str]], has_image: bool = False) -> bool:
+        """
+        Verifica se um turno pode usar o cache.
+        
+        Imagens nunca entram. Turnos com mensagens anteriores (além do
+        prompt do sistema e da mensagem atual) ficam de fora quando
+        `skip_conversational` está ligado.
+        """
+        # Respostas anteriores ou um resumo da conversa (mensagens de sistema além do prompt)
+        conversational = any(
+            message['role'] != 'user' for message in messages[1:]
+        )
+        cacheable = not has_image and not (self.skip_conversational and conversational)
+        if not cacheable:
+            with self._lock:
+                self._skipped += 1
+        return cacheable
+    
+    def key(self, messages: List[Dict[str, str]], model: str) -> str:
+        """Gera a chave de um conjunto de mensagens (o prompt do sistema entra pela versão)."""
+        payload = {
+            'prompt_version': SYSTEM_PROMPT_VERSION,
+            'model': model,
+            'messages': [
+                (message['role'], normalize_message(message['content']))
+                for message in messages[1:]
+            ]
+        }
+        raw = json.dumps(payload, ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+    
+    def get(self, key: str) -> Optional[str]:
+        """Retorna a resposta guardada ou None."""
+        entry = self._store.get(self.NAMESPACE, key)
+        with self._lock:
+            if entry is None:
+                self._misses += 1
+                return None
+            self._hits += 1
+        return entry.value
+    
+    def set(self, key: str, response_text: str) -> None:
+        """Guarda uma resposta já validada."""
+        self._store.set(self.NAMESPACE, key, response_text, self.ttl)
+        with self._lock:
+            self._stores += 1
+    
+    def stats(self) -> Dict[str, Any]:
+        """Retorna contadores de uso do cache."""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_rate': round(self._hits / lookups, 3) if lookups else 0.0,
+                'stores': self._stores,
+                'skipped': self._skipped,
+                'prompt_version': SYSTEM_PROMPT_VERSION
+            }
+
+
+def build_completion_cache() -> Optional[CompletionCache]:
+    """Cria o cache de respostas a partir das variáveis de ambiente (None se desabilitado)."""
+    if os.getenv("COMPLETION_CACHE_ENABLED", "true").lower() != "true":
+        return None
+    return CompletionCache(
+        os.getenv("COMPLETION_CACHE_PATH", str(DEFAULT_COMPLETION_CACHE_PATH)),
+        ttl=float(os.getenv("COMPLETION_CACHE_TTL", COMPLETION_CACHE_TTL)),
+        max_entries=int(os.getenv("COMPLETION_CACHE_MAX_ENTRIES", COMPLETION_CACHE_MAX_ENTRIES)),
+        skip_conversational=os.getenv("COMPLETION_CACHE_SKIP_CONVERSATIONAL", "true").lower() == "true"
+    )
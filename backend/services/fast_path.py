@@ -0,0 +1,175 @@
+"""
+Atalho determinístico para pedidos diretos de um título.
+
+Mensagens como "filme Duna", "sobre Interestelar (2014)" ou o nome exato de
+um título do catálogo local não precisam da IA: o pré-classificador extrai
+título e ano e o ChatService consulta o MovieService direto.
+
+Modos (CHAT_FAST_PATH_MODE):
+    - off: desligado
+    - shadow: só mede; a IA responde normalmente e a concordância é registrada
+    - on: pedidos reconhecidos são respondidos sem chamar a IA
+"""
+import re
+import threading
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, Iterable, Optional
+
+from services.model_router import KIND_GREETING, classify_turn
+from utils.text import normalize_title
+
+MODE_OFF = 'off'
+MODE_SHADOW = 'shadow'
+MODE_ON = 'on'
+
+RULE_EXPLICIT = 'explicit'  # "filme X", "sobre a série X"
+RULE_YEAR = 'year'  # "X (2014)", "sobre X (2014)"
+RULE_CATALOG = 'catalog'  # a mensagem é o nome exato de um título do catálogo
+ALL_RULES = (RULE_EXPLICIT, RULE_YEAR, RULE_CATALOG)
+
+_PREFIX = r"(?:(?:me )?(?:fale|fala|conte|conta|quero saber)(?: mais| um pouco)? )?(?:sobre )?(?:o |a )?"
+_EXPLICIT_PATTERN = re.compile(
+    _PREFIX + r"(?:filme|s[eé]rie) (?P<title>[^()]+?)(?: \(?(?P<year>(?:19|20)\d{2})\)?)?$",
+    re.IGNORECASE
+)
+_YEAR_PATTERN = re.compile(_PREFIX + r"(?P<title>[^()]+?) \((?P<year>(?:19|20)\d{2})\)$", re.IGNORECASE)
+# Pedidos genéricos ou de recomendação, que só a IA resolve
+_GENERIC_PATTERN = re.compile(
+    r"\b(filmes|s[eé]ries|recomend\w*|indic\w*|parecid\w*|melhores|piores|top|lista)\b",
+    re.IGNORECASE
+)
+# "filme de terror", "série com o Tom Hanks", "filme sobre viagem no tempo": descrições, não títulos
+_DESCRIPTION_PATTERN = re.compile(r"^(?:de|do|da|dos|das|com|que|sobre|sem|pra|para)\b", re.IGNORECASE)
+# Mensagens curtas demais para o nome de um título ("sim", "ok", "2"...)
+_MIN_CATALOG_CHARS = 5
+_MAX_TITLE_WORDS = 8
+
+
+@dataclass
+class FastPathMatch:
+    """Pedido direto reconhecido pelo pré-classificador."""
+    rule: str
+    title: str
+    year: Optional[str] = None
+
+
+class FastPath:
+    """Pré-classificador baseado em regras para pedidos diretos de um título."""
+    
+    def __init__(self, mode: str = MODE_SHADOW, rules: Iterable[str] = ALL_RULES, catalog=None):
+        """
+        Inicializa o pré-classificador.
+        
+        Args:
+            mode: MODE_OFF, MODE_SHADOW ou MODE_ON
+            rules: Regras habilitadas (RULE_EXPLICIT, RULE_YEAR, RULE_CATALOG)
+            catalog: TitleCatalog para checar títulos exatos e ambiguidades (opcional)
+        """
+        self.mode = mode
+        self.rules = [rule for rule in rules if rule in ALL_RULES]
+        self.catalog = catalog
+        self._lock = threading.Lock()
+        self._matched = {rule: 0 for rule in ALL_RULES}
+        self._served = 0
+        self._fallbacks = 0
+        self._compared = {rule: 0 for rule in ALL_RULES}
+        self._agreed = {rule: 0 for rule in ALL_RULES}
+        self._disagreements: Deque[Dict[str, Any]] = deque(maxlen=20)
+    
+    def match(self, user_message: str, image_file: Optional[Any] = None) -> Optional[FastPathMatch]:
+        """
+        Reconhece um pedido direto de um título.
+        
+        Returns:
+            FastPathMatch ou None se a mensagem não for um pedido direto e sem ambiguidade
+        """
+        if self.mode == MODE_OFF or image_file or not user_message:
+            return None
+        # O título sai do texto original (com acentos), como o usuário escreveu
+        text = ' '.join(user_message.split()).rstrip(' ?!.')
+        if not text or classify_turn(text) == KIND_GREETING:
+            return None
+        
+        match = None
+        for rule in self.rules:
+            match = self._apply(rule, text)
+            if match:
+                break
+        if match:
+            with self._lock:
+                self._matched[match.rule] += 1
+        return match
+    
+    def _apply(self, rule: str, text: str) -> Optional[FastPathMatch]:
+        if rule == RULE_CATALOG:
+            if self.catalog and len(text) >= _MIN_CATALOG_CHARS and self.catalog.exact_count(text) == 1:
+                return FastPathMatch(rule, text)
+            return None
+        
+        pattern = _EXPLICIT_PATTERN if rule == RULE_EXPLICIT else _YEAR_PATTERN
+        found = pattern.match(text)
+        if not found:
+            return None
+        title, year = found.group('title').strip(), found.group('year')
+        if not title or len(title.split()) > _MAX_TITLE_WORDS or _GENERIC_PATTERN.search(title):
+            return None
+        if rule == RULE_EXPLICIT and _DESCRIPTION_PATTERN.match(title):
+            return None
+        # Franquias e remakes com o mesmo nome: sem ano, a IA deve perguntar qual é
+        if not year and self.catalog and self.catalog.exact_count(title) > 1:
+            return None
+        return FastPathMatch(rule, title, year)
+    
+    def record_served(self, match: FastPathMatch, found: bool) -> None:
+        """Registra um pedido respondido pelo atalho (ou devolvido à IA se o título não foi achado)."""
+        with self._lock:
+            if found:
+                self._served += 1
+            else:
+                self._fallbacks += 1
+    
+    def record_shadow(self, match: FastPathMatch, response: Dict[str, Any]) -> bool:
+        """
+        Compara o atalho com a resposta (validada) da IA para o mesmo turno.
+        
+        Returns:
+            True se a IA identificou o mesmo título (e o mesmo ano, se informado)
+        """
+        content = response.get('content') if response.get('type') == 'movie' else None
+        agreed = isinstance(content, dict) and normalize_title(content.get('title', '')) == normalize_title(match.title)
+        if agreed and match.year and isinstance(content, dict):
+            agreed = str(content.get('year')) == match.year
+        with self._lock:
+            self._compared[match.rule] += 1
+            if agreed:
+                self._agreed[match.rule] += 1
+            else:
+                self._disagreements.append({
+                    'rule': match.rule,
+                    'fast_path': {'title': match.title, 'year': match.year},
+                    'llm': content if isinstance(content, dict) else {'type': response.get('type')}
+                })
+        return agreed
+    
+    def stats(self) -> Dict[str, Any]:
+        """Pedidos reconhecidos por regra, atendidos pelo atalho e concordância com a IA."""
+        with self._lock:
+            compared = sum(self._compared.values())
+            agreed = sum(self._agreed.values())
+            return {
+                'mode': self.mode,
+                'rules': list(self.rules),
+                'matched': dict(self._matched),
+                'served': self._served,
+                'fallbacks': self._fallbacks,
+                'shadow': {
+                    'compared': compared,
+                    'agreement_rate': round(agreed / compared, 3) if compared else None,
+                    'agreement_by_rule': {
+                        rule: round(self._agreed[rule] / count, 3)
+                        for rule, count in self._compared.items() if count
+                    },
+                    'recent_disagreements': list(self._disagreements)
+                }
+            }
@@ -0,0 +1,202 @@
+"""
+Preparação das imagens enviadas ao modelo de visão.
+
+Cada upload é reduzido para caber em IMAGE_MAX_EDGE pixels no lado maior,
+recodificado em JPEG ou WebP com qualidade fixa e sem metadados (EXIF, GPS,
+perfil de cor). O resultado fica em um cache em memória indexado pelo hash
+do conteúdo, então reenviar a mesma imagem não custa nada. O trabalho roda
+fora da thread da requisição: o ChatService dispara a preparação assim que
+o upload chega e o AIService só espera o resultado ao montar o prompt.
+"""
+import base64
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from io import BytesIO
+from typing import Any, Dict, Optional
+
+from PIL import Image, ImageOps
+
+from core.constants import IMAGE_MAX_EDGE, IMAGE_FORMAT, IMAGE_QUALITY, IMAGE_CACHE_MAX_ENTRIES
+
+# Preparação das imagens fora da thread da requisição
+_image_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='image-prep')
+
+_MIME_TYPES = {'JPEG': 'image/jpeg', 'WEBP': 'image/webp'}
+
+
+@dataclass
+class PreparedImage:
+    """Imagem pronta para o modelo de visão."""
+    data: bytes
+    mime_type: str
+    width: int
+    height: int
+    original_bytes: int
+    digest: str
+    
+    @property
+    def data_url(self) -> str:
+        """Imagem como data URL em base64 (formato aceito pelas APIs de chat)."""
+        return f"data:{self.mime_type};base64,{base64.b64encode(self.data).decode('ascii')}"
+
+
+@dataclass
+class PendingImage:
+    """Upload cuja preparação já foi disparada em segundo plano."""
+    future: Future
+    mimetype: str
+    filename: Optional[str] = None
+    
+    def result(self, timeout: Optional[float] = None) -> Optional[PreparedImage]:
+        """Espera a imagem preparada (None se o arquivo não pôde ser lido como imagem)."""
+        return self.future.result(timeout)
+
+
+class ImagePreprocessor:
+    """Reduz, recodifica e guarda em cache as imagens dos turnos com visão."""
+    
+    def __init__(
+        self,
+        max_edge: int = IMAGE_MAX_EDGE,
+        image_format: str = IMAGE_FORMAT,
+        quality: int = IMAGE_QUALITY,
+        cache_max_entries: int = IMAGE_CACHE_MAX_ENTRIES
+    ):
+        """
+        Inicializa o pré-processador.
+        
+        Args:
+            max_edge: Tamanho máximo, em pixels, do lado maior da imagem
+            image_format: 'JPEG' ou 'WEBP'
+            quality: Qualidade da compressão (1-100)
+            cache_max_entries: Imagens preparadas guardadas em memória
+        """
+        self.max_edge = max_edge
+        self.image_format = image_format.upper() if image_format.upper() in _MIME_TYPES else 'JPEG'
+        self.quality = quality
+        self.cache_max_entries = cache_max_entries
+        self._cache: 'OrderedDict[str, PreparedImage]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._processed = 0
+        self._hits = 0
+        self._failed = 0
+        self._bytes_in = 0
+        self._bytes_out = 0
+        self._duration_ms_total = 0.0
+    
+    def submit(self, image_file) -> PendingImage:
+        """
+        Dispara a preparação de um upload em segundo plano.
+        
+        O conteúdo é lido aqui, na thread da requisição (o stream do upload
+        não sobrevive a ela); só a decodificação e a recodificação vão para o executor.
+        """
+        raw = image_file.read()
+        future = _image_executor.submit(self.prepare_safely, raw)
+        return PendingImage(future, image_file.mimetype, getattr(image_file, 'filename', None))
+    
+    def prepare_safely(self, raw: bytes) -> Optional[PreparedImage]:
+        """Como prepare, mas devolve None se o arquivo não for uma imagem legível."""
+        try:
+            return self.prepare(raw)
+        except Exception as e:
+            with self._lock:
+                self._failed += 1
+            print(f"⚠️ Não consegui preparar a imagem: {e}")
+            return None
+    
+    def prepare(self, raw: bytes) -> PreparedImage:
+        """
+        Reduz e recodifica uma imagem (ou devolve a versão já preparada do mesmo conteúdo).
+        
+        Args:
+            raw: Bytes do arquivo enviado
+        
+        Returns:
+            PreparedImage
+        """
+        digest = hashlib.sha256(raw).hexdigest()
+        with self._lock:
+            cached = self._cache.get(digest)
+            if cached is not None:
+                self._cache.move_to_end(digest)
+                self._hits += 1
+                return cached
+        
+        started = time.monotonic()
+        prepared = self._encode(raw, digest)
+        elapsed_ms = (time.monotonic() - started) * 1000
+        
+        with self._lock:
+            self._cache[digest] = prepared
+            self._cache.move_to_end(digest)
+            while len(self._cache) > self.cache_max_entries:
+                self._cache.popitem(last=False)
+            self._processed += 1
+            self._bytes_in += len(raw)
+            self._bytes_out += len(prepared.data)
+            self._duration_ms_total += elapsed_ms
+        return prepared
+    
+    def _encode(self, raw: bytes, digest: str) -> PreparedImage:
+        image = Image.open(BytesIO(raw))
+        # JPEGs grandes são decodificados já em escala reduzida (bem mais rápido)
+        image.draft('RGB', (self.max_edge, self.max_edge))
+        # Aplica a rotação do EXIF antes de descartar os metadados
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((self.max_edge, self.max_edge), Image.LANCZOS)
+        
+        has_alpha = image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info)
+        if has_alpha and self.image_format == 'WEBP':
+            image = image.convert('RGBA')
+        elif has_alpha:
+            # JPEG não tem transparência: compõe sobre fundo branco
+            rgba = image.convert('RGBA')
+            image = Image.new('RGB', rgba.size, (255, 255, 255))
+            image.paste(rgba, mask=rgba.getchannel('A'))
+        elif image.mode != 'RGB':
+            image = image.convert('RGB')
+        
+        # Sem exif/icc_profile no save: os metadados não são copiados
+        buffered = BytesIO()
+        image.save(buffered, format=self.image_format, quality=self.quality, optimize=True)
+        return PreparedImage(
+            data=buffered.getvalue(),
+            mime_type=_MIME_TYPES[self.image_format],
+            width=image.width,
+            height=image.height,
+            original_bytes=len(raw),
+            digest=digest
+        )
+    
+    def stats(self) -> Dict[str, Any]:
+        """Imagens preparadas, acertos do cache, bytes economizados e tempo médio."""
+        with self._lock:
+            return {
+                'max_edge': self.max_edge,
+                'format': self.image_format,
+                'quality': self.quality,
+                'processed': self._processed,
+                'cache_hits': self._hits,
+                'cached': len(self._cache),
+                'failed': self._failed,
+                'bytes_in': self._bytes_in,
+                'bytes_out': self._bytes_out,
+                'size_ratio': round(self._bytes_out / self._bytes_in, 3) if self._bytes_in else None,
+                'avg_duration_ms': round(self._duration_ms_total / self._processed, 1) if self._processed else 0.0
+            }
+
+
+def build_image_preprocessor() -> ImagePreprocessor:
+    """Cria o pré-processador de imagens a partir das variáveis de ambiente."""
+    return ImagePreprocessor(
+        max_edge=int(os.getenv("IMAGE_MAX_EDGE", IMAGE_MAX_EDGE)),
+        image_format=os.getenv("IMAGE_FORMAT", IMAGE_FORMAT),
+        quality=int(os.getenv("IMAGE_QUALITY", IMAGE_QUALITY)),
+        cache_max_entries=int(os.getenv("IMAGE_CACHE_MAX_ENTRIES", IMAGE_CACHE_MAX_ENTRIES))
+    )
@@ -0,0 +1,491 @@
+"""
+Provedores de modelos de linguagem com failover.
+
+O AIService fala com um ProviderPool, que conhece um ou mais provedores
+(Groq, qualquer endpoint compatível com a API da OpenAI e um provedor local
+para testes) e mede a taxa de erros e a latência recentes de cada um. Se um
+provedor falha, a mesma requisição é tentada no próximo, dentro do tempo
+máximo da requisição. Provedores com o circuito aberto só são usados como
+último recurso.
+
+Configuração:
+    AI_PROVIDERS: provedores em ordem de preferência (ex: "groq,openai")
+    AI_PROVIDER_STRATEGY: "ordered" (ordem fixa) ou "weighted" (sorteio pela saúde)
+    AI_REQUEST_TIME_BUDGET: segundos disponíveis para todas as tentativas
+"""
+import json
+import os
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, Optional, Union, cast
+
+import httpx
+from groq import BadRequestError, Groq
+from groq.types.chat import ChatCompletionChunk, ChatCompletionMessageParam
+
+from core.constants import (
+    GROQ_MODEL, GROQ_SMALL_MODEL, GROQ_VISION_MODEL, AI_REQUEST_TIME_BUDGET, AI_PROVIDER_MIN_ATTEMPT_SECONDS,
+    AI_PROVIDER_BREAKER_FAILURE_RATE, AI_PROVIDER_BREAKER_MIN_CALLS, AI_PROVIDER_BREAKER_OPEN_SECONDS
+)
+from core.exceptions import ExternalAPIError
+from services.model_router import TIER_LARGE, TIER_SMALL, TIER_VISION
+from utils.circuit_breaker import CircuitBreaker, OPEN
+
+STRATEGY_ORDERED = 'ordered'
+STRATEGY_WEIGHTED = 'weighted'
+
+
+class LLMProvider:
+    """Interface comum dos provedores de chat completion."""
+    
+    # Modo JSON (response_format) disponível sem e com streaming
+    supports_json_mode = False
+    supports_json_stream = False
+    
+    def __init__(self, name: str, models: Dict[str, str]):
+        """
+        Args:
+            name: Nome do provedor nas estatísticas
+            models: Modelo do provedor para cada nível (TIER_LARGE e, opcionais, TIER_SMALL e TIER_VISION)
+        """
+        self.name = name
+        self.models = models
+    
+    def model_for(self, tier: str) -> str:
+        """Modelo do provedor para o nível pedido (o grande, se não houver outro)."""
+        return self.models.get(tier) or self.models[TIER_LARGE]
+    
+    def _json_params(self, json_mode: bool, stream: bool = False) -> Dict[str, Any]:
+        """Parâmetros que pedem um objeto JSON ao provedor, se ele oferecer o modo JSON."""
+        supported = self.supports_json_stream if stream else self.supports_json_mode
+        return {'response_format': {'type': 'json_object'}} if json_mode and supported else {}
+    
+    def complete(
+        self,
+        tier: str,
+        messages: List[Dict[str, str]],
+        timeout: float,
+        json_mode: bool = False,
+        **params
+    ) -> str:
+        """Gera a resposta inteira (json_mode pede um objeto JSON, quando o provedor permite)."""
+        raise NotImplementedError
+    
+    def stream(
+        self,
+        tier: str,
+        messages: List[Dict[str, str]],
+        timeout: float,
+        json_mode: bool = False,
+        **params
+    ) -> Iterator[str]:
+        """Gera a resposta em pedaços."""
+        raise NotImplementedError
+
+
+class GroqProvider(LLMProvider):
+    """Provedor Groq (SDK oficial)."""
+    
+    # O modo JSON do Groq não funciona com streaming
+    supports_json_mode = True
+    
+    def __init__(self, api_key: str, models: Dict[str, str]):
+        super().__init__('groq', models)
+        self.client = Groq(api_key=api_key)
+    
+    def complete(
+        self,
+        tier: str,
+        messages: List[Dict[str, str]],
+        timeout: float,
+        json_mode: bool = False,
+        **params
+    ) -> str:
+        try:
+            response = self.client.chat.completions.create(
+                model=self.model_for(tier),
+                messages=cast(List[ChatCompletionMessageParam], messages),
+                timeout=timeout,
+                **self._json_params(json_mode),
+                **params
+            )
+        except BadRequestError as e:
+            # No modo JSON o Groq recusa saídas inválidas, mas devolve o texto gerado:
+            # ele segue para o reparo em vez de contar como falha do provedor
+            failed_generation = _groq_failed_generation(e)
+            if failed_generation is None:
+                raise
+            return failed_generation.strip()
+        return (response.choices[0].message.content or "").strip()
+    
+    def stream(
+        self,
+        tier: str,
+        messages: List[Dict[str, str]],
+        timeout: float,
+        json_mode: bool = False,
+        **params
+    ) -> Iterator[str]:
+        # Com stream=True o SDK devolve os pedaços (o **params impede o mypy de escolher a sobrecarga)
+        chunks = cast(Iterable[ChatCompletionChunk], self.client.chat.completions.create(
+            model=self.model_for(tier),
+            messages=cast(List[ChatCompletionMessageParam], messages),
+            timeout=timeout,
+            stream=True,
+            **params
+        ))
+        for chunk in chunks:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                yield delta
+
+
+def _groq_failed_generation(error: BadRequestError) -> Optional[str]:
+    """Texto gerado que o Groq recusou no modo JSON (None para outros erros)."""
+    body = error.body if isinstance(error.body, dict) else {}
+    details = body.get('error', body)
+    if not isinstance(details, dict) or details.get('code') != 'json_validate_failed':
+        return None
+    return details.get('failed_generation')
+
+
+class OpenAICompatibleProvider(LLMProvider):
+    """Qualquer endpoint que implemente /chat/completions da API da OpenAI."""
+    
+    def __init__(
+        self,
+        base_url: str,
+        api_key: Optional[str],
+        models: Dict[str, str],
+        name: str = 'openai',
+        json_mode: bool = True
+    ):
+        super().__init__(name, models)
+        self.supports_json_mode = self.supports_json_stream = json_mode
+        headers = {'Authorization': f"Bearer {api_key}"} if api_key else {}
+        self.client = httpx.Client(base_url=base_url.rstrip('/'), headers=headers)
+    
+    def _payload(
+        self,
+        tier: str,
+        messages: List[Dict[str, str]],
+        stream: bool,
+        json_mode: bool,
+        params: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        return {
+            'model': self.model_for(tier),
+            'messages': messages,
+            'stream': stream,
+            **self._json_params(json_mode, stream),
+            **params
+        }
+    
+    def complete(
+        self,
+        tier: str,
+        messages: List[Dict[str, str]],
+        timeout: float,
+        json_mode: bool = False,
+        **params
+    ) -> str:
+        response = self.client.post(
+            '/chat/completions',
+            json=self._payload(tier, messages, False, json_mode, params),
+            timeout=timeout
+        )
+        response.raise_for_status()
+        return response.json()['choices'][0]['message']['content'].strip()
+    
+    def stream(
+        self,
+        tier: str,
+        messages: List[Dict[str, str]],
+        timeout: float,
+        json_mode: bool = False,
+        **params
+    ) -> Iterator[str]:
+        with self.client.stream(
+            'POST',
+            '/chat/completions',
+            json=self._payload(tier, messages, True, json_mode, params),
+            timeout=timeout
+        ) as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if not line.startswith('data:'):
+                    continue
+                data = line[len('data:'):].strip()
+                if data == '[DONE]':
+                    break
+                choices = json.loads(data).get('choices') or []
+                delta = choices[0].get('delta', {}).get('content') if choices else None
+                if delta:
+                    yield delta
+
+
+class LocalProvider(LLMProvider):
+    """Provedor local, sem rede, para testes e desenvolvimento sem chave de API."""
+    
+    DEFAULT_REPLY = json.dumps({
+        "type": "text",
+        "content": "Estou sem acesso ao modelo de IA no momento. Tente de novo em instantes!"
+    }, ensure_ascii=False)
+    
+    def __init__(
+        self,
+        reply: Union[str, Callable[[str, List[Dict[str, str]]], str]] = DEFAULT_REPLY,
+        name: str = 'local'
+    ):
+        """
+        Args:
+            reply: Resposta fixa ou função (nível, mensagens) -> resposta
+        """
+        super().__init__(name, {TIER_LARGE: 'local', TIER_SMALL: 'local', TIER_VISION: 'local'})
+        self.reply = reply
+    
+    def complete(
+        self,
+        tier: str,
+        messages: List[Dict[str, str]],
+        timeout: float,
+        json_mode: bool = False,
+        **params
+    ) -> str:
+        return self.reply(tier, messages) if callable(self.reply) else self.reply
+    
+    def stream(
+        self,
+        tier: str,
+        messages: List[Dict[str, str]],
+        timeout: float,
+        json_mode: bool = False,
+        **params
+    ) -> Iterator[str]:
+        yield self.complete(tier, messages, timeout, json_mode, **params)
+
+
+class ProviderPool:
+    """Escolhe o provedor de cada requisição e faz failover entre eles."""
+    
+    def __init__(
+        self,
+        providers: List[LLMProvider],
+        strategy: str = STRATEGY_ORDERED,
+        time_budget: float = AI_REQUEST_TIME_BUDGET,
+        min_attempt_seconds: float = AI_PROVIDER_MIN_ATTEMPT_SECONDS,
+        window_size: int = 50
+    ):
+        """
+        Inicializa o pool.
+        
+        Args:
+            providers: Provedores em ordem de preferência
+            strategy: STRATEGY_ORDERED ou STRATEGY_WEIGHTED
+            time_budget: Segundos disponíveis para todas as tentativas de uma requisição
+            min_attempt_seconds: Tempo mínimo restante para tentar mais um provedor
+            window_size: Chamadas recentes usadas na latência de cada provedor
+        """
+        self.providers = providers
+        self.strategy = strategy
+        self.time_budget = time_budget
+        self.min_attempt_seconds = min_attempt_seconds
+        self._lock = threading.Lock()
+        self._breakers = {
+            provider.name: CircuitBreaker(
+                failure_rate=AI_PROVIDER_BREAKER_FAILURE_RATE,
+                min_calls=AI_PROVIDER_BREAKER_MIN_CALLS,
+                open_seconds=AI_PROVIDER_BREAKER_OPEN_SECONDS
+            )
+            for provider in providers
+        }
+        self._latencies: Dict[str, Deque[float]] = {p.name: deque(maxlen=window_size) for p in providers}
+        self._counts = {p.name: {'calls': 0, 'failures': 0, 'served': 0} for p in providers}
+        self._failovers = 0
+        self._exhausted = 0
+    
+    def _p50(self, name: str) -> Optional[float]:
+        latencies = sorted(self._latencies[name])
+        return latencies[len(latencies) // 2] if latencies else None
+    
+    def candidates(self) -> List[LLMProvider]:
+        """Provedores na ordem em que serão tentados (circuitos abertos por último)."""
+        healthy = [p for p in self.providers if self._breakers[p.name].state != OPEN]
+        blocked = [p for p in self.providers if p not in healthy]
+        if self.strategy == STRATEGY_WEIGHTED and len(healthy) > 1:
+            healthy = self._weighted_order(healthy)
+        return healthy + blocked
+    
+    def _weighted_order(self, providers: List[LLMProvider]) -> List[LLMProvider]:
+        """Sorteio sem reposição, com peso maior para provedores com menos erros e mais rápidos."""
+        with self._lock:
+            weights = []
+            for provider in providers:
+                failure_rate = self._breakers[provider.name].stats()['failure_rate']
+                p50 = self._p50(provider.name) or 1.0
+                weights.append(max(1 - failure_rate, 0.05) / max(p50, 0.05))
+        remaining = list(zip(providers, weights))
+        ordered = []
+        while remaining:
+            pick = random.choices(range(len(remaining)), weights=[w for _, w in remaining])[0]
+            ordered.append(remaining.pop(pick)[0])
+        return ordered
+    
+    def _record(self, provider: LLMProvider, seconds: float, ok: bool) -> None:
+        breaker = self._breakers[provider.name]
+        if ok:
+            breaker.record_success()
+        else:
+            breaker.record_failure()
+        with self._lock:
+            counts = self._counts[provider.name]
+            counts['calls'] += 1
+            if ok:
+                counts['served'] += 1
+                self._latencies[provider.name].append(seconds)
+            else:
+                counts['failures'] += 1
+    
+    def _attempts(self) -> Iterator[tuple]:
+        """(provedor, timeout) de cada tentativa, enquanto houver tempo."""
+        deadline = time.monotonic() + self.time_budget
+        for attempt, provider in enumerate(self.candidates()):
+            remaining = deadline - time.monotonic()
+            if remaining < self.min_attempt_seconds:
+                break
+            if attempt:
+                with self._lock:
+                    self._failovers += 1
+                print(f"🔀 Tentando o provedor de IA '{provider.name}'")
+            yield provider, remaining
+    
+    def _exhausted_error(self, errors: List[str]) -> ExternalAPIError:
+        with self._lock:
+            self._exhausted += 1
+        detail = '; '.join(errors) or 'tempo esgotado'
+        return ExternalAPIError(f"Erro nos provedores de IA ({detail})")
+    
+    def complete(self, tier: str, messages: List[Dict[str, str]], **params) -> str:
+        """
+        Gera a resposta inteira, com failover entre os provedores.
+        
+        Raises:
+            ExternalAPIError: Se todos os provedores falharem ou o tempo acabar
+        """
+        errors = []
+        for provider, timeout in self._attempts():
+            started = time.monotonic()
+            try:
+                text = provider.complete(tier, messages, timeout=timeout, **params)
+            except Exception as e:
+                self._record(provider, time.monotonic() - started, ok=False)
+                print(f"⚠️ Provedor de IA '{provider.name}' falhou: {e}")
+                errors.append(f"{provider.name}: {e}")
+                continue
+            self._record(provider, time.monotonic() - started, ok=True)
+            return text
+        raise self._exhausted_error(errors)
+    
+    def stream(self, tier: str, messages: List[Dict[str, str]], **params) -> Iterator[str]:
+        """
+        Gera a resposta em pedaços, com failover enquanto nenhum pedaço foi enviado.
+        
+        Depois do primeiro pedaço, uma falha é levantada (o texto já saiu).
+        """
+        errors = []
+        for provider, timeout in self._attempts():
+            started = time.monotonic()
+            sent = False
+            try:
+                for chunk in provider.stream(tier, messages, timeout=timeout, **params):
+                    sent = True
+                    yield chunk
+            except Exception as e:
+                self._record(provider, time.monotonic() - started, ok=False)
+                if sent:
+                    raise ExternalAPIError(f"Erro no provedor de IA '{provider.name}': {e}")
+                print(f"⚠️ Provedor de IA '{provider.name}' falhou: {e}")
+                errors.append(f"{provider.name}: {e}")
+                continue
+            self._record(provider, time.monotonic() - started, ok=True)
+            return
+        raise self._exhausted_error(errors)
+    
+    def stats(self) -> Dict[str, Any]:
+        """Saúde, latência e uso de cada provedor, e quantas requisições precisaram de failover."""
+        breakers = {name: breaker.stats() for name, breaker in self._breakers.items()}
+        with self._lock:
+            providers = {}
+            for provider in self.providers:
+                name = provider.name
+                p50 = self._p50(name)
+                providers[name] = {
+                    **self._counts[name],
+                    'circuit': breakers[name]['state'],
+                    'failure_rate': breakers[name]['failure_rate'],
+                    'p50_ms': round(p50 * 1000, 1) if p50 is not None else None
+                }
+            return {
+                'strategy': self.strategy,
+                'order': [provider.name for provider in self.providers],
+                'providers': providers,
+                'failovers': self._failovers,
+                'exhausted': self._exhausted
+            }
+
+
+def _build_provider(name: str) -> Optional[LLMProvider]:
+    """Cria um provedor pelo nome, a partir das variáveis de ambiente (None se não configurado)."""
+    if name == 'groq':
+        api_key = os.getenv("GROQ_API_KEY")
+        if not api_key:
+            return None
+        return GroqProvider(api_key, {
+            TIER_LARGE: GROQ_MODEL,
+            TIER_SMALL: os.getenv("GROQ_SMALL_MODEL", GROQ_SMALL_MODEL),
+            TIER_VISION: os.getenv("GROQ_VISION_MODEL", GROQ_VISION_MODEL)
+        })
+    if name == 'openai':
+        base_url, model = os.getenv("OPENAI_COMPAT_BASE_URL"), os.getenv("OPENAI_COMPAT_MODEL")
+        if not base_url or not model:
+            return None
+        return OpenAICompatibleProvider(
+            base_url,
+            os.getenv("OPENAI_COMPAT_API_KEY"),
+            {
+                TIER_LARGE: model,
+                TIER_SMALL: os.getenv("OPENAI_COMPAT_SMALL_MODEL", model),
+                TIER_VISION: os.getenv("OPENAI_COMPAT_VISION_MODEL", model)
+            },
+            json_mode=os.getenv("OPENAI_COMPAT_JSON_MODE", "true").lower() == "true"
+        )
+    if name == 'local':
+        return LocalProvider()
+    print(f"⚠️  Aviso: provedor de IA desconhecido '{name}'")
+    return None
+
+
+def build_provider_pool() -> ProviderPool:
+    """Cria o pool de provedores a partir das variáveis de ambiente."""
+    providers = []
+    for name in os.getenv("AI_PROVIDERS", "groq").split(','):
+        name = name.strip().lower()
+        if not name:
+            continue
+        try:
+            provider = _build_provider(name)
+        except Exception as e:
+            # Se houver erro na inicialização, permite continuar sem o provedor
+            print(f"⚠️  Aviso: Erro ao inicializar o provedor de IA '{name}': {e}")
+            provider = None
+        if provider:
+            providers.append(provider)
+    return ProviderPool(
+        providers,
+        strategy=os.getenv("AI_PROVIDER_STRATEGY", STRATEGY_ORDERED).lower(),
+        time_budget=float(os.getenv("AI_REQUEST_TIME_BUDGET", AI_REQUEST_TIME_BUDGET))
+    )
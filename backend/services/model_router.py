@@ -0,0 +1,198 @@
+"""
+Escolha do modelo da IA por turno (modelo pequeno e rápido x modelo grande).
+
+Um classificador local (regras baratas, sem chamar a IA) reconhece turnos
+fáceis, como saudações e "me fala sobre <título>". Esses vão para o modelo
+pequeno, desde que a latência e a taxa de erros recentes dele estejam boas.
+Se a resposta do modelo pequeno não passar na validação ou indicar pouca
+confiança, o AIService escala o turno para o modelo grande.
+"""
+import re
+import threading
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from utils.text import strip_accents
+
+TIER_SMALL = 'small'
+TIER_LARGE = 'large'
+# Modelo com visão, usado nos turnos com imagem (fora do roteamento pequeno x grande)
+TIER_VISION = 'vision'
+
+# Tipos de turno fácil reconhecidos pelo classificador
+KIND_GREETING = 'greeting'
+KIND_TITLE_LOOKUP = 'title_lookup'
+
+_GREETING_PATTERN = re.compile(
+    r"^(oi+|ola|opa|e ai|eai|bom dia|boa tarde|boa noite|hello|hi|hey|"
+    r"obrigad[oa]|valeu|vlw|tchau|ate mais)\b[\s!.,?]*(tudo bem|tudo bom|chatcine)?[\s!.,?]*$"
+)
+_TITLE_LOOKUP_PATTERN = re.compile(
+    r"^(me )?(fale|fala|conte|conta|quero saber)( mais| um pouco)? sobre "
+    r"(o |a |os |as )?(filme |serie |desenho |anime )?(?P<title>.+?)[\s!.?]*$"
+    r"|^tell me about (the )?(movie |film |show |series )?(?P<title_en>.+?)[\s!.?]*$"
+)
+# Títulos longos demais costumam ser descrições de cena, não nomes
+_MAX_TITLE_WORDS = 8
+
+
+@dataclass
+class Route:
+    """Modelo escolhido para um turno."""
+    tier: str
+    model: str
+    reason: str
+    kind: Optional[str] = None
+
+
+def classify_turn(user_message: str, has_image: bool = False) -> Optional[str]:
+    """
+    Classifica um turno como fácil, sem chamar a IA.
+    
+    Args:
+        user_message: Mensagem do usuário
+        has_image: Se o turno traz imagem
+    
+    Returns:
+        KIND_GREETING, KIND_TITLE_LOOKUP ou None (turno que exige o modelo grande)
+    """
+    if has_image or not user_message:
+        return None
+    text = ' '.join(strip_accents(user_message).lower().split())
+    if _GREETING_PATTERN.match(text):
+        return KIND_GREETING
+    match = _TITLE_LOOKUP_PATTERN.match(text)
+    if match:
+        title = match.group('title') or match.group('title_en') or ''
+        if 0 < len(title.split()) <= _MAX_TITLE_WORDS:
+            return KIND_TITLE_LOOKUP
+    return None
+
+
+class ModelRouter:
+    """Roteia turnos entre o modelo pequeno e o grande com base em regras e latência medida."""
+    
+    def __init__(
+        self,
+        small_model: str,
+        large_model: str,
+        window_size: int = 100,
+        min_samples: int = 10,
+        max_error_rate: float = 0.3,
+        probe_every: int = 10
+    ):
+        """
+        Inicializa o roteador.
+        
+        Args:
+            small_model: Modelo rápido para turnos fáceis
+            large_model: Modelo usado nos demais turnos e nas escalações
+            window_size: Chamadas recentes consideradas por modelo
+            min_samples: Latências mínimas de cada modelo antes de compará-las
+            max_error_rate: Taxa de erros recente acima da qual o modelo pequeno é evitado
+            probe_every: Enquanto o modelo pequeno é evitado, 1 a cada N turnos fáceis
+                ainda vai para ele, para renovar as estatísticas
+        """
+        self.models = {TIER_SMALL: small_model, TIER_LARGE: large_model}
+        self.min_samples = min_samples
+        self.max_error_rate = max_error_rate
+        self.probe_every = probe_every
+        self._avoided = 0  # turnos fáceis desviados para o modelo grande desde o último teste
+        self._lock = threading.Lock()
+        self._latencies: Dict[str, Deque[float]] = {tier: deque(maxlen=window_size) for tier in self.models}
+        self._outcomes: Dict[str, Deque[bool]] = {tier: deque(maxlen=window_size) for tier in self.models}
+        self._routed = {tier: 0 for tier in self.models}
+        self._escalations: Dict[str, int] = {}
+    
+    def route(self, user_message: str, image_file: Optional[Any] = None) -> Route:
+        """Escolhe o modelo de um turno."""
+        kind = classify_turn(user_message, has_image=bool(image_file))
+        if kind is None:
+            route = Route(TIER_LARGE, self.models[TIER_LARGE], 'complex')
+        else:
+            healthy, reason = self._small_is_healthy()
+            with self._lock:
+                if not healthy:
+                    self._avoided += 1
+                    if self._avoided >= self.probe_every:
+                        healthy, reason = True, 'probe'
+                if healthy:
+                    self._avoided = 0
+            tier = TIER_SMALL if healthy else TIER_LARGE
+            route = Route(tier, self.models[tier], reason or kind, kind)
+        with self._lock:
+            self._routed[route.tier] += 1
+        return route
+    
+    def _small_is_healthy(self) -> Tuple[bool, str]:
+        """O modelo pequeno está respondendo bem e mais rápido que o grande?"""
+        with self._lock:
+            outcomes = self._outcomes[TIER_SMALL]
+            if len(outcomes) >= self.min_samples:
+                error_rate = outcomes.count(False) / len(outcomes)
+                if error_rate > self.max_error_rate:
+                    return False, 'small_errors'
+            small, large = self._latencies[TIER_SMALL], self._latencies[TIER_LARGE]
+            if len(small) >= self.min_samples and len(large) >= self.min_samples:
+                if _percentile(small, 0.5) >= _percentile(large, 0.5):
+                    return False, 'small_slow'
+        return True, ''
+    
+    def accepts(self, route: Route, parsed: Optional[Dict[str, Any]]) -> bool:
+        """
+        Verifica se a resposta (já validada) do modelo pequeno é confiável.
+        
+        Pedidos de informação sobre um título precisam identificar o filme;
+        uma resposta em texto nesse caso indica dúvida do modelo pequeno.
+        """
+        if not parsed:
+            return False
+        if route.kind == KIND_TITLE_LOOKUP:
+            return parsed.get('type') == 'movie'
+        return True
+    
+    def record(self, tier: str, seconds: float, ok: bool) -> None:
+        """Registra uma chamada a um modelo (latência só conta nas bem-sucedidas)."""
+        with self._lock:
+            self._outcomes[tier].append(ok)
+            if ok:
+                self._latencies[tier].append(seconds)
+    
+    def record_escalation(self, reason: str) -> None:
+        """Registra um turno escalado do modelo pequeno para o grande."""
+        with self._lock:
+            self._escalations[reason] = self._escalations.get(reason, 0) + 1
+    
+    def stats(self) -> Dict[str, Any]:
+        """Distribuição dos turnos entre os modelos, latências e escalações."""
+        with self._lock:
+            total = sum(self._routed.values())
+            tiers = {}
+            for tier, model in self.models.items():
+                latencies, outcomes = self._latencies[tier], self._outcomes[tier]
+                tiers[tier] = {
+                    'model': model,
+                    'routed': self._routed[tier],
+                    'share': round(self._routed[tier] / total, 3) if total else 0.0,
+                    'calls': len(outcomes),
+                    'error_rate': round(outcomes.count(False) / len(outcomes), 3) if outcomes else 0.0,
+                    'p50_ms': _latency_ms(latencies, 0.5),
+                    'p95_ms': _latency_ms(latencies, 0.95)
+                }
+            escalated = sum(self._escalations.values())
+            return {
+                'tiers': tiers,
+                'escalations': escalated,
+                'escalation_rate': round(escalated / self._routed[TIER_SMALL], 3) if self._routed[TIER_SMALL] else 0.0,
+                'escalation_reasons': dict(self._escalations)
+            }
+
+
+def _percentile(values: Deque[float], p: float) -> float:
+    ordered: List[float] = sorted(values)
+    return ordered[min(int(len(ordered) * p), len(ordered) - 1)]
+
+
+def _latency_ms(values: Deque[float], p: float) -> Optional[float]:
+    return round(_percentile(values, p) * 1000, 1) if values else None
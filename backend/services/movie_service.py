@@ -1,69 +1,632 @@
 """
 Serviço para integração com API TMDB.
 """
+import math
 import os
+import threading
 import requests
-from typing import Optional, List
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Optional, List, Dict, Any, Tuple
 
-from dto.movie_dto import MovieDTO, RecommendationDTO, RecommendationsDTO
-from core.exceptions import ExternalAPIError, NotFoundError
+from dto.movie_dto import MovieDTO, MovieLookupDTO, RecommendationDTO, RecommendationsDTO
+from core.constants import (
+    TMDB_POOL_SIZE, TMDB_MAX_RETRIES, TMDB_RETRY_BACKOFF,
+    TMDB_CONNECT_TIMEOUT, TMDB_READ_TIMEOUT,
+    TMDB_BREAKER_FAILURE_RATE, TMDB_BREAKER_MIN_CALLS, TMDB_BREAKER_WINDOW_SIZE,
+    TMDB_BREAKER_WINDOW_SECONDS, TMDB_BREAKER_OPEN_SECONDS, TMDB_BREAKER_MAX_OPEN_SECONDS,
+    TMDB_RATE_LIMIT_PER_SECOND, TMDB_RATE_LIMIT_BURST, TMDB_RATE_LIMIT_BACKGROUND_RESERVE,
+    TMDB_RATE_LIMIT_MAX_WAIT,
+    TMDB_HEDGE_PERCENTILE, TMDB_HEDGE_MAX_RATE, TMDB_HEDGE_MIN_SAMPLES, TMDB_HEDGE_MIN_DELAY,
+    TMDB_CACHE_TTLS, TMDB_CACHE_STALE_SECONDS, TMDB_CACHE_MAX_ENTRIES,
+    TMDB_SEARCH_PENDING_FIELDS, TMDB_NEGATIVE_CACHE_TTL, TMDB_NEGATIVE_CACHE_MAX_ENTRIES
+)
+from core.exceptions import ChatCineException, ExternalAPIError, NotFoundError
+from services.title_catalog import get_title_catalog, CatalogMatch
+from utils.circuit_breaker import CircuitBreaker, OPEN
+from utils.hedging import Hedger
+from utils.http_client import RETRY_STATUS_CODES, get_pooled_session, parse_retry_after
+from utils.rate_limiter import background_priority, current_priority, get_token_bucket
+from utils.singleflight import SingleFlight
+from utils.sqlite_cache import SQLiteCache, CacheEntry
+from utils.text import normalize_title
+from utils.ttl_cache import TTLCache
 
+DEFAULT_CACHE_PATH = Path(__file__).parent.parent / 'instance' / 'tmdb_cache.db'
+DEFAULT_RATE_LIMIT_PATH = Path(__file__).parent.parent / 'instance' / 'tmdb_rate_limit.state'
 
-class MovieService:
-    """Serviço para buscar informações de filmes."""
+# Executor para revalidação em segundo plano de entradas stale
+_refresh_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='tmdb-refresh')
+_refreshing = set()
+_refreshing_lock = threading.Lock()
+
+# Executor para as buscas de detalhes em lote que não estão em cache
+_batch_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("TMDB_POOL_SIZE", TMDB_POOL_SIZE)),
+    thread_name_prefix='tmdb-batch'
+)
+
+# Coalescência de buscas idênticas concorrentes (compartilhada entre instâncias)
+_search_flight = SingleFlight()
+_details_flight = SingleFlight()
+
+# Circuit breaker do TMDB (compartilhado pelos serviços síncrono e assíncrono)
+_breaker = CircuitBreaker(
+    failure_rate=float(os.getenv("TMDB_BREAKER_FAILURE_RATE", TMDB_BREAKER_FAILURE_RATE)),
+    min_calls=int(os.getenv("TMDB_BREAKER_MIN_CALLS", TMDB_BREAKER_MIN_CALLS)),
+    window_size=int(os.getenv("TMDB_BREAKER_WINDOW_SIZE", TMDB_BREAKER_WINDOW_SIZE)),
+    window_seconds=float(os.getenv("TMDB_BREAKER_WINDOW_SECONDS", TMDB_BREAKER_WINDOW_SECONDS)),
+    open_seconds=float(os.getenv("TMDB_BREAKER_OPEN_SECONDS", TMDB_BREAKER_OPEN_SECONDS)),
+    max_open_seconds=float(os.getenv("TMDB_BREAKER_MAX_OPEN_SECONDS", TMDB_BREAKER_MAX_OPEN_SECONDS))
+)
+
+# Hedge das requisições síncronas (usado só com TMDB_HEDGING_ENABLED=true)
+_hedger = Hedger(
+    percentile=float(os.getenv("TMDB_HEDGE_PERCENTILE", TMDB_HEDGE_PERCENTILE)),
+    max_hedge_rate=float(os.getenv("TMDB_HEDGE_MAX_RATE", TMDB_HEDGE_MAX_RATE)),
+    min_samples=int(os.getenv("TMDB_HEDGE_MIN_SAMPLES", TMDB_HEDGE_MIN_SAMPLES)),
+    min_delay=float(os.getenv("TMDB_HEDGE_MIN_DELAY", TMDB_HEDGE_MIN_DELAY)),
+    max_workers=int(os.getenv("TMDB_POOL_SIZE", TMDB_POOL_SIZE))
+)
+
+# Títulos que o TMDB não resolveu (busca vazia ou tipo de mídia não suportado)
+_negative_cache = TTLCache(
+    max_entries=int(os.getenv("TMDB_NEGATIVE_CACHE_MAX_ENTRIES", TMDB_NEGATIVE_CACHE_MAX_ENTRIES)),
+    ttl=float(os.getenv("TMDB_NEGATIVE_CACHE_TTL", TMDB_NEGATIVE_CACHE_TTL))
+)
+
+
+class MovieServiceBase:
+    """
+    Configuração, cache e conversão de respostas do TMDB.
+    
+    Não faz I/O de rede: é compartilhada pelo serviço síncrono e pelo
+    assíncrono, que só diferem no transporte HTTP.
+    """
     
     def __init__(self):
-        """Inicializa o serviço de filmes."""
+        """Inicializa configuração e cache."""
         self.api_key = os.getenv("TMDB_API_KEY")
         self.base_url = "https://api.themoviedb.org/3"
         self.image_base_url = "https://image.tmdb.org/t/p/w500"
+        self.language = "pt-BR"
+        
+        # Timeouts separados: (conexão, leitura)
+        self.timeout = (
+            float(os.getenv("TMDB_CONNECT_TIMEOUT", TMDB_CONNECT_TIMEOUT)),
+            float(os.getenv("TMDB_READ_TIMEOUT", TMDB_READ_TIMEOUT))
+        )
+        self.pool_size = int(os.getenv("TMDB_POOL_SIZE", TMDB_POOL_SIZE))
+        self.max_retries = int(os.getenv("TMDB_MAX_RETRIES", TMDB_MAX_RETRIES))
+        self.retry_backoff = float(os.getenv("TMDB_RETRY_BACKOFF", TMDB_RETRY_BACKOFF))
+        
+        # Cache persistente compartilhado entre workers e reinícios
+        self.cache = None
+        if os.getenv("TMDB_CACHE_ENABLED", "true").lower() == "true":
+            self.cache = SQLiteCache(
+                os.getenv("TMDB_CACHE_PATH", str(DEFAULT_CACHE_PATH)),
+                max_entries=int(os.getenv("TMDB_CACHE_MAX_ENTRIES", TMDB_CACHE_MAX_ENTRIES))
+            )
+        
+        # Cota de requisições compartilhada pelos workers do host
+        self.rate_limiter = None
+        if os.getenv("TMDB_RATE_LIMIT_ENABLED", "true").lower() == "true":
+            self.rate_limiter = get_token_bucket(
+                os.getenv("TMDB_RATE_LIMIT_PATH", str(DEFAULT_RATE_LIMIT_PATH)),
+                rate=float(os.getenv("TMDB_RATE_LIMIT_PER_SECOND", TMDB_RATE_LIMIT_PER_SECOND)),
+                burst=int(os.getenv("TMDB_RATE_LIMIT_BURST", TMDB_RATE_LIMIT_BURST)),
+                background_reserve=int(os.getenv(
+                    "TMDB_RATE_LIMIT_BACKGROUND_RESERVE", TMDB_RATE_LIMIT_BACKGROUND_RESERVE
+                ))
+            )
+        
+        # Modo rápido: monta o MovieDTO direto do resultado da busca
+        self.fast_search = os.getenv("TMDB_FAST_SEARCH", "true").lower() == "true"
+        
+        # Catálogo offline de títulos (None se não importado)
+        self.catalog = get_title_catalog()
     
     def is_configured(self) -> bool:
         """Verifica se o serviço está configurado."""
         return bool(self.api_key)
     
-    def search_movie(self, movie_name: str) -> Optional[MovieDTO]:
+    def _query_params(self, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Monta a query string completa de uma requisição."""
+        query = {'api_key': self.api_key, 'language': self.language}
+        query.update(params or {})
+        return query
+    
+    def _check_circuit(self) -> None:
+        """
+        Falha rápido enquanto o circuito do TMDB estiver aberto.
+        
+        Raises:
+            ExternalAPIError: Se o circuito não aceitar a chamada
+        """
+        if not _breaker.allow_request():
+            retry_in = math.ceil(_breaker.retry_in()) or 1
+            raise ExternalAPIError(
+                f"O catálogo de filmes está temporariamente indisponível. Tente novamente em {retry_in}s.",
+                status_code=503
+            )
+    
+    def _quota_request(self) -> Tuple[str, float]:
+        """Prioridade da chamada atual e sua espera máxima por um token."""
+        priority = current_priority()
+        return priority, TMDB_RATE_LIMIT_MAX_WAIT[priority]
+    
+    def _quota_exceeded(self) -> ExternalAPIError:
+        """Erro para quando a fila da cota do TMDB não anda a tempo."""
+        return ExternalAPIError(
+            "Muitas buscas de filmes ao mesmo tempo. Tente novamente em instantes.",
+            status_code=503
+        )
+    
+    def _release_circuit(self) -> None:
+        """Devolve a vaga liberada por _check_circuit quando a chamada não chega a ser feita."""
+        _breaker.release()
+    
+    def _record_outcome(self, status_code: Optional[int], retry_after: Optional[str] = None) -> None:
+        """Registra no circuit breaker o resultado de uma chamada (None = falha de rede)."""
+        if status_code is None or status_code in RETRY_STATUS_CODES:
+            _breaker.record_failure(parse_retry_after(retry_after))
+        else:
+            _breaker.record_success()
+    
+    def _should_revalidate(self) -> bool:
+        """Entradas stale só são revalidadas com o circuito fechado ou em teste."""
+        return _breaker.state != OPEN
+    
+    def _cache_key(self, path: str, params: Optional[Dict[str, Any]]) -> str:
+        """
+        Gera a chave de cache (sem a api_key) para uma requisição.
+        
+        O texto de busca entra normalizado, para que variações de grafia
+        do mesmo título compartilhem a entrada (com o artigo inicial, que
+        distingue títulos como 'The Hard' e 'Hard').
+        """
+        params = dict(params or {})
+        if 'query' in params:
+            params['query'] = normalize_title(params['query'], keep_article=True)
+        items = sorted(params.items())
+        query = "&".join(f"{k}={v}" for k, v in items)
+        return f"{self.language}|{path}?{query}"
+    
+    def _cache_lookup(self, endpoint: str, key: str) -> Optional[CacheEntry]:
+        """Busca uma resposta no cache persistente."""
+        if not self.cache:
+            return None
+        return self.cache.get(f"tmdb:{endpoint}", key)
+    
+    def _store(self, endpoint: str, key: str, data: Dict[str, Any]) -> None:
+        """Grava uma resposta no cache com o TTL do endpoint."""
+        if not self.cache:
+            return
+        # Buscas sem resultado não são guardadas aqui
+        if endpoint == "search" and not data.get("results"):
+            return
+        self.cache.set(
+            f"tmdb:{endpoint}",
+            key,
+            data,
+            ttl=TMDB_CACHE_TTLS.get(endpoint, TMDB_CACHE_TTLS['details']),
+            stale_ttl=TMDB_CACHE_STALE_SECONDS
+        )
+    
+    def _details_request(self, movie_id: int, media_type: str) -> Tuple[str, Dict[str, Any]]:
+        """Caminho e parâmetros da requisição de detalhes de um título."""
+        return f"/{media_type}/{movie_id}", {'append_to_response': 'external_ids'}
+    
+    def _is_details_cached(self, movie_id: int, media_type: str) -> bool:
+        """Verifica se os detalhes de um título já estão no cache persistente."""
+        path, params = self._details_request(movie_id, media_type)
+        return self._cache_lookup("details", self._cache_key(path, params)) is not None
+    
+    def _search_key(self, movie_name: str, year: Optional[str], fast: bool) -> Tuple[str, str, str, bool]:
+        """Chave de coalescência de uma busca por nome."""
+        return (normalize_title(movie_name, keep_article=True), year or "", self.language, fast)
+    
+    def _negative_key(self, movie_name: str, year: Optional[str] = None) -> Tuple[str, str, str]:
+        """Chave do cache negativo: título normalizado, ano e idioma."""
+        return (normalize_title(movie_name, keep_article=True), year or "", self.language)
+    
+    def _is_known_miss(self, movie_name: str, year: Optional[str] = None) -> bool:
+        """Verifica se o título falhou recentemente na busca."""
+        if self._negative_key(movie_name, year) in _negative_cache:
+            print(f"🚫 Título sem resultado recente (cache negativo): {movie_name}")
+            return True
+        return False
+    
+    def _remember_miss(self, movie_name: str, year: Optional[str] = None) -> None:
+        """Registra um título que o TMDB não resolveu."""
+        _negative_cache.set(self._negative_key(movie_name, year), True)
+    
+    def _catalog_lookup(self, movie_name: str, year: Optional[str] = None) -> Optional[CatalogMatch]:
+        """Resolve o título pelo catálogo offline, sem chamar a busca do TMDB."""
+        if not self.catalog:
+            return None
+        match = self.catalog.lookup(movie_name, year)
+        if match:
+            print(f"📚 Título resolvido pelo catálogo: {match.title} (ID: {match.tmdb_id}, score: {match.score:.2f})")
+        return match
+    
+    def _remember_year(self, movie_dto: MovieDTO) -> None:
+        """Registra no catálogo o ano de um título resolvido."""
+        if self.catalog and movie_dto.id:
+            self.catalog.record_year(movie_dto.id, movie_dto.media_type, movie_dto.year)
+    
+    def _year_search_requests(self, movie_name: str, year: str) -> List[Tuple[str, Dict[str, Any], str]]:
+        """Buscas filtradas por ano (o /search/multi não aceita filtro de ano)."""
+        return [
+            ("/search/movie", {'query': movie_name, 'year': year}, "movie"),
+            ("/search/tv", {'query': movie_name, 'first_air_date_year': year}, "tv"),
+        ]
+    
+    def _pick_search_result(
+        self,
+        data: Dict[str, Any],
+        movie_name: str = "",
+        year: Optional[str] = None,
+        require_year: bool = False,
+        media_type: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Escolhe o resultado da busca a ser usado.
+        
+        Entre os resultados de filme/série, prefere o do ano pedido e depois
+        o de título (normalizado) idêntico; no empate vale a ordem do TMDB.
+        
+        Args:
+            data: Resposta da busca
+            movie_name: Título buscado
+            year: Ano pedido (opcional)
+            require_year: Descarta resultados de outros anos
+            media_type: Tipo a atribuir aos resultados (buscas fora do /search/multi)
+        
+        Returns:
+            Resultado com media_type suportado ou None
+        """
+        if not data.get("results"):
+            print("⚠️ Nenhum resultado encontrado na busca")
+            return None
+        
+        wanted = normalize_title(movie_name)
+        wanted_year = year or ""
+        best, best_rank = None, None
+        for position, result in enumerate(data["results"]):
+            if media_type:
+                result = {**result, "media_type": media_type}
+            if result.get("media_type") not in ["movie", "tv"] or not result.get("id"):
+                continue
+            
+            date = result.get("release_date") or result.get("first_air_date") or ""
+            result_year = date[:4]
+            same_year = bool(wanted_year) and result_year == wanted_year
+            near_year = result_year.isdigit() and wanted_year.isdigit() \
+                and abs(int(result_year) - int(wanted_year)) == 1
+            if require_year and not (same_year or near_year):
+                continue
+            
+            titles = {
+                normalize_title(result.get(field) or "")
+                for field in ("title", "original_title", "name", "original_name")
+            }
+            rank = (same_year, wanted in titles, near_year, -position)
+            if best_rank is None or rank > best_rank:
+                best, best_rank = result, rank
+        
+        if best is None:
+            print(f"⚠️ Nenhum resultado de filme/série compatível para: {movie_name} ({year or 's/ ano'})")
+            return None
+        
+        print(f"🔍 Resultado encontrado: {best.get('title') or best.get('name')} (ID: {best.get('id')}, Tipo: {best['media_type']})")
+        print(f"🖼️ Poster path no resultado da busca: {best.get('poster_path')}")
+        return best
+    
+    def _build_movie_from_search(self, result: Dict[str, Any], media_type: str) -> MovieDTO:
+        """Monta um MovieDTO parcial a partir de um resultado de /search/multi."""
+        title = result.get("title") if media_type == "movie" else result.get("name", "Desconhecido")
+        release_date = result.get("release_date") if media_type == "movie" else result.get("first_air_date", "")
+        poster_path = result.get("poster_path")
+        
+        return MovieDTO(
+            id=result["id"],
+            title=title,
+            year=release_date[:4] if release_date else "N/A",
+            poster_url=f"{self.image_base_url}{poster_path}" if poster_path else None,
+            rating=f"{result.get('vote_average', 0):.1f}/10",
+            overview=result.get("overview") or "Sinopse não disponível.",
+            media_type=media_type,
+            pending_fields=list(TMDB_SEARCH_PENDING_FIELDS)
+        )
+    
+    def _build_movie_dto(self, item: Dict[str, Any], media_type: str) -> MovieDTO:
+        """Monta um MovieDTO completo a partir da resposta de detalhes."""
+        print(f"📥 Resposta completa da API TMDB (primeiros campos): {list(item.keys())[:10]}")
+        
+        title = item.get("title") if media_type == "movie" else item.get("name", "Desconhecido")
+        release_date = item.get("release_date") if media_type == "movie" else item.get("first_air_date", "")
+        year = release_date[:4] if release_date else "N/A"
+        
+        poster_path = item.get("poster_path")
+        print(f"🖼️ Poster path retornado pela API: {poster_path} (tipo: {type(poster_path)})")
+        
+        poster_url = None
+        if poster_path:
+            # O TMDB retorna poster_path com barra inicial (ex: "/abc123.jpg")
+            # e image_base_url já termina com "/t/p/w500", então concatenamos diretamente
+            poster_url = f"{self.image_base_url}{poster_path}"
+            print(f"✅ Poster URL construída: {poster_url}")  # Debug
+        else:
+            print(f"❌ Poster path não encontrado para: {title}")  # Debug
+            print(f"📋 Campos disponíveis no item: {list(item.keys())}")
+        
+        movie_dto = MovieDTO(
+            id=item["id"],
+            title=title,
+            year=year,
+            poster_url=poster_url,
+            genres=", ".join([g["name"] for g in item.get("genres", [])]) or "Não disponível",
+            rating=f"{item.get('vote_average', 0):.1f}/10",
+            overview=item.get("overview") or "Sinopse não disponível.",
+            imdb_id=item.get("external_ids", {}).get("imdb_id"),
+            media_type=media_type
+        )
+        movie_dict = movie_dto.to_dict()
+        print(f"📦 MovieDTO criado: {movie_dict}")  # Debug
+        print(f"🔍 Poster URL no dict: {movie_dict.get('poster_url')}")  # Debug
+        return movie_dto
+    
+    def _build_recommendations(self, data: Dict[str, Any], media_type: str) -> RecommendationsDTO:
+        """Monta o RecommendationsDTO a partir da resposta de recomendações."""
+        recommendations = []
+        for rec in data.get("results", [])[:5]:
+            poster_path = rec.get("poster_path")
+            rec_media_type = rec.get("media_type", media_type)
+            
+            poster_url = None
+            if poster_path:
+                # O TMDB retorna poster_path com barra inicial (ex: "/abc123.jpg")
+                # e image_base_url já termina com "/t/p/w500", então concatenamos diretamente
+                poster_url = f"{self.image_base_url}{poster_path}"
+            
+            recommendations.append(RecommendationDTO(
+                id=rec.get("id"),
+                title=rec.get("title") if rec_media_type == "movie" else rec.get("name", "Desconhecido"),
+                year=(rec.get("release_date") or rec.get("first_air_date", ""))[:4],
+                poster_url=poster_url
+            ))
+        
+        return RecommendationsDTO(recommendations=recommendations)
+
+
+class MovieService(MovieServiceBase):
+    """Serviço para buscar informações de filmes."""
+    
+    def __init__(self):
+        """Inicializa o serviço de filmes."""
+        super().__init__()
+        # Sessão compartilhada entre instâncias (pool + keep-alive + retry)
+        self.session = get_pooled_session(
+            "tmdb",
+            pool_size=self.pool_size,
+            max_retries=self.max_retries,
+            backoff_factor=self.retry_backoff
+        )
+        # Hedge: repete requisições lentas e usa a primeira resposta
+        self.hedging = os.getenv("TMDB_HEDGING_ENABLED", "false").lower() == "true"
+    
+    def _request(self, path: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Executa um GET na API do TMDB usando a sessão compartilhada.
+        
+        Args:
+            path: Caminho do endpoint (ex: '/search/multi')
+            params: Parâmetros adicionais da query string
+        
+        Returns:
+            Corpo da resposta decodificado
+        
+        Raises:
+            requests.exceptions.RequestException: Em falhas de rede ou HTTP
+            ExternalAPIError: Se a cota esgotar ou o circuit breaker estiver aberto
+        """
+        # Circuito aberto falha na hora, sem gastar cota nem esperar na fila
+        self._check_circuit()
+        try:
+            self._acquire_token()
+        except ExternalAPIError:
+            self._release_circuit()
+            raise
+        try:
+            response = self._send(path, params)
+        except requests.exceptions.RequestException:
+            self._record_outcome(None)
+            raise
+        self._record_outcome(response.status_code, response.headers.get("Retry-After"))
+        response.raise_for_status()
+        return response.json()
+    
+    def _send(self, path: str, params: Optional[Dict[str, Any]]) -> requests.Response:
+        """Envia o GET, com hedge se habilitado."""
+        def get():
+            return self.session.get(
+                f"{self.base_url}{path}",
+                params=self._query_params(params),
+                timeout=self.timeout
+            )
+        
+        if not self.hedging:
+            return get()
+        return _hedger.run(get, can_hedge=self._hedge_token)
+    
+    def _hedge_token(self) -> bool:
+        """A cópia de hedge só sai se houver um token livre agora (sem fila)."""
+        if self.rate_limiter is None:
+            return True
+        return self.rate_limiter.try_acquire(current_priority()) == 0
+    
+    def _acquire_token(self) -> None:
+        """Espera na fila por um token da cota do TMDB."""
+        if self.rate_limiter is None:
+            return
+        priority, max_wait = self._quota_request()
+        if not self.rate_limiter.acquire(priority, max_wait):
+            raise self._quota_exceeded()
+    
+    def _cached_request(
+        self,
+        endpoint: str,
+        path: str,
+        params: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        Executa um GET passando pelo cache persistente.
+        
+        Entradas frescas são servidas direto do cache. Entradas stale são
+        servidas imediatamente e revalidadas em segundo plano (exceto com o
+        circuito aberto, quando continuam sendo servidas sem revalidação).
+        
+        Args:
+            endpoint: Tipo do endpoint ('search', 'details', 'recommendations'),
+                      usado para escolher o TTL
+            path: Caminho do endpoint
+            params: Parâmetros adicionais da query string
+        
+        Returns:
+            Corpo da resposta decodificado
+        """
+        key = self._cache_key(path, params)
+        entry = self._cache_lookup(endpoint, key)
+        if entry is not None:
+            if entry.is_stale and self._should_revalidate():
+                self._schedule_refresh(endpoint, path, params, key)
+            return entry.value
+        
+        data = self._request(path, params)
+        self._store(endpoint, key, data)
+        return data
+    
+    def _schedule_refresh(
+        self,
+        endpoint: str,
+        path: str,
+        params: Optional[Dict[str, Any]],
+        key: str
+    ) -> None:
+        """Agenda a revalidação de uma entrada stale (uma por chave)."""
+        with _refreshing_lock:
+            if key in _refreshing:
+                return
+            _refreshing.add(key)
+        
+        def refresh():
+            try:
+                with background_priority():
+                    self._store(endpoint, key, self._request(path, params))
+            except (requests.exceptions.RequestException, ExternalAPIError) as e:
+                print(f"⚠️ Falha ao revalidar cache do TMDB ({path}): {e}")
+            finally:
+                with _refreshing_lock:
+                    _refreshing.discard(key)
+        
+        _refresh_executor.submit(refresh)
+    
+    def search_movie(
+        self,
+        movie_name: str,
+        year: Optional[str] = None,
+        fast: Optional[bool] = None
+    ) -> Optional[MovieDTO]:
         """
         Busca informações de um filme pelo nome.
         
+        No modo rápido o MovieDTO é montado com o próprio resultado da busca
+        (uma única requisição). Os campos que a busca não traz ficam listados
+        em `pending_fields` e os detalhes são pré-carregados em segundo plano.
+        
         Args:
             movie_name: Nome do filme
-            
+            year: Ano de lançamento, usado para escolher entre remakes
+            fast: Usa o modo rápido (padrão: TMDB_FAST_SEARCH)
+        
         Returns:
             MovieDTO ou None se não encontrado
         """
         if not self.is_configured():
             raise ExternalAPIError("TMDB_API_KEY não configurada.")
         
+        fast = fast if fast is not None else self.fast_search
+        year = str(year) if year else None
+        key = self._search_key(movie_name, year, fast)
+        return _search_flight.do(key, lambda: self._search_movie(movie_name, year, fast))
+    
+    def _search_movie(self, movie_name: str, year: Optional[str], fast: bool) -> Optional[MovieDTO]:
+        """Executa a busca no TMDB (sem coalescência)."""
+        if self._is_known_miss(movie_name, year):
+            return None
+        
+        match = self._catalog_lookup(movie_name, year)
+        if match:
+            return self.get_movie_by_id(match.tmdb_id, match.media_type)
+        
         try:
-            search_url = f"{self.base_url}/search/multi"
-            params = {
-                'api_key': self.api_key,
-                'query': movie_name,
-                'language': 'pt-BR'
-            }
-            response = requests.get(search_url, params=params, timeout=10)
-            response.raise_for_status()
-            data = response.json()
+            data = self._cached_request("search", "/search/multi", {'query': movie_name})
             
-            if not data.get("results"):
-                print("⚠️ Nenhum resultado encontrado na busca")
+            result = self._pick_search_result(data, movie_name, year, require_year=bool(year))
+            if not result and year:
+                result = self._search_by_year(movie_name, year)
+            if not result and year:
+                # O ano informado pode estar errado: aceita o melhor resultado sem ele
+                result = self._pick_search_result(data, movie_name)
+            if not result:
+                self._remember_miss(movie_name, year)
                 return None
+            media_type = result["media_type"]
             
-            first_result = data["results"][0]
-            media_type = first_result.get("media_type")
+            if fast:
+                movie_dto = self._build_movie_from_search(result, media_type)
+                self.prefetch_details(movie_dto.id, media_type)
+                return movie_dto
             
-            print(f"🔍 Resultado encontrado: {first_result.get('title') or first_result.get('name')} (ID: {first_result.get('id')}, Tipo: {media_type})")
-            print(f"🖼️ Poster path no resultado da busca: {first_result.get('poster_path')}")
-            
-            if media_type not in ["movie", "tv"]:
-                print(f"⚠️ Tipo de mídia não suportado: {media_type}")
-                return None
-            
-            return self.get_movie_by_id(first_result["id"], media_type)
+            return self.get_movie_by_id(result["id"], media_type)
         except requests.exceptions.RequestException as e:
             raise ExternalAPIError(f"Erro ao buscar no TMDB: {str(e)}")
     
+    def _search_by_year(self, movie_name: str, year: str) -> Optional[Dict[str, Any]]:
+        """Refaz a busca com os filtros de ano do TMDB (filmes e depois séries)."""
+        for path, params, media_type in self._year_search_requests(movie_name, year):
+            data = self._cached_request("search", path, params)
+            result = self._pick_search_result(data, movie_name, year, media_type=media_type)
+            if result:
+                return result
+        return None
+    
+    def prefetch_details(self, movie_id: int, media_type: str = "movie") -> None:
+        """Aquece o cache de detalhes em segundo plano."""
+        def prefetch():
+            try:
+                with background_priority():
+                    self.get_movie_by_id(movie_id, media_type)
+            except ExternalAPIError as e:
+                print(f"⚠️ Falha ao pré-carregar detalhes ({media_type}/{movie_id}): {e.message}")
+        
+        _refresh_executor.submit(prefetch)
+    
+    def enrich_movie(self, movie: MovieDTO) -> MovieDTO:
+        """
+        Completa os campos pendentes de um MovieDTO parcial.
+        
+        Args:
+            movie: DTO possivelmente montado no modo rápido
+        
+        Returns:
+            DTO completo (ou o próprio DTO se já estiver completo)
+        """
+        if movie.is_complete():
+            return movie
+        return self.get_movie_by_id(movie.id, movie.media_type) or movie
+    
     def get_movie_by_id(self, movie_id: int, media_type: str = "movie") -> Optional[MovieDTO]:
         """
         Busca detalhes de um filme pelo ID.
@@ -71,61 +634,66 @@ class MovieService:
         Args:
             movie_id: ID do filme no TMDB
             media_type: Tipo de mídia ('movie' ou 'tv')
-            
+        
         Returns:
             MovieDTO ou None se não encontrado
         """
         if not self.is_configured():
             raise ExternalAPIError("TMDB_API_KEY não configurada.")
         
+        key = (media_type, int(movie_id), self.language)
+        return _details_flight.do(key, lambda: self._get_movie_by_id(movie_id, media_type))
+    
+    def _get_movie_by_id(self, movie_id: int, media_type: str) -> Optional[MovieDTO]:
+        """Executa a busca de detalhes no TMDB (sem coalescência)."""
         try:
-            details_url = f"{self.base_url}/{media_type}/{movie_id}"
-            params = {
-                'api_key': self.api_key,
-                'language': 'pt-BR',
-                'append_to_response': 'external_ids'
-            }
-            response = requests.get(details_url, params=params, timeout=10)
-            response.raise_for_status()
-            item = response.json()
-            
-            print(f"📥 Resposta completa da API TMDB (primeiros campos): {list(item.keys())[:10]}")
-            
-            title = item.get("title") if media_type == "movie" else item.get("name", "Desconhecido")
-            release_date = item.get("release_date") if media_type == "movie" else item.get("first_air_date", "")
-            year = release_date[:4] if release_date else "N/A"
-            
-            poster_path = item.get("poster_path")
-            print(f"🖼️ Poster path retornado pela API: {poster_path} (tipo: {type(poster_path)})")
-            
-            poster_url = None
-            if poster_path:
-                # O TMDB retorna poster_path com barra inicial (ex: "/abc123.jpg")
-                # e image_base_url já termina com "/t/p/w500", então concatenamos diretamente
-                poster_url = f"{self.image_base_url}{poster_path}"
-                print(f"✅ Poster URL construída: {poster_url}")  # Debug
-            else:
-                print(f"❌ Poster path não encontrado para: {title}")  # Debug
-                print(f"📋 Campos disponíveis no item: {list(item.keys())}")
-            
-            movie_dto = MovieDTO(
-                id=item.get("id"),
-                title=title,
-                year=year,
-                poster_url=poster_url,
-                genres=", ".join([g["name"] for g in item.get("genres", [])]) or "Não disponível",
-                rating=f"{item.get('vote_average', 0):.1f}/10",
-                overview=item.get("overview") or "Sinopse não disponível.",
-                imdb_id=item.get("external_ids", {}).get("imdb_id"),
-                media_type=media_type
-            )
-            movie_dict = movie_dto.to_dict()
-            print(f"📦 MovieDTO criado: {movie_dict}")  # Debug
-            print(f"🔍 Poster URL no dict: {movie_dict.get('poster_url')}")  # Debug
+            path, params = self._details_request(movie_id, media_type)
+            item = self._cached_request("details", path, params)
+            movie_dto = self._build_movie_dto(item, media_type)
+            self._remember_year(movie_dto)
             return movie_dto
         except requests.exceptions.RequestException as e:
             raise ExternalAPIError(f"Erro ao buscar detalhes no TMDB: {str(e)}")
     
+    def get_movies_by_ids(self, items: List[Tuple[int, str]]) -> List[MovieLookupDTO]:
+        """
+        Busca detalhes de vários filmes/séries de uma vez.
+        
+        Os itens já em cache são montados na hora e os demais são buscados
+        no TMDB em paralelo. A falha de um item não afeta os outros.
+        
+        Args:
+            items: Pares (movie_id, media_type)
+        
+        Returns:
+            Lista de MovieLookupDTO na mesma ordem de `items`
+        """
+        if not self.is_configured():
+            raise ExternalAPIError("TMDB_API_KEY não configurada.")
+        
+        keys = [(int(movie_id), media_type) for movie_id, media_type in items]
+        results: Dict[Tuple[int, str], MovieLookupDTO] = {}
+        pending = {}
+        for key in dict.fromkeys(keys):
+            if self._is_details_cached(*key):
+                results[key] = self._lookup_movie(*key)
+            else:
+                pending[key] = _batch_executor.submit(self._lookup_movie, *key)
+        
+        for key, future in pending.items():
+            results[key] = future.result()
+        return [results[key] for key in keys]
+    
+    def _lookup_movie(self, movie_id: int, media_type: str) -> MovieLookupDTO:
+        """Busca um item do lote, convertendo falhas em erro do próprio item."""
+        try:
+            movie = self.get_movie_by_id(movie_id, media_type)
+        except ChatCineException as e:
+            return MovieLookupDTO(id=movie_id, media_type=media_type, error=e.message)
+        if movie is None:
+            return MovieLookupDTO(id=movie_id, media_type=media_type, error="Filme não encontrado.")
+        return MovieLookupDTO(id=movie_id, media_type=media_type, movie=movie)
+    
     def get_recommendations(self, movie_id: int, media_type: str = "movie") -> RecommendationsDTO:
         """
         Busca recomendações baseadas em um filme.
@@ -133,7 +701,7 @@ class MovieService:
         Args:
             movie_id: ID do filme
             media_type: Tipo de mídia
-            
+        
         Returns:
             RecommendationsDTO com lista de recomendações
         """
@@ -141,35 +709,24 @@ class MovieService:
             raise ExternalAPIError("TMDB_API_KEY não configurada.")
         
         try:
-            url = f"{self.base_url}/{media_type}/{movie_id}/recommendations"
-            params = {
-                'api_key': self.api_key,
-                'language': 'pt-BR',
-                'page': 1
-            }
-            response = requests.get(url, params=params, timeout=10)
-            response.raise_for_status()
-            data = response.json()
-            
-            recommendations = []
-            for rec in data.get("results", [])[:5]:
-                poster_path = rec.get("poster_path")
-                rec_media_type = rec.get("media_type", media_type)
-                
-                poster_url = None
-                if poster_path:
-                    # O TMDB retorna poster_path com barra inicial (ex: "/abc123.jpg")
-                    # e image_base_url já termina com "/t/p/w500", então concatenamos diretamente
-                    poster_url = f"{self.image_base_url}{poster_path}"
-                
-                recommendations.append(RecommendationDTO(
-                    id=rec.get("id"),
-                    title=rec.get("title") if rec_media_type == "movie" else rec.get("name", "Desconhecido"),
-                    year=(rec.get("release_date") or rec.get("first_air_date", ""))[:4],
-                    poster_url=poster_url
-                ))
-            
-            return RecommendationsDTO(recommendations=recommendations)
+            data = self._cached_request(
+                "recommendations",
+                f"/{media_type}/{movie_id}/recommendations",
+                {'page': 1}
+            )
+            return self._build_recommendations(data, media_type)
         except requests.exceptions.RequestException as e:
             raise ExternalAPIError(f"Erro ao buscar recomendações no TMDB: {str(e)}")
-
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Retorna métricas do cliente TMDB para monitoramento."""
+        return {
+            'singleflight': {
+                'search': _search_flight.stats(),
+                'details': _details_flight.stats()
+            },
+            'negative_cache': _negative_cache.stats(),
+            'circuit_breaker': _breaker.stats(),
+            'rate_limiter': self.rate_limiter.stats() if self.rate_limiter else None,
+            'hedging': _hedger.stats() if self.hedging else None
+        }
@@ -0,0 +1,90 @@
+"""
+Montagem do histórico do prompt dentro de um orçamento de tokens.
+
+As mensagens guardam a própria contagem de tokens (calculada na escrita), então
+encaixar o histórico é só somar números: o histórico é percorrido da mensagem
+mais recente para a mais antiga até o orçamento acabar.
+"""
+import threading
+from typing import Any, Dict, List, Tuple
+
+from utils.tokens import estimate_tokens
+
+
+class PromptBudget:
+    """Encaixa o histórico do chat no orçamento de tokens do prompt."""
+    
+    def __init__(self, budget: int):
+        """
+        Inicializa o orçamento.
+        
+        Args:
+            budget: Tokens de entrada por requisição (sistema + histórico + mensagem atual)
+        """
+        self.budget = budget
+        self._lock = threading.Lock()
+        self._requests = 0
+        self._tokens_total = 0
+        self._tokens_max = 0
+        self._trimmed_requests = 0
+        self._dropped_total = 0
+    
+    def fit(
+        self,
+        fixed_tokens: int,
+        history: List[Dict[str, Any]],
+        record: bool = True
+    ) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+        """
+        Seleciona as mensagens mais recentes que cabem no orçamento.
+        
+        Args:
+            fixed_tokens: Tokens que sempre vão ao prompt (sistema e mensagem atual)
+            history: Mensagens em ordem cronológica, com 'content' em texto e,
+                se conhecido, 'token_count'
+            record: Se o uso entra nas estatísticas
+        
+        Returns:
+            (mensagens mantidas em ordem cronológica, relatório do orçamento)
+        """
+        available = self.budget - fixed_tokens
+        kept, history_tokens = [], 0
+        for message in reversed(history):
+            tokens = message.get('token_count') or estimate_tokens(message['content'])
+            if history_tokens + tokens > available:
+                break
+            kept.append(message)
+            history_tokens += tokens
+        kept.reverse()
+        
+        report = {
+            'budget': self.budget,
+            'used': fixed_tokens + history_tokens,
+            'history_tokens': history_tokens,
+            'kept': len(kept),
+            'dropped': len(history) - len(kept)
+        }
+        if record:
+            self._record(report)
+        return kept, report
+    
+    def _record(self, report: Dict[str, int]) -> None:
+        with self._lock:
+            self._requests += 1
+            self._tokens_total += report['used']
+            self._tokens_max = max(self._tokens_max, report['used'])
+            if report['dropped']:
+                self._trimmed_requests += 1
+                self._dropped_total += report['dropped']
+    
+    def stats(self) -> Dict[str, Any]:
+        """Uso do orçamento e mensagens descartadas desde o início do processo."""
+        with self._lock:
+            return {
+                'budget': self.budget,
+                'requests': self._requests,
+                'avg_tokens': round(self._tokens_total / self._requests, 1) if self._requests else 0.0,
+                'max_tokens': self._tokens_max,
+                'trimmed_requests': self._trimmed_requests,
+                'dropped_messages': self._dropped_total
+            }
@@ -0,0 +1,132 @@
+"""
+Reparo das respostas da IA que não chegam como JSON válido.
+
+Cada resposta passa por etapas cada vez mais caras, parando na primeira
+que produz um objeto aprovado por validate_ai_response:
+    1. decodificação normal (resposta limpa)
+    2. conserto local da sintaxe (utils/json_repair)
+    3. no máximo JSON_REPAIR_MAX_REASKS novos pedidos à IA, com o erro encontrado
+    4. resposta só em texto, sem nenhum JSON, vira uma resposta do tipo "text"
+O resultado de cada turno (limpo, reparado ou falho) fica registrado.
+"""
+import threading
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Optional, Tuple
+
+from schemas import validate_ai_response
+from utils.json_extractor import extract_json
+from utils.json_repair import repair_json
+
+OUTCOME_CLEAN = 'clean'
+OUTCOME_REPAIRED = 'repaired'
+OUTCOME_FAILED = 'failed'
+
+METHOD_LOCAL = 'local'
+METHOD_REASK = 'reask'
+METHOD_PROSE = 'prose'
+
+
+class ResponseRepairer:
+    """Valida a resposta da IA e tenta repará-la antes de desistir do turno."""
+    
+    def __init__(self, reask: Optional[Callable[[str, str], str]] = None, max_reasks: int = 1):
+        """
+        Inicializa o reparador.
+        
+        Args:
+            reask: Função (resposta inválida, erro) -> nova resposta da IA (opcional)
+            max_reasks: Número máximo de novos pedidos à IA por turno
+        """
+        self.reask = reask
+        self.max_reasks = max_reasks
+        self._lock = threading.Lock()
+        self._outcomes = {OUTCOME_CLEAN: 0, OUTCOME_REPAIRED: 0, OUTCOME_FAILED: 0}
+        self._methods = {METHOD_LOCAL: 0, METHOD_REASK: 0, METHOD_PROSE: 0}
+        self._reasks = 0
+        self._recent_errors: Deque[str] = deque(maxlen=20)
+    
+    def resolve(
+        self,
+        text: str,
+        parsed: Optional[Dict[str, Any]] = None,
+        record: bool = True
+    ) -> Tuple[Optional[Dict[str, Any]], str]:
+        """
+        Obtém a resposta validada de um turno.
+        
+        Args:
+            text: Texto da resposta da IA
+            parsed: Objeto já decodificado durante o streaming, se houver
+            record: Se o resultado entra nas estatísticas (respostas do cache não entram)
+        
+        Returns:
+            (resposta validada ou None, resultado: OUTCOME_CLEAN, OUTCOME_REPAIRED ou OUTCOME_FAILED)
+        """
+        data, error = _validate(parsed if parsed is not None else extract_json(text))
+        if data is not None:
+            return self._record(data, OUTCOME_CLEAN, None, record)
+        
+        repaired, _ = _validate(repair_json(text))
+        if repaired is not None:
+            return self._record(repaired, OUTCOME_REPAIRED, METHOD_LOCAL, record)
+        
+        reply = text
+        if self.reask:
+            for _ in range(self.max_reasks):
+                with self._lock:
+                    self._reasks += 1
+                try:
+                    retry_text = self.reask(reply, error)
+                except Exception as e:
+                    print(f"⚠️ Novo pedido de JSON à IA falhou: {e}")
+                    break
+                retried, retry_error = _validate(extract_json(retry_text) or repair_json(retry_text))
+                if retried is not None:
+                    return self._record(retried, OUTCOME_REPAIRED, METHOD_REASK, record)
+                reply, error = retry_text, retry_error
+        
+        # A IA respondeu só em texto: melhor mostrar o texto original do que falhar o turno
+        if text and '{' not in text:
+            return self._record({"type": "text", "content": text.strip()}, OUTCOME_REPAIRED, METHOD_PROSE, record)
+        
+        if record:
+            with self._lock:
+                self._recent_errors.append(error)
+        return self._record(None, OUTCOME_FAILED, None, record)
+    
+    def _record(
+        self,
+        data: Optional[Dict[str, Any]],
+        outcome: str,
+        method: Optional[str],
+        record: bool
+    ) -> Tuple[Optional[Dict[str, Any]], str]:
+        if record:
+            with self._lock:
+                self._outcomes[outcome] += 1
+                if method:
+                    self._methods[method] += 1
+        return data, outcome
+    
+    def stats(self) -> Dict[str, Any]:
+        """Turnos limpos, reparados (por etapa) e falhos."""
+        with self._lock:
+            total = sum(self._outcomes.values())
+            return {
+                **self._outcomes,
+                'repaired_by': dict(self._methods),
+                'reasks': self._reasks,
+                'repair_rate': round(self._outcomes[OUTCOME_REPAIRED] / total, 3) if total else 0.0,
+                'failure_rate': round(self._outcomes[OUTCOME_FAILED] / total, 3) if total else 0.0,
+                'recent_errors': list(self._recent_errors)
+            }
+
+
+def _validate(data: Optional[Dict[str, Any]]) -> Tuple[Optional[Dict[str, Any]], str]:
+    """(resposta validada, '') ou (None, descrição do erro)."""
+    if data is None:
+        return None, 'a resposta não contém um objeto JSON válido'
+    try:
+        return validate_ai_response(data), ''
+    except Exception as e:
+        return None, f"o objeto JSON não segue o formato esperado: {e}"
@@ -0,0 +1,187 @@
+"""
+Cache semântico de respostas da IA com índice vetorial local.
+
+Perguntas de um só turno que já tiveram resposta confirmada (filme
+encontrado no TMDB ou lista de recomendações) são guardadas com um
+embedding. Uma pergunta nova com similaridade acima do limite reaproveita
+a resposta estruturada sem chamar o Groq.
+
+O embedding é local e roda em CPU: hashing de palavras e trigramas de
+caracteres em um vetor normalizado. Pega variações de grafia e de
+ordem das palavras, não sinônimos.
+"""
+import os
+import random
+import threading
+import time
+import zlib
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    import numpy as np
+else:
+    try:
+        import numpy as np
+    except ImportError:  # pragma: no cover - numpy é opcional (build_semantic_cache devolve None)
+        np = None
+
+from core.constants import (
+    SEMANTIC_CACHE_DIMENSIONS, SEMANTIC_CACHE_THRESHOLD,
+    SEMANTIC_CACHE_MAX_ENTRIES, SEMANTIC_CACHE_AUDIT_RATE
+)
+from utils.text import normalize_title, trigrams
+
+
+# Palavras muito comuns, que pouco dizem sobre o que foi pedido
+STOPWORDS = {
+    'a', 'o', 'as', 'os', 'um', 'uma', 'de', 'do', 'da', 'dos', 'das', 'e', 'em', 'no', 'na',
+    'me', 'eu', 'voce', 'que', 'qual', 'sobre', 'por', 'para', 'pra', 'com',
+    'the', 'of', 'and', 'to', 'in', 'on', 'me', 'i', 'you', 'about', 'for', 'with'
+}
+
+
+class HashingEmbedder:
+    """Embedding por hashing de palavras e trigramas de caracteres."""
+    
+    def __init__(self, dimensions: int = SEMANTIC_CACHE_DIMENSIONS):
+        self.dimensions = dimensions
+    
+    def _features(self, text: str) -> List[Tuple[str, float]]:
+        words = [word for word in normalize_title(text).split() if word not in STOPWORDS]
+        features = [(f"w:{word}", 1.0) for word in words]
+        features += [(f"b:{a} {b}", 1.0) for a, b in zip(words, words[1:])]
+        for word in words:
+            features += [(f"c:{gram}", 0.5) for gram in trigrams(word)]
+        return features
+    
+    def embed(self, text: str) -> 'np.ndarray':
+        """Vetor L2-normalizado do texto (zeros se não houver palavras)."""
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        for feature, weight in self._features(text):
+            digest = zlib.crc32(feature.encode('utf-8'))
+            sign = 1.0 if digest & 0x80000000 else -1.0
+            vector[digest % self.dimensions] += sign * weight
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+
+class SemanticCache:
+    """Índice NumPy em memória de perguntas com resposta confirmada."""
+    
+    def __init__(
+        self,
+        threshold: float = SEMANTIC_CACHE_THRESHOLD,
+        max_entries: int = SEMANTIC_CACHE_MAX_ENTRIES,
+        audit_rate: float = SEMANTIC_CACHE_AUDIT_RATE,
+        dimensions: int = SEMANTIC_CACHE_DIMENSIONS
+    ):
+        """
+        Inicializa o cache.
+        
+        Args:
+            threshold: Similaridade de cosseno mínima para um acerto
+            max_entries: Número máximo de perguntas no índice (as mais antigas saem)
+            audit_rate: Fração dos acertos conferida com a IA
+            dimensions: Dimensão dos embeddings
+        """
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.audit_rate = audit_rate
+        self.embedder = HashingEmbedder(dimensions)
+        self._lock = threading.Lock()
+        self._vectors = np.zeros((max_entries, dimensions), dtype=np.float32)
+        self._entries: List[Optional[Dict[str, Any]]] = [None] * max_entries
+        self._size = 0
+        self._next = 0
+        self._lookups = 0
+        self._hits = 0
+        self._lookup_ms_total = 0.0
+        self._lookup_ms_max = 0.0
+        self._audits = 0
+        self._false_positives = 0
+    
+    def add(self, query: str, response_text: str, tmdb_id: Optional[int] = None) -> None:
+        """Guarda a resposta confirmada de uma pergunta."""
+        vector = self.embedder.embed(query)
+        if not vector.any():
+            return
+        with self._lock:
+            slot = self._next
+            self._vectors[slot] = vector
+            self._entries[slot] = {'query': query, 'response': response_text, 'tmdb_id': tmdb_id}
+            self._next = (slot + 1) % self.max_entries
+            self._size = min(self._size + 1, self.max_entries)
+    
+    def lookup(self, query: str) -> Optional[Dict[str, Any]]:
+        """
+        Busca a pergunta mais parecida já respondida.
+        
+        Returns:
+            Dicionário com 'query', 'response', 'tmdb_id', 'similarity' e
+            'audit' (se o acerto foi sorteado para conferência) ou None
+        """
+        started = time.perf_counter()
+        vector = self.embedder.embed(query)
+        match = None
+        with self._lock:
+            if self._size and vector.any():
+                scores = self._vectors[:self._size] @ vector
+                best = int(np.argmax(scores))
+                similarity = float(scores[best])
+                entry = self._entries[best]
+                if entry is not None and similarity >= self.threshold:
+                    match = dict(entry, similarity=similarity, slot=best)
+            
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            self._lookups += 1
+            self._lookup_ms_total += elapsed_ms
+            self._lookup_ms_max = max(self._lookup_ms_max, elapsed_ms)
+            if match:
+                self._hits += 1
+        
+        if match:
+            match['audit'] = random.random() < self.audit_rate
+        return match
+    
+    def record_audit(self, match: Dict[str, Any], agreed: bool) -> None:
+        """Registra a conferência de um acerto; um falso positivo sai do índice."""
+        with self._lock:
+            self._audits += 1
+            if agreed:
+                return
+            self._false_positives += 1
+            slot = match['slot']
+            entry = self._entries[slot]
+            if entry and entry['query'] == match['query']:
+                self._vectors[slot] = 0
+                self._entries[slot] = None
+        print(f"⚠️ Falso positivo no cache semântico: '{match['query']}' (similaridade {match['similarity']:.3f})")
+    
+    def stats(self) -> Dict[str, Any]:
+        """Retorna taxa de acerto, latência da busca e falsos positivos amostrados."""
+        with self._lock:
+            return {
+                'size': self._size,
+                'lookups': self._lookups,
+                'hits': self._hits,
+                'hit_rate': round(self._hits / self._lookups, 3) if self._lookups else 0.0,
+                'avg_lookup_ms': round(self._lookup_ms_total / self._lookups, 3) if self._lookups else 0.0,
+                'max_lookup_ms': round(self._lookup_ms_max, 3),
+                'audits': self._audits,
+                'false_positives': self._false_positives,
+                'false_positive_rate': round(self._false_positives / self._audits, 3) if self._audits else 0.0
+            }
+
+
+def build_semantic_cache() -> Optional[SemanticCache]:
+    """Cria o cache semântico a partir das variáveis de ambiente (None se desabilitado ou sem numpy)."""
+    if os.getenv("SEMANTIC_CACHE_ENABLED", "true").lower() != "true":
+        return None
+    if np is None:
+        print("⚠️ numpy não instalado: cache semântico desabilitado")
+        return None
+    return SemanticCache(
+        threshold=float(os.getenv("SEMANTIC_CACHE_THRESHOLD", SEMANTIC_CACHE_THRESHOLD)),
+        max_entries=int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", SEMANTIC_CACHE_MAX_ENTRIES)),
+        audit_rate=float(os.getenv("SEMANTIC_CACHE_AUDIT_RATE", SEMANTIC_CACHE_AUDIT_RATE))
+    )
@@ -0,0 +1,111 @@
+"""
+Resumo contínuo das sessões de chat longas.
+
+As mensagens que saem da janela recente são condensadas pela IA em um resumo
+guardado na própria sessão. O prompt passa a levar o resumo mais as mensagens
+recentes, então seu tamanho não cresce com a conversa. O resumo é atualizado
+em segundo plano, a cada CHAT_SUMMARY_EVERY_TURNS turnos, sem atrasar o chat.
+"""
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Set
+
+from flask import current_app
+
+from core.constants import CHAT_SUMMARY_EVERY_TURNS, CHAT_SUMMARY_RECENT_MESSAGES
+from dto.chat_dto import ChatHistoryDTO
+from repositories.chat_repository import ChatSessionRepository, ChatMessageRepository
+
+# Resumos gerados fora da requisição
+_summary_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='chat-summary')
+
+
+class SummaryService:
+    """Mantém o resumo contínuo de cada sessão de chat."""
+    
+    def __init__(self, ai_service):
+        """
+        Inicializa o serviço de resumos.
+        
+        Args:
+            ai_service: AIService usado para gerar os resumos
+        """
+        self.ai_service = ai_service
+        self.session_repo = ChatSessionRepository()
+        self.message_repo = ChatMessageRepository()
+        self.enabled = os.getenv("CHAT_SUMMARY_ENABLED", "true").lower() == "true"
+        # Mensagens (pergunta + resposta por turno) acumuladas antes de resumir
+        self.every_messages = 2 * int(os.getenv("CHAT_SUMMARY_EVERY_TURNS", CHAT_SUMMARY_EVERY_TURNS))
+        self.recent_messages = int(os.getenv("CHAT_SUMMARY_RECENT_MESSAGES", CHAT_SUMMARY_RECENT_MESSAGES))
+        self._lock = threading.Lock()
+        self._running: Set[int] = set()
+        self._refreshed = 0
+        self._failed = 0
+        self._duration_ms_total = 0.0
+    
+    def schedule(self, session_id: int) -> None:
+        """Agenda a atualização do resumo da sessão em segundo plano (se ainda não estiver rodando)."""
+        if not self.enabled or not self.ai_service.is_configured():
+            return
+        with self._lock:
+            if session_id in self._running:
+                return
+            self._running.add(session_id)
+        # O proxy não vale fora da requisição: a thread recebe o app real
+        app = current_app._get_current_object()  # type: ignore[attr-defined]
+        _summary_executor.submit(self._run, app, session_id)
+    
+    def _run(self, app, session_id: int) -> None:
+        try:
+            with app.app_context():
+                self.refresh(session_id)
+        except Exception as e:
+            with self._lock:
+                self._failed += 1
+            print(f"⚠️ Falha ao resumir a sessão {session_id}: {e}")
+        finally:
+            with self._lock:
+                self._running.discard(session_id)
+    
+    def refresh(self, session_id: int) -> bool:
+        """
+        Incorpora ao resumo as mensagens que saíram da janela recente.
+        
+        Só chama a IA quando há pelo menos `every_messages` mensagens novas
+        fora da janela.
+        
+        Returns:
+            True se o resumo foi atualizado
+        """
+        session = self.session_repo.get_by_id(session_id)
+        if not session:
+            return False
+        pending = self.message_repo.get_messages_after(session_id, session.summary_message_id)
+        to_fold = pending[:-self.recent_messages] if self.recent_messages else pending
+        if len(to_fold) < self.every_messages:
+            return False
+        
+        started = time.monotonic()
+        summary = self.ai_service.summarize(
+            session.summary,
+            ChatHistoryDTO.from_messages(to_fold).to_list()
+        )
+        self.session_repo.update_summary(session, summary, to_fold[-1].id)
+        with self._lock:
+            self._refreshed += 1
+            self._duration_ms_total += (time.monotonic() - started) * 1000
+        print(f"📝 Resumo da sessão {session_id} atualizado ({len(to_fold)} mensagens incorporadas)")
+        return True
+    
+    def stats(self) -> Dict[str, Any]:
+        """Resumos gerados, falhas e duração média."""
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'refreshed': self._refreshed,
+                'failed': self._failed,
+                'running': len(self._running),
+                'avg_duration_ms': round(self._duration_ms_total / self._refreshed, 1) if self._refreshed else 0.0
+            }
@@ -0,0 +1,369 @@
+"""
+Catálogo offline de títulos do TMDB com índice de trigramas.
+
+Os dados vêm dos arquivos de exportação diária de IDs publicados pelo
+TMDB (http://files.tmdb.org/p/exports/), em JSON-lines compactado com gzip.
+Com o catálogo importado, um título pode ser resolvido para um ID do TMDB
+sem chamar o endpoint de busca. O índice em memória é carregado em segundo
+plano na inicialização do app; enquanto carrega, as buscas seguem para o TMDB.
+"""
+import gzip
+import heapq
+import json
+import os
+import sqlite3
+import threading
+from array import array
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from core.constants import (
+    TMDB_CATALOG_MIN_POPULARITY, TMDB_CATALOG_MIN_SCORE,
+    TMDB_CATALOG_MAX_POSTINGS, TMDB_CATALOG_MAX_CANDIDATES
+)
+from utils.text import normalize_title, trigrams
+
+DEFAULT_CATALOG_PATH = Path(__file__).parent.parent / 'instance' / 'tmdb_catalog.db'
+
+# Campo de título de cada tipo de exportação
+EXPORT_TITLE_FIELDS = {
+    'movie': 'original_title',
+    'tv': 'original_name'
+}
+
+
+@dataclass
+class CatalogMatch:
+    """Resultado de uma busca no catálogo."""
+    tmdb_id: int
+    media_type: str
+    title: str
+    score: float
+
+
+class TitleCatalog:
+    """Tabela local de títulos do TMDB e índice de trigramas em memória."""
+    
+    def __init__(self, path: str, min_popularity: float = TMDB_CATALOG_MIN_POPULARITY):
+        """
+        Inicializa o catálogo.
+        
+        Args:
+            path: Caminho do arquivo SQLite do catálogo
+            min_popularity: Popularidade mínima para entrar no índice em memória
+        """
+        self.path = str(path)
+        self.min_popularity = min_popularity
+        self._local = threading.local()
+        self._index_lock = threading.Lock()
+        self._index_loaded = False
+        self._loading = False
+        
+        # Índice em memória (listas paralelas indexadas pela posição da linha)
+        self._ids: array = array('l')
+        self._media_types: List[str] = []
+        self._titles: List[str] = []
+        self._years: List[Optional[str]] = []
+        self._known_years: Set[str] = set()
+        self._sizes: array = array('H')
+        self._exact: Dict[str, List[int]] = {}
+        self._positions: Dict[Tuple[str, int], int] = {}
+        self._postings: Dict[str, array] = {}
+        
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._connection().execute(
+            """
+            CREATE TABLE IF NOT EXISTS catalog_titles (
+                media_type TEXT NOT NULL,
+                tmdb_id INTEGER NOT NULL,
+                title TEXT NOT NULL,
+                normalized TEXT NOT NULL,
+                popularity REAL NOT NULL DEFAULT 0,
+                year TEXT,
+                PRIMARY KEY (media_type, tmdb_id)
+            )
+            """
+        )
+    
+    def _connection(self) -> sqlite3.Connection:
+        """Retorna a conexão da thread atual."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+    
+    def import_export(self, export_path: str, media_type: str, batch_size: int = 5000) -> int:
+        """
+        Importa um arquivo de exportação diária de IDs do TMDB.
+        
+        Args:
+            export_path: Caminho do arquivo .json.gz (ou .json)
+            media_type: 'movie' ou 'tv'
+            batch_size: Linhas por transação
+        
+        Returns:
+            Número de títulos importados
+        """
+        title_field = EXPORT_TITLE_FIELDS[media_type]
+        opener: Callable[..., Any] = open
+        if str(export_path).endswith('.gz'):
+            opener = gzip.open
+        conn = self._connection()
+        imported = 0
+        batch: List[Tuple] = []
+        
+        def flush():
+            # Preserva o ano já conhecido de títulos existentes
+            conn.executemany(
+                "INSERT INTO catalog_titles (media_type, tmdb_id, title, normalized, popularity) "
+                "VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (media_type, tmdb_id) DO UPDATE SET "
+                "title = excluded.title, normalized = excluded.normalized, "
+                "popularity = excluded.popularity",
+                batch
+            )
+            conn.commit()
+            batch.clear()
+        
+        with opener(export_path, 'rt', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    row = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                title = row.get(title_field)
+                if not title or row.get('adult'):
+                    continue
+                batch.append((
+                    media_type,
+                    row['id'],
+                    title,
+                    normalize_title(title),
+                    row.get('popularity') or 0
+                ))
+                imported += 1
+                if len(batch) >= batch_size:
+                    flush()
+        if batch:
+            flush()
+        
+        self.invalidate()
+        return imported
+    
+    def record_year(self, tmdb_id: int, media_type: str, year: str) -> None:
+        """Guarda o ano de um título (as exportações do TMDB não trazem o ano)."""
+        if not year or not year.isdigit():
+            return
+        try:
+            conn = self._connection()
+            conn.execute(
+                "UPDATE catalog_titles SET year = ? "
+                "WHERE media_type = ? AND tmdb_id = ? AND year IS NULL",
+                (year, media_type, tmdb_id)
+            )
+            conn.commit()
+        except sqlite3.Error as e:
+            print(f"⚠️ Falha ao gravar ano no catálogo: {e}")
+            return
+        
+        with self._index_lock:
+            idx = self._positions.get((media_type, tmdb_id))
+            if self._index_loaded and idx is not None and self._years[idx] is None:
+                self._years[idx] = year
+                self._known_years.add(year)
+    
+    def count(self) -> int:
+        """Número de títulos no catálogo."""
+        (total,) = self._connection().execute("SELECT COUNT(*) FROM catalog_titles").fetchone()
+        return total
+    
+    def invalidate(self) -> None:
+        """Descarta o índice em memória (recarregado na próxima busca)."""
+        with self._index_lock:
+            self._index_loaded = False
+    
+    def _load_index(self) -> None:
+        """Carrega o índice de trigramas a partir da tabela (sem travar as outras operações)."""
+        ids, media_types, titles, sizes = array('l'), [], [], array('H')
+        years: List[Optional[str]] = []
+        exact: Dict[str, List[int]] = {}
+        positions: Dict[Tuple[str, int], int] = {}
+        postings: Dict[str, array] = {}
+        
+        rows = self._connection().execute(
+            "SELECT tmdb_id, media_type, title, year FROM catalog_titles "
+            "WHERE popularity >= ? ORDER BY popularity DESC",
+            (self.min_popularity,)
+        )
+        for idx, (tmdb_id, media_type, title, year) in enumerate(rows):
+            # Normaliza de novo para acompanhar mudanças em normalize_title
+            normalized = normalize_title(title)
+            grams = trigrams(normalized)
+            ids.append(tmdb_id)
+            media_types.append(media_type)
+            titles.append(normalized)
+            years.append(year)
+            sizes.append(min(len(grams), 65535))
+            exact.setdefault(normalized, []).append(idx)
+            positions[(media_type, tmdb_id)] = idx
+            for gram in grams:
+                postings.setdefault(gram, array('l')).append(idx)
+        
+        with self._index_lock:
+            self._ids, self._media_types, self._titles = ids, media_types, titles
+            self._years, self._sizes = years, sizes
+            self._known_years = {year for year in years if year}
+            self._exact, self._positions, self._postings = exact, positions, postings
+            self._index_loaded = True
+        print(f"📚 Catálogo de títulos carregado: {len(ids)} títulos indexados")
+    
+    def warm_up(self) -> threading.Thread:
+        """Carrega o índice em segundo plano (chamado na inicialização do app)."""
+        thread = threading.Thread(target=self._ensure_index, name='title-catalog', daemon=True)
+        thread.start()
+        return thread
+    
+    def _ensure_index(self) -> bool:
+        """
+        Carrega o índice sob demanda.
+        
+        Returns:
+            False se outra thread ainda está carregando (quem chamou não espera)
+        """
+        with self._index_lock:
+            if self._index_loaded:
+                return True
+            if self._loading:
+                return False
+            self._loading = True
+        try:
+            self._load_index()
+        finally:
+            with self._index_lock:
+                self._loading = False
+        return True
+    
+    def lookup(self, title: str, year: Optional[str] = None) -> Optional[CatalogMatch]:
+        """
+        Resolve um título para um ID do TMDB.
+        
+        Tenta primeiro o título normalizado exato e depois a similaridade de
+        trigramas (coeficiente de Dice). Em caso de ambiguidade que o ano não
+        resolve, retorna None para que a busca na API seja usada.
+        
+        Args:
+            title: Título informado
+            year: Ano de lançamento (opcional)
+        
+        Returns:
+            CatalogMatch ou None se não houver correspondência confiável
+        """
+        normalized = normalize_title(title)
+        if not normalized or not self._ensure_index():
+            return None
+        # Nenhum título com este ano confirmado: nenhum candidato seria aceito
+        if year and year not in self._known_years:
+            return None
+        
+        candidates = self._exact.get(normalized)
+        if candidates:
+            idx = self._choose(candidates, year)
+            return self._match(idx, 1.0) if idx is not None else None
+        
+        # Trigramas comuns demais ("the", " a ") custam caro e quase não discriminam
+        query = trigrams(normalized)
+        counts: Dict[int, int] = {}
+        for gram in query:
+            postings = self._postings.get(gram)
+            if postings is None or len(postings) > TMDB_CATALOG_MAX_POSTINGS:
+                continue
+            for row in postings:
+                counts[row] = counts.get(row, 0) + 1
+        if year:
+            counts = {row: common for row, common in counts.items() if self._years[row] == year}
+        if not counts:
+            return None
+        
+        # Só os candidatos mais promissores têm a similaridade calculada com todos os trigramas
+        top = heapq.nlargest(TMDB_CATALOG_MAX_CANDIDATES, counts, key=counts.__getitem__)
+        scored = sorted(
+            (
+                (2 * len(query & trigrams(self._titles[row])) / (len(query) + self._sizes[row]), row)
+                for row in top
+            ),
+            reverse=True
+        )
+        best_score = scored[0][0]
+        if best_score < TMDB_CATALOG_MIN_SCORE:
+            return None
+        
+        # Empates no topo são tratados como candidatos equivalentes
+        tied = [row for score, row in scored if best_score - score < 1e-9]
+        idx = self._choose(sorted(tied), year)
+        return self._match(idx, best_score) if idx is not None else None
+    
+    def exact_count(self, title: str) -> int:
+        """Número de títulos indexados com exatamente este nome (normalizado)."""
+        normalized = normalize_title(title)
+        if not normalized or not self._ensure_index():
+            return 0
+        return len(self._exact.get(normalized, ()))
+    
+    def _choose(self, candidates: List[int], year: Optional[str]) -> Optional[int]:
+        """
+        Escolhe entre candidatos com o mesmo título (ordenados por popularidade).
+        
+        Sem ano, vence o mais popular. Com ano, só vale um candidato com aquele
+        ano confirmado: o catálogo indexa só o título original, e um título
+        traduzido pode coincidir com o original de outro filme. Sem ano
+        confirmado, a escolha fica para a busca do TMDB.
+        """
+        if not year:
+            return candidates[0]
+        
+        for idx in candidates:
+            if self._years[idx] == year:
+                return idx
+        return None
+    
+    def _match(self, idx: int, score: float) -> CatalogMatch:
+        """Monta o CatalogMatch de uma linha do índice."""
+        return CatalogMatch(
+            tmdb_id=self._ids[idx],
+            media_type=self._media_types[idx],
+            title=self._titles[idx],
+            score=score
+        )
+
+
+_catalog: Optional[TitleCatalog] = None
+_catalog_lock = threading.Lock()
+
+
+def get_title_catalog() -> Optional[TitleCatalog]:
+    """
+    Retorna o catálogo compartilhado do processo.
+    
+    Returns:
+        TitleCatalog ou None se desabilitado ou ainda não importado
+    """
+    global _catalog
+    if os.getenv("TMDB_CATALOG_ENABLED", "true").lower() != "true":
+        return None
+    
+    path = os.getenv("TMDB_CATALOG_PATH", str(DEFAULT_CATALOG_PATH))
+    if _catalog is not None and _catalog.path == path:
+        return _catalog
+    if not os.path.exists(path):
+        return None
+    
+    with _catalog_lock:
+        if _catalog is None or _catalog.path != path:
+            _catalog = TitleCatalog(
+                path,
+                min_popularity=float(os.getenv("TMDB_CATALOG_MIN_POPULARITY", TMDB_CATALOG_MIN_POPULARITY))
+            )
+        return _catalog
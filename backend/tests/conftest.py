@@ -13,9 +13,27 @@ from extensions import db
 from models import User, ChatSession, ChatMessage
 
 
+@pytest.fixture(autouse=True)
+def isolated_tmdb_cache(tmp_path, monkeypatch):
+    """Isola os caches, o catálogo e a cota do TMDB em arquivos temporários."""
+    monkeypatch.setenv("TMDB_CACHE_PATH", str(tmp_path / "tmdb_cache.db"))
+    monkeypatch.setenv("TMDB_CATALOG_PATH", str(tmp_path / "tmdb_catalog.db"))
+    monkeypatch.setenv("TMDB_RATE_LIMIT_PATH", str(tmp_path / "tmdb_rate_limit.state"))
+    monkeypatch.setenv("COMPLETION_CACHE_PATH", str(tmp_path / "completion_cache.db"))
+    # Testes que usam os caches de respostas da IA os habilitam explicitamente
+    monkeypatch.setenv("COMPLETION_CACHE_ENABLED", "false")
+    monkeypatch.setenv("SEMANTIC_CACHE_ENABLED", "false")
+    
+    from services import movie_service
+    movie_service._negative_cache.clear()
+    movie_service._breaker.reset()
+
+
 @pytest.fixture
-def app():
+def app(isolated_tmdb_cache):
     """Cria uma instância da aplicação para testes."""
+    # Depende do isolamento explicitamente: o pytest-flask pede o `app` em
+    # uma fixture autouse própria, antes das fixtures autouse deste arquivo
     app = create_app('testing')
     
     with app.app_context():
@@ -76,3 +76,27 @@ class TestMainRoutes:
         response = client.get('/recommendations/123', follow_redirects=True)
         assert response.status_code == 200
 
+
+
+class TestMovieApiRoutes:
+    """Testes para as rotas de filmes da API."""
+    
+    def test_batch_rejects_invalid_ids(self, client):
+        """Testa que a busca em lote valida os IDs."""
+        assert client.get('/api/movies?ids=603,abc').status_code == 400
+        assert client.get('/api/movies').status_code == 400
+    
+    def test_batch_returns_items_in_order(self, client, monkeypatch):
+        """Testa que a busca em lote aceita tipos por item e mantém a ordem."""
+        from controllers import chat_controller
+        from dto.movie_dto import MovieLookupDTO
+        
+        def fake_lookup(items):
+            return [MovieLookupDTO(id=movie_id, media_type=media_type, error="x") for movie_id, media_type in items]
+        
+        monkeypatch.setattr(chat_controller.movie_service, "get_movies_by_ids", fake_lookup)
+        response = client.get('/api/movies?ids=603,tv:1399')
+        
+        assert response.status_code == 200
+        content = response.get_json()["content"]
+        assert [(item["id"], item["media_type"]) for item in content] == [(603, "movie"), (1399, "tv")]
@@ -2,16 +2,33 @@
 Testes unitários para serviços.
 """
 import pytest
+import asyncio
+import gzip
 import json
 import sys
+import threading
+import time
 from pathlib import Path
 from unittest.mock import patch, MagicMock
 
+import httpx
+import requests
+
 # Adiciona o diretório raiz ao PYTHONPATH
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from services.ai_service import AIService
 from services.movie_service import MovieService
+from services.async_movie_service import AsyncMovieService
+from services.title_catalog import TitleCatalog
+from core.exceptions import ExternalAPIError
+from utils.circuit_breaker import CircuitBreaker
+from utils.hedging import Hedger
+from utils.json_extractor import JSONExtractor, extract_json
+from utils.json_stream import AIResponseStream
+from utils.rate_limiter import HostTokenBucket, current_priority
+from utils.singleflight import SingleFlight
+from utils.sqlite_cache import SQLiteCache
 
 
 class TestServices:
@@ -29,3 +46,1368 @@ class TestServices:
             movie_service = MovieService()
             assert movie_service is not None
 
+
+
+class TestMovieServiceTransport:
+    """Testes para o transporte HTTP do MovieService."""
+    
+    def test_session_is_shared_between_instances(self):
+        """Instâncias diferentes reutilizam o mesmo pool de conexões."""
+        assert MovieService().session is MovieService().session
+    
+    def test_request_uses_split_timeouts(self, monkeypatch):
+        """Requisições usam timeouts separados de conexão e leitura."""
+        monkeypatch.setenv("TMDB_API_KEY", "test-key")
+        service = MovieService()
+        response = MagicMock()
+        response.json.return_value = {"results": []}
+        
+        with patch.object(service.session, "get", return_value=response) as mock_get:
+            assert service.search_movie("Duna") is None
+        
+        _, kwargs = mock_get.call_args
+        assert kwargs["timeout"] == service.timeout
+        assert len(service.timeout) == 2
+        assert kwargs["params"]["query"] == "Duna"
+        assert kwargs["params"]["api_key"] == "test-key"
+
+
+class TestTMDBCache:
+    """Testes para o cache persistente de respostas do TMDB."""
+    
+    def test_cache_entry_becomes_stale(self, tmp_path):
+        """Entradas expiradas são servidas como stale dentro da janela."""
+        cache = SQLiteCache(str(tmp_path / "cache.db"))
+        cache.set("ns", "fresh", {"a": 1}, ttl=60)
+        cache.set("ns", "stale", {"b": 2}, ttl=-1, stale_ttl=60)
+        cache.set("ns", "gone", {"c": 3}, ttl=-2, stale_ttl=1)
+        
+        assert cache.get("ns", "fresh").is_stale is False
+        assert cache.get("ns", "stale").value == {"b": 2}
+        assert cache.get("ns", "stale").is_stale is True
+        assert cache.get("ns", "gone") is None
+    
+    def test_cache_evicts_least_recently_used(self, tmp_path):
+        """O cache remove as entradas menos usadas acima do limite."""
+        cache = SQLiteCache(str(tmp_path / "cache.db"), max_entries=2)
+        cache.set("ns", "a", 1, ttl=60)
+        cache.set("ns", "b", 2, ttl=60)
+        cache.get("ns", "a")
+        cache.set("ns", "c", 3, ttl=60)
+        
+        assert cache.get("ns", "a") is not None
+        assert cache.get("ns", "b") is None
+        assert cache.get("ns", "c") is not None
+    
+    def test_repeated_details_lookup_hits_cache(self, monkeypatch):
+        """A segunda busca pelo mesmo ID não chama a rede."""
+        monkeypatch.setenv("TMDB_API_KEY", "test-key")
+        response = MagicMock()
+        response.json.return_value = {"id": 603, "title": "Matrix", "release_date": "1999-03-31"}
+        
+        with patch.object(MovieService().session, "get", return_value=response) as mock_get:
+            first = MovieService().get_movie_by_id(603)
+            second = MovieService().get_movie_by_id(603)
+        
+        assert mock_get.call_count == 1
+        assert first == second
+
+
+class TestFastSearch:
+    """Testes para o modo rápido de busca."""
+    
+    def test_fast_search_builds_dto_from_search_hit(self, monkeypatch):
+        """O modo rápido faz uma única requisição e marca campos pendentes."""
+        monkeypatch.setenv("TMDB_API_KEY", "test-key")
+        service = MovieService()
+        response = MagicMock()
+        response.json.return_value = {"results": [{
+            "id": 438631, "media_type": "movie", "title": "Duna",
+            "release_date": "2021-09-15", "poster_path": "/duna.jpg",
+            "overview": "Paul Atreides...", "vote_average": 7.8
+        }]}
+        
+        with patch.object(service.session, "get", return_value=response) as mock_get, \
+                patch.object(service, "prefetch_details") as mock_prefetch:
+            movie = service.search_movie("Duna", fast=True)
+        
+        assert mock_get.call_count == 1
+        mock_prefetch.assert_called_once_with(438631, "movie")
+        assert movie.title == "Duna"
+        assert movie.year == "2021"
+        assert movie.poster_url.endswith("/duna.jpg")
+        assert movie.to_dict()["pending_fields"] == ["genres", "imdb_id"]
+
+
+class TestSingleFlight:
+    """Testes para a coalescência de chamadas concorrentes."""
+    
+    def test_concurrent_calls_share_one_execution(self):
+        """Chamadas simultâneas com a mesma chave executam uma única vez."""
+        flight = SingleFlight()
+        calls = []
+        
+        def slow_lookup():
+            calls.append(1)
+            time.sleep(0.1)
+            return "Duna"
+        
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(flight.do("duna", slow_lookup)))
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        assert len(calls) == 1
+        assert results == ["Duna"] * 5
+        assert flight.stats()["coalesced"] == 4
+    
+    def test_error_is_shared_and_not_cached(self):
+        """O erro da chamada líder é propagado e a próxima chamada executa de novo."""
+        flight = SingleFlight()
+        
+        def failing():
+            raise ValueError("falhou")
+        
+        with pytest.raises(ValueError):
+            flight.do("x", failing)
+        assert flight.do("x", lambda: 42) == 42
+        assert flight.stats()["executions"] == 2
+
+
+class TestAsyncMovieService:
+    """Testes para o serviço assíncrono de filmes."""
+    
+    def _service(self, handler):
+        """Cria o serviço com um transporte HTTP simulado."""
+        service = AsyncMovieService()
+        service._client = httpx.AsyncClient(
+            base_url=service.base_url,
+            transport=httpx.MockTransport(handler)
+        )
+        return service
+    
+    def test_concurrent_lookups_share_pool_and_dtos(self, monkeypatch):
+        """Buscas simultâneas retornam os mesmos DTOs do serviço síncrono."""
+        monkeypatch.setenv("TMDB_API_KEY", "test-key")
+        requested = []
+        
+        def handler(request):
+            requested.append(request.url.path)
+            movie_id = int(request.url.path.rsplit("/", 1)[-1])
+            return httpx.Response(200, json={"id": movie_id, "title": f"Filme {movie_id}"})
+        
+        async def run():
+            async with self._service(handler) as service:
+                return await asyncio.gather(
+                    service.get_movie_by_id(1),
+                    service.get_movie_by_id(2),
+                    service.get_movie_by_id(1)
+                )
+        
+        movies = asyncio.run(run())
+        assert [m.id for m in movies] == [1, 2, 1]
+        assert movies[0].title == "Filme 1"
+        assert sorted(requested) == ["/3/movie/1", "/3/movie/2"]
+    
+    def test_http_errors_become_external_api_error(self, monkeypatch):
+        """Falhas HTTP viram ExternalAPIError como no serviço síncrono."""
+        monkeypatch.setenv("TMDB_API_KEY", "test-key")
+        monkeypatch.setenv("TMDB_MAX_RETRIES", "0")
+        
+        async def run():
+            async with self._service(lambda request: httpx.Response(404)) as service:
+                await service.get_recommendations(1)
+        
+        with pytest.raises(ExternalAPIError):
+            asyncio.run(run())
+    
+    def test_fast_search_prefetches_details(self, monkeypatch):
+        """No modo rápido os detalhes são pré-carregados em segundo plano, como no serviço síncrono."""
+        monkeypatch.setenv("TMDB_API_KEY", "test-key")
+        requested = []
+        
+        def handler(request):
+            requested.append(request.url.path)
+            if request.url.path.endswith("/search/multi"):
+                return httpx.Response(200, json={"results": [
+                    {"id": 603, "media_type": "movie", "title": "Matrix", "release_date": "1999-03-31"}
+                ]})
+            return httpx.Response(200, json={"id": 603, "title": "Matrix"})
+        
+        async def run():
+            async with self._service(handler) as service:
+                movie = await service.search_movie("Matrix", fast=True)
+                await asyncio.gather(*service._prefetching)
+                return movie
+        
+        assert asyncio.run(run()).id == 603
+        assert requested == ["/3/search/multi", "/3/movie/603"]
+    
+    def test_cancelled_probe_releases_the_circuit(self, monkeypatch):
+        """Uma chamada de teste cancelada (timeout) não deixa o circuito preso em half_open."""
+        monkeypatch.setenv("TMDB_API_KEY", "test-key")
+        breaker = CircuitBreaker(min_calls=100)
+        monkeypatch.setattr("services.movie_service._breaker", breaker)
+        breaker.record_failure(retry_after=0.01)
+        time.sleep(0.02)
+        
+        async def slow(request):
+            await asyncio.sleep(5)
+            return httpx.Response(200, json={"results": []})
+        
+        async def run():
+            async with self._service(slow) as service:
+                await asyncio.wait_for(service.get_recommendations(987654), 0.1)
+        
+        with pytest.raises(asyncio.TimeoutError):
+            asyncio.run(run())
+        assert breaker.state == "half_open"
+        assert breaker.allow_request()
+
+
+class TestTitleCatalog:
+    """Testes para o catálogo offline de títulos."""
+    
+    def _catalog(self, tmp_path):
+        """Cria um catálogo a partir de uma exportação simulada do TMDB."""
+        export = tmp_path / "movie_ids.json.gz"
+        rows = [
+            {"adult": False, "id": 438631, "original_title": "Dune", "popularity": 90.0},
+            {"adult": False, "id": 841, "original_title": "Dune", "popularity": 20.0},
+            {"adult": False, "id": 157336, "original_title": "Interstellar", "popularity": 80.0},
+            {"adult": True, "id": 1, "original_title": "Interstellar XXX", "popularity": 5.0},
+        ]
+        with gzip.open(export, "wt", encoding="utf-8") as f:
+            f.write("\n".join(json.dumps(row) for row in rows))
+        catalog = TitleCatalog(str(tmp_path / "catalog.db"))
+        assert catalog.import_export(str(export), "movie") == 3
+        return catalog
+    
+    def test_exact_and_fuzzy_lookup(self, tmp_path):
+        """Títulos exatos e com erro de digitação são resolvidos sem rede."""
+        catalog = self._catalog(tmp_path)
+        
+        assert catalog.lookup("Interstellar").tmdb_id == 157336
+        assert catalog.lookup("interestellar").tmdb_id == 157336
+        assert catalog.lookup("Dune").tmdb_id == 438631
+        assert catalog.lookup("Poderoso Chefão") is None
+    
+    def test_year_disambiguates_remakes(self, tmp_path):
+        """O ano escolhe entre títulos iguais quando já é conhecido."""
+        catalog = self._catalog(tmp_path)
+        
+        assert catalog.lookup("Dune", year="1984") is None
+        catalog.record_year(841, "movie", "1984")
+        catalog.record_year(438631, "movie", "2021")
+        assert catalog.lookup("Dune", year="1984").tmdb_id == 841
+        assert catalog.lookup("Dune", year="2021").tmdb_id == 438631
+    
+    def test_single_candidate_needs_confirmed_year(self, tmp_path):
+        """Com ano informado, um candidato único de ano desconhecido fica para a busca do TMDB."""
+        catalog = self._catalog(tmp_path)
+        
+        assert catalog.lookup("Interstellar", year="2014") is None
+        catalog.record_year(157336, "movie", "2014")
+        assert catalog.lookup("Interstellar", year="2014").tmdb_id == 157336
+        assert catalog.lookup("Interstellar", year="1999") is None
+    
+    def test_lookups_do_not_wait_for_the_warm_up(self, tmp_path, monkeypatch):
+        """Enquanto o índice carrega em segundo plano, as buscas seguem para o TMDB em vez de esperar."""
+        catalog = self._catalog(tmp_path)
+        release = threading.Event()
+        load = catalog._load_index
+        
+        def slow_load():
+            release.wait(5)
+            load()
+        
+        monkeypatch.setattr(catalog, "_load_index", slow_load)
+        thread = catalog.warm_up()
+        time.sleep(0.05)
+        
+        assert catalog.lookup("Interstellar") is None
+        release.set()
+        thread.join(5)
+        assert catalog.lookup("Interstellar").tmdb_id == 157336
+    
+    def test_common_trigrams_are_skipped(self, tmp_path, monkeypatch):
+        """Trigramas presentes em muitos títulos não entram na contagem, e a similaridade final usa todos."""
+        monkeypatch.setattr("services.title_catalog.TMDB_CATALOG_MAX_POSTINGS", 1)
+        catalog = self._catalog(tmp_path)
+        
+        match = catalog.lookup("interestellar")
+        assert match.tmdb_id == 157336
+        assert match.score > 0.75
+
+
+class TestNegativeCache:
+    """Testes para o cache negativo de títulos."""
+    
+    def test_repeated_miss_skips_network(self, monkeypatch):
+        """Um título sem resultado não é buscado de novo dentro do TTL."""
+        monkeypatch.setenv("TMDB_API_KEY", "test-key")
+        service = MovieService()
+        response = MagicMock()
+        response.json.return_value = {"results": [{"id": 1, "media_type": "person", "name": "Fulano"}]}
+        
+        with patch.object(service.session, "get", return_value=response) as mock_get:
+            assert service.search_movie("Filme Inexistente") is None
+            assert service.search_movie("filme  inexistente!") is None
+        
+        assert mock_get.call_count == 1
+        assert service.get_stats()["negative_cache"]["hits"] == 1
+    
+    def test_miss_with_year_is_cached_separately(self, monkeypatch):
+        """A ausência com ano não bloqueia a busca do mesmo título sem ano."""
+        service = MovieService()
+        service._remember_miss("Duna", "1984")
+        
+        assert service._is_known_miss("Duna", "1984")
+        assert not service._is_known_miss("Duna")
+    
+    def test_non_latin_and_article_titles_keep_distinct_keys(self):
+        """Títulos em outros alfabetos ou com artigos estrangeiros nunca compartilham chave."""
+        from utils.text import normalize_title
+        
+        titles = ["君の名は", "Паразиты", "기생충", "Die Hard", "Hard", "Das Boot", "Le Mans", "!!!"]
+        normalized = [normalize_title(title) for title in titles]
+        assert all(normalized) and len(set(normalized)) == len(titles)
+        assert normalize_title("The Matrix") == normalize_title("Matrix")
+        
+        service = MovieService()
+        assert service._search_key("The Hard", None, True) != service._search_key("Hard", None, True)
+        service._remember_miss("君の名は")
+        assert not service._is_known_miss("Паразиты")
+
+
+class TestYearAwareSearch:
+    """Testes para a busca com ano e as chaves normalizadas."""
+    
+    def test_year_picks_remake(self, monkeypatch):
+        """Com ano, vence o resultado daquele ano mesmo fora do topo."""
+        monkeypatch.setenv("TMDB_API_KEY", "test-key")
+        service = MovieService()
+        data = {"results": [
+            {"id": 438631, "media_type": "movie", "title": "Duna", "release_date": "2021-09-15"},
+            {"id": 841, "media_type": "movie", "title": "Duna", "release_date": "1984-12-14"}
+        ]}
+        
+        assert service._pick_search_result(data, "Duna")["id"] == 438631
+        assert service._pick_search_result(data, "Duna", "1984", require_year=True)["id"] == 841
+    
+    def test_year_falls_back_to_filtered_search(self, monkeypatch):
+        """Sem resultado do ano no /search/multi, usa o /search/movie com filtro de ano."""
+        monkeypatch.setenv("TMDB_API_KEY", "test-key")
+        service = MovieService()
+        multi = MagicMock()
+        multi.json.return_value = {"results": [
+            {"id": 438631, "media_type": "movie", "title": "Duna", "release_date": "2021-09-15"}
+        ]}
+        by_year = MagicMock()
+        by_year.json.return_value = {"results": [
+            {"id": 841, "title": "Duna", "release_date": "1984-12-14"}
+        ]}
+        
+        with patch.object(service.session, "get", side_effect=[multi, by_year]) as mock_get, \
+                patch.object(service, "prefetch_details"):
+            movie = service.search_movie("Duna", year=1984, fast=True)
+        
+        assert movie.id == 841
+        assert movie.media_type == "movie"
+        assert mock_get.call_args_list[1].args[0].endswith("/search/movie")
+        assert mock_get.call_args_list[1].kwargs["params"]["year"] == "1984"
+    
+    def test_title_variants_share_cache_key(self):
+        """Variações de grafia do mesmo título usam a mesma chave de cache (o artigo inicial conta)."""
+        service = MovieService()
+        
+        assert service._cache_key("/search/multi", {'query': "O Poderoso Chefão"}) == \
+            service._cache_key("/search/multi", {'query': "o poderoso  chefao!"})
+        assert service._search_key("The Matrix", None, True) == service._search_key("the  matrix", None, True)
+
+
+class TestBatchLookup:
+    """Testes para a busca de detalhes em lote."""
+    
+    def test_results_keep_order_with_item_errors(self, monkeypatch):
+        """Cada item traz o filme ou o próprio erro, na ordem pedida."""
+        monkeypatch.setenv("TMDB_API_KEY", "test-key")
+        service = MovieService()
+        
+        def fake_get(url, params=None, timeout=None):
+            if url.endswith("/movie/404"):
+                raise requests.exceptions.HTTPError("404 Not Found")
+            response = MagicMock()
+            movie_id = int(url.rsplit("/", 1)[1])
+            response.json.return_value = {"id": movie_id, "title": f"Filme {movie_id}", "release_date": "2000-01-01"}
+            return response
+        
+        with patch.object(service.session, "get", side_effect=fake_get) as mock_get:
+            results = service.get_movies_by_ids([(603, "movie"), (404, "movie"), (550, "movie"), (603, "movie")])
+            service.get_movies_by_ids([(603, "movie"), (550, "movie")])
+        
+        assert [r.id for r in results] == [603, 404, 550, 603]
+        assert results[0].movie.title == "Filme 603"
+        assert results[1].movie is None and "404" in results[1].error
+        assert results[2].to_dict()["content"]["id"] == 550
+        # Itens repetidos e já em cache não geram novas requisições
+        assert mock_get.call_count == 3
+
+
+class TestCircuitBreaker:
+    """Testes para o circuit breaker do TMDB."""
+    
+    def test_opens_on_failure_rate_and_recovers(self, monkeypatch):
+        """O circuito abre pela taxa de falhas e fecha após um teste bem-sucedido."""
+        breaker = CircuitBreaker(failure_rate=0.5, min_calls=4, open_seconds=10)
+        clock = [1000.0]
+        monkeypatch.setattr("utils.circuit_breaker.time.monotonic", lambda: clock[0])
+        
+        for ok in (True, False, True, False):
+            breaker.record_success() if ok else breaker.record_failure()
+        assert breaker.state == "open"
+        assert not breaker.allow_request()
+        
+        clock[0] += 10
+        assert breaker.allow_request()  # chamada de teste
+        assert not breaker.allow_request()
+        breaker.record_failure()
+        assert breaker.state == "open"
+        assert breaker.retry_in() == 20  # espera dobrada
+        
+        clock[0] += 20
+        assert breaker.allow_request()
+        breaker.record_success()
+        assert breaker.stats()["state"] == "closed"
+        assert breaker.stats()["opens"] == 2
+    
+    def test_abandoned_probe_is_replaced_after_the_cooldown(self, monkeypatch):
+        """Um teste que nunca informa o resultado não deixa o circuito preso em half_open."""
+        breaker = CircuitBreaker(min_calls=100, open_seconds=10)
+        clock = [1000.0]
+        monkeypatch.setattr("utils.circuit_breaker.time.monotonic", lambda: clock[0])
+        breaker.record_failure(retry_after=10)
+        
+        clock[0] += 10
+        assert breaker.allow_request()  # teste abandonado (sem record_success/record_failure)
+        clock[0] += 5
+        assert not breaker.allow_request()
+        clock[0] += 5
+        assert breaker.allow_request()
+        breaker.record_success()
+        assert breaker.state == "closed"
+    
+    def test_retry_after_opens_circuit(self):
+        """Um 429 com Retry-After abre o circuito pelo tempo pedido."""
+        breaker = CircuitBreaker(min_calls=100)
+        breaker.record_failure(retry_after=30)
+        
+        assert breaker.state == "open"
+        assert 29 < breaker.retry_in() <= 30
+    
+    def test_open_circuit_fails_fast_and_serves_cache(self, monkeypatch):
+        """Com o circuito aberto, o cache continua servindo e o resto falha rápido."""
+        monkeypatch.setenv("TMDB_API_KEY", "test-key")
+        service = MovieService()
+        cached = MagicMock(status_code=200)
+        cached.json.return_value = {"id": 603, "title": "Matrix", "release_date": "1999-03-31"}
+        limited = MagicMock(status_code=429, headers={"Retry-After": "120"})
+        limited.raise_for_status.side_effect = requests.exceptions.HTTPError("429 Too Many Requests")
+        
+        with patch.object(service.session, "get", side_effect=[cached, limited]) as mock_get:
+            service.get_movie_by_id(603)
+            with pytest.raises(ExternalAPIError):
+                service.get_movie_by_id(550)
+            
+            assert service.get_movie_by_id(603).title == "Matrix"
+            with pytest.raises(ExternalAPIError) as exc_info:
+                service.get_movie_by_id(550)
+        
+        assert exc_info.value.status_code == 503
+        assert mock_get.call_count == 2
+        assert service.get_stats()["circuit_breaker"]["state"] == "open"
+
+
+class TestRateLimiter:
+    """Testes para a cota de requisições compartilhada do TMDB."""
+    
+    def test_bucket_is_shared_through_state_file(self, tmp_path):
+        """Dois baldes no mesmo arquivo (como dois workers) dividem os tokens."""
+        path = tmp_path / "quota.state"
+        first = HostTokenBucket(path, rate=0.01, burst=2)
+        second = HostTokenBucket(path, rate=0.01, burst=2)
+        
+        assert first.acquire(max_wait=0)
+        assert second.acquire(max_wait=0)
+        assert not first.acquire(max_wait=0)
+        assert first.stats()["chat"]["timeouts"] == 1
+    
+    def test_background_keeps_reserve_for_chat(self, tmp_path):
+        """Chamadas em segundo plano não consomem a reserva do chat."""
+        bucket = HostTokenBucket(tmp_path / "quota.state", rate=0.01, burst=3, background_reserve=2)
+        
+        assert bucket.acquire("background", max_wait=0)
+        assert not bucket.acquire("background", max_wait=0)
+        assert bucket.acquire("chat", max_wait=0)
+        assert bucket.acquire("chat", max_wait=0)
+    
+    def test_requests_queue_for_a_token(self, tmp_path):
+        """Sem tokens, a chamada espera na fila e o tempo de espera é medido."""
+        bucket = HostTokenBucket(tmp_path / "quota.state", rate=50, burst=1)
+        
+        assert bucket.acquire(max_wait=1)
+        assert bucket.acquire(max_wait=1)
+        stats = bucket.stats()["chat"]
+        assert stats["queued"] == 1
+        assert stats["max_wait_ms"] >= 10
+    
+    def test_prefetch_runs_with_background_priority(self, monkeypatch):
+        """O pré-carregamento de detalhes usa a prioridade de segundo plano."""
+        monkeypatch.setenv("TMDB_API_KEY", "test-key")
+        service = MovieService()
+        seen = []
+        done = threading.Event()
+        
+        def fake_get_movie_by_id(movie_id, media_type):
+            seen.append(current_priority())
+            done.set()
+        
+        monkeypatch.setattr(service, "get_movie_by_id", fake_get_movie_by_id)
+        service.prefetch_details(603)
+        
+        assert done.wait(2)
+        assert seen == ["background"]
+        assert current_priority() == "chat"
+    
+    
+    def test_open_circuit_fails_before_taking_a_token(self, monkeypatch):
+        """Com o circuito aberto a chamada falha na hora, sem consumir a cota."""
+        monkeypatch.setenv("TMDB_API_KEY", "test-key")
+        service = MovieService()
+        service.rate_limiter = MagicMock()
+        
+        with patch("services.movie_service._breaker.allow_request", return_value=False):
+            with pytest.raises(ExternalAPIError):
+                service._request("/movie/603")
+        
+        service.rate_limiter.acquire.assert_not_called()
+
+
+class TestHedging:
+    """Testes para o hedge de requisições lentas."""
+    
+    def test_slow_call_is_hedged_and_hedge_wins(self):
+        """Uma chamada acima do percentil recebe uma cópia e vale a mais rápida."""
+        hedger = Hedger(percentile=0.5, max_hedge_rate=0.5, min_samples=3, min_delay=0.01)
+        for _ in range(3):
+            hedger.run(lambda: "ok")
+        
+        calls = []
+        
+        def slow_then_fast():
+            calls.append(1)
+            if len(calls) == 1:
+                time.sleep(0.5)
+                return "lento"
+            return "rápido"
+        
+        assert hedger.run(slow_then_fast) == "rápido"
+        stats = hedger.stats()
+        assert stats["hedged"] == 1
+        assert stats["hedge_wins"] == 1
+        assert stats["win_rate"] == 1.0
+    
+    def test_hedge_rate_is_capped(self):
+        """Sem margem na taxa de hedge, a chamada espera a tentativa original."""
+        hedger = Hedger(percentile=0.5, max_hedge_rate=0.0, min_samples=1, min_delay=0.01)
+        hedger.run(lambda: "ok")
+        
+        def slow():
+            time.sleep(0.05)
+            return "lento"
+        
+        assert hedger.run(slow) == "lento"
+        assert hedger.stats()["hedged"] == 0
+
+
+class TestJSONExtractor:
+    """Testes para a extração do JSON das respostas da IA."""
+    
+    def test_extracts_object_from_markdown(self):
+        """O objeto é extraído e decodificado mesmo com markdown e texto em volta."""
+        text = 'Claro!\n```json\n{"type": "movie", "content": {"title": "Duna"}}\n```\nAbraço'
+        
+        assert extract_json(text) == {"type": "movie", "content": {"title": "Duna"}}
+    
+    def test_ignores_braces_inside_strings(self):
+        """Chaves e aspas escapadas dentro de strings não encerram o objeto."""
+        text = 'Resposta: {"type": "text", "content": "use } e \\"{\\" à vontade"} fim'
+        
+        assert extract_json(text) == {"type": "text", "content": 'use } e "{" à vontade'}
+    
+    def test_skips_malformed_candidates(self):
+        """Trechos que parecem JSON mas não são válidos são pulados."""
+        text = 'Exemplo {type: movie}. Resposta: {"type": "text", "content": "ok"}'
+        
+        assert extract_json(text) == {"type": "text", "content": "ok"}
+        assert extract_json('{"type": "text", "content": "cort') is None
+        assert extract_json("sem json") is None
+    
+    def test_malformed_candidates_do_not_rewind(self):
+        """Depois de um candidato malformado a varredura segue em frente, também em pedaços."""
+        text = "Resposta: {type: movie} " * 500 + '{"type": "text", "content": "ok"}'
+        extractor = JSONExtractor()
+        for i in range(0, len(text), 7):
+            extractor.feed(text[i:i + 7])
+        
+        assert extractor.result == {"type": "text", "content": "ok"}
+        start, end = extractor.span
+        assert text[start:end] == '{"type": "text", "content": "ok"}'
+    
+    def test_reports_object_when_stream_completes(self):
+        """Em streaming, o objeto só é devolvido quando o nível superior fecha."""
+        extractor = JSONExtractor()
+        chunks = ['{"type": "text", "con', 'tent": "a \\', '"}\\"', '"}', ' resto']
+        
+        results = [extractor.feed(chunk) for chunk in chunks]
+        
+        assert results[:3] == [None, None, None]
+        assert results[3] == {"type": "text", "content": 'a "}"'}
+        assert extractor.done and results[4] == results[3]
+    
+    def test_clean_json_response_returns_object_text(self):
+        """clean_json_response continua devolvendo só o trecho JSON."""
+        service = AIService()
+        
+        assert service.clean_json_response('ok {"type": "text", "content": "}"} !') == '{"type": "text", "content": "}"}'
+        assert service.clean_json_response('nada aqui') is None
+
+
+class TestChatStreaming:
+    """Testes para a resposta do chat em streaming."""
+    
+    def test_parser_streams_text_content(self):
+        """O texto de uma resposta "text" sai decodificado, mesmo com escapes partidos."""
+        parser = AIResponseStream()
+        chunks = ['{"type": "te', 'xt", "content": "Olá', ' \\', 'n\\u00e9 ', 'isso"}']
+        
+        streamed = "".join(parser.feed(chunk) for chunk in chunks)
+        
+        assert parser.response_type == "text"
+        assert streamed == "Olá \né isso"
+    
+    def test_parser_does_not_stream_movie_content(self):
+        """Respostas "movie" não geram trechos de texto."""
+        parser = AIResponseStream()
+        
+        assert parser.feed('{"type": "movie", "content": {"title": "Duna"') == ""
+        assert parser.response_type == "movie"
+    
+    def test_parser_handles_long_streams_and_late_type(self):
+        """Content antes do tipo é liberado quando o tipo chega; o buffer guarda a resposta inteira."""
+        parser = AIResponseStream()
+        chunks = ['{"content": "', 'abc ' * 5000, '\\', 'n fim", ', '"type": "text"}']
+        
+        streamed = "".join(parser.feed(chunk) for chunk in chunks)
+        
+        assert parser.response_type == "text"
+        assert streamed == 'abc ' * 5000 + '\n fim'
+        assert parser.buffer == "".join(chunks)
+        assert parser.result["content"] == streamed
+    
+    def test_stream_route_sends_sse_events(self, client, monkeypatch):
+        """A rota de streaming envia os trechos e a resposta final como SSE."""
+        from controllers import chat_controller
+        
+        chunks = ['{"type": "text", ', '"content": "Oi, ', 'tudo bem?"}']
+        monkeypatch.setattr(
+            chat_controller.chat_service.ai_service,
+            "generate_response_stream",
+            lambda *args: iter(chunks)
+        )
+        
+        response = client.post('/api/chat/stream', data={'message': 'oi'})
+        body = response.get_data(as_text=True)
+        
+        assert response.mimetype == "text/event-stream"
+        assert 'event: delta\ndata: {"content": "Oi, "}' in body
+        assert 'event: final\ndata: {"type": "text", "content": "Oi, tudo bem?"' in body
+    
+    def test_stream_route_announces_movie(self, client, monkeypatch):
+        """Em respostas "movie", um aviso sai antes da resposta enriquecida."""
+        from controllers import chat_controller
+        from dto.movie_dto import MovieDTO
+        
+        chunks = ['{"type": "movie", ', '"content": {"title": "Duna", "year": "2021"}}']
+        monkeypatch.setattr(
+            chat_controller.chat_service.ai_service,
+            "generate_response_stream",
+            lambda *args: iter(chunks)
+        )
+        monkeypatch.setattr(
+            chat_controller.chat_service.movie_service,
+            "search_movie",
+            lambda title, year=None: MovieDTO(id=438631, title=title, year=year)
+        )
+        
+        body = client.post('/api/chat/stream', data={'message': 'duna'}).get_data(as_text=True)
+        
+        assert body.index("event: status") < body.index("event: final")
+        assert '"id": 438631' in body
+    
+    def test_movie_search_starts_before_generation_ends(self, app, monkeypatch):
+        """A busca no TMDB começa assim que título e ano saem, antes do fim da resposta."""
+        from services.chat_service import ChatService
+        from dto.chat_dto import ChatRequestDTO
+        from dto.movie_dto import MovieDTO
+        
+        service = ChatService()
+        searched = threading.Event()
+        calls = []
+        
+        def fake_stream(*args):
+            yield '{"type": "movie", "content": {"title": "Duna", "year": "1984"'
+            # O restante da resposta só sai depois que a busca começou
+            assert searched.wait(2)
+            yield '}}'
+        
+        def fake_search(title, year=None):
+            calls.append((title, year))
+            searched.set()
+            return MovieDTO(id=841, title=title, year=year)
+        
+        monkeypatch.setattr(service.ai_service, "generate_response_stream", fake_stream)
+        monkeypatch.setattr(service.movie_service, "search_movie", fake_search)
+        
+        result = service.process_message(request=ChatRequestDTO(message="duna de 1984"), user_id=None)
+        
+        assert result["content"]["id"] == 841
+        assert calls == [("Duna", "1984")]
+
+
+class TestCompletionCache:
+    """Testes para o cache de respostas da IA."""
+    
+    @pytest.fixture
+    def chat_service(self, app, monkeypatch):
+        monkeypatch.setenv("COMPLETION_CACHE_ENABLED", "true")
+        from services.chat_service import ChatService
+        service = ChatService()
+        service.speculative_search = False
+        return service
+    
+    def test_repeated_first_turn_is_served_from_cache(self, chat_service, monkeypatch):
+        """Um primeiro turno repetido (com outra grafia) não chama a IA de novo."""
+        from dto.chat_dto import ChatRequestDTO
+        
+        responses = ['{"type": "text", "content": "Interestelar é de 2014."}']
+        generate = MagicMock(side_effect=lambda *args: responses[0])
+        monkeypatch.setattr(chat_service.ai_service, "generate_response", generate)
+        
+        first = chat_service.process_message(request=ChatRequestDTO(message="Me fala sobre Interestelar"))
+        second = chat_service.process_message(request=ChatRequestDTO(message="me fala sobre  interestelar"))
+        
+        assert first["content"] == second["content"] == "Interestelar é de 2014."
+        assert generate.call_count == 1
+        assert chat_service.ai_service.get_stats()["completion_cache"]["hits"] == 1
+    
+    def test_invalid_response_is_not_cached(self, chat_service, monkeypatch):
+        """Respostas que não passam na validação nunca entram no cache."""
+        from dto.chat_dto import ChatRequestDTO
+        
+        generate = MagicMock(return_value='{"type": "desconhecido", "content": 1}')
+        monkeypatch.setattr(chat_service.ai_service, "generate_response", generate)
+        
+        for _ in range(2):
+            with pytest.raises(Exception):
+                chat_service.process_message(request=ChatRequestDTO(message="oi"))
+        
+        assert generate.call_count == 2
+        assert chat_service.ai_service.get_stats()["completion_cache"]["stores"] == 0
+    
+    def test_conversational_turns_skip_cache(self, monkeypatch):
+        """Turnos com respostas anteriores no histórico não usam o cache."""
+        monkeypatch.setenv("COMPLETION_CACHE_ENABLED", "true")
+        service = AIService()
+        history = [
+            {"role": "user", "content": "oi"},
+            {"role": "assistant", "content": {"type": "text", "content": "Olá!"}},
+            {"role": "user", "content": "e de terror?"}
+        ]
+        
+        service.cache_response("e de terror?", None, history, '{"type": "text", "content": "x"}')
+        
+        assert service.get_cached_response("e de terror?", None, history) is None
+        assert service.get_stats()["completion_cache"]["stores"] == 0
+    
+    def test_image_turns_skip_cache_without_waiting_for_the_image(self, monkeypatch):
+        """Turnos com imagem saem do cache sem montar as mensagens (nem esperar o pré-processamento)."""
+        monkeypatch.setenv("COMPLETION_CACHE_ENABLED", "true")
+        service = AIService()
+        pending = MagicMock()
+        monkeypatch.setattr(service, "_build_messages", MagicMock(side_effect=AssertionError("montou as mensagens")))
+        
+        assert service.get_cached_response("que filme é esse?", pending, None) is None
+        
+        pending.result.assert_not_called()
+        assert service.get_stats()["completion_cache"]["skipped"] == 1
+
+
+class TestSemanticCache:
+    """Testes para o cache semântico de perguntas."""
+    
+    def test_paraphrase_matches_and_other_movie_does_not(self):
+        """Variações da mesma pergunta batem; perguntas sobre outro filme não."""
+        from services.semantic_cache import SemanticCache
+        cache = SemanticCache(threshold=0.9, max_entries=10)
+        cache.add("me fala sobre interestelar", '{"type": "movie"}', 157336)
+        
+        assert cache.lookup("Me fala sobre o Interestelar!")["tmdb_id"] == 157336
+        assert cache.lookup("me fala sobre inception") is None
+        stats = cache.stats()
+        assert stats["lookups"] == 2 and stats["hits"] == 1
+    
+    def test_false_positive_is_evicted(self):
+        """Um acerto reprovado na conferência sai do índice."""
+        from services.semantic_cache import SemanticCache
+        cache = SemanticCache(threshold=0.9, max_entries=10)
+        cache.add("filmes de terror", '{"type": "recommendations"}')
+        
+        match = cache.lookup("filmes terror")
+        cache.record_audit(match, agreed=False)
+        
+        assert cache.lookup("filmes de terror") is None
+        assert cache.stats()["false_positive_rate"] == 1.0
+    
+    def test_resolved_movie_is_reused_for_similar_question(self, app, monkeypatch):
+        """Uma pergunta parecida com outra já resolvida no TMDB não chama a IA."""
+        monkeypatch.setenv("SEMANTIC_CACHE_ENABLED", "true")
+        monkeypatch.setenv("SEMANTIC_CACHE_AUDIT_RATE", "0")
+        from services.chat_service import ChatService
+        from dto.chat_dto import ChatRequestDTO
+        from dto.movie_dto import MovieDTO
+        
+        service = ChatService()
+        service.speculative_search = False
+        generate = MagicMock(return_value='{"type": "movie", "content": {"title": "Interestelar", "year": "2014"}}')
+        monkeypatch.setattr(service.ai_service, "generate_response", generate)
+        monkeypatch.setattr(
+            service.movie_service,
+            "search_movie",
+            lambda title, year=None: MovieDTO(id=157336, title=title, year=year)
+        )
+        
+        service.process_message(request=ChatRequestDTO(message="me fala sobre interestelar"))
+        result = service.process_message(request=ChatRequestDTO(message="fala sobre o interestelar"))
+        
+        assert result["content"]["id"] == 157336
+        assert generate.call_count == 1
+        assert service.ai_service.get_stats()["semantic_cache"]["hits"] == 1
+
+
+class TestPromptBudget:
+    """Testes para o orçamento de tokens do prompt."""
+    
+    def test_history_is_trimmed_to_budget(self, monkeypatch):
+        """As mensagens mais antigas saem quando o histórico não cabe no orçamento."""
+        monkeypatch.setenv("CHAT_PROMPT_TOKEN_BUDGET", "2000")
+        service = AIService()
+        history = [
+            {"role": "assistant", "content": {"type": "text", "content": "x" * 4000}, "token_count": 1010},
+            {"role": "user", "content": "e esse outro?", "token_count": 8},
+            {"role": "assistant", "content": {"type": "text", "content": "ok"}, "token_count": 12},
+        ]
+        
+        messages = service._build_messages("valeu", chat_history=history)
+        
+        assert [m["role"] for m in messages] == ["system", "user", "assistant", "user"]
+        stats = service.get_stats()["prompt_budget"]
+        assert stats["requests"] == 1
+        assert stats["dropped_messages"] == 1
+        assert stats["max_tokens"] <= 2000
+    
+    def test_token_count_is_stored_on_write(self, app):
+        """A contagem de tokens é gravada junto com a mensagem."""
+        from models import ChatSession
+        from extensions import db
+        from repositories.chat_repository import ChatMessageRepository
+        from utils.tokens import estimate_tokens
+        
+        with app.app_context():
+            session = ChatSession(session_key="orcamento")
+            db.session.add(session)
+            db.session.commit()
+            repo = ChatMessageRepository()
+            repo.create_message(session.id, "user", "quero um filme de ficção científica")
+            
+            message = repo.get_session_history(session.id)[0]
+            assert message.token_count == estimate_tokens("quero um filme de ficção científica")
+    
+    def test_movie_turns_are_compacted_in_history(self):
+        """Respostas de filme enriquecidas voltam ao prompt só com título, ano e ID do TMDB."""
+        from dto.movie_dto import MovieDTO
+        
+        service = AIService()
+        movie = MovieDTO(id=438631, title="Duna", year="2021", overview="x" * 2000, poster_url="https://img/duna.jpg")
+        history = [
+            {"role": "user", "content": "duna"},
+            {"role": "assistant", "content": {"type": "movie", "content": movie.to_dict()}},
+        ]
+        
+        messages = service._build_messages("e o segundo?", chat_history=history)
+        
+        assert json.loads(messages[2]["content"]) == {
+            "type": "movie",
+            "content": {"title": "Duna", "year": "2021", "tmdb_id": 438631}
+        }
+
+
+class TestConversationSummary:
+    """Testes para o resumo contínuo das sessões longas."""
+    
+    def _session_with_messages(self, count):
+        from models import ChatSession
+        from extensions import db
+        from repositories.chat_repository import ChatMessageRepository
+        
+        session = ChatSession(session_key="longa")
+        db.session.add(session)
+        db.session.commit()
+        repo = ChatMessageRepository()
+        for i in range(count):
+            if i % 2 == 0:
+                repo.create_message(session.id, "user", f"pergunta {i}")
+            else:
+                repo.create_message(session.id, "assistant", json.dumps({"type": "text", "content": f"resposta {i}"}))
+        return session
+    
+    def test_old_messages_are_folded_into_summary(self, app):
+        """Mensagens fora da janela recente viram resumo, e o histórico passa a ser resumo + recentes."""
+        from services.chat_service import ChatService
+        from services.summary_service import SummaryService
+        
+        with app.app_context():
+            session = self._session_with_messages(12)
+            ai_service = MagicMock()
+            ai_service.summarize.return_value = "O usuário gosta de ficção científica."
+            summaries = SummaryService(ai_service)
+            
+            assert summaries.refresh(session.id) is True
+            folded = ai_service.summarize.call_args[0][1]
+            assert [m["content"] for m in folded][0] == "pergunta 0"
+            assert len(folded) == 6
+            
+            history = ChatService()._get_chat_history(session)
+            assert history[0] == {"role": "summary", "content": "O usuário gosta de ficção científica."}
+            assert len(history) == 7
+            # Sem mensagens novas suficientes fora da janela, não resume de novo
+            assert summaries.refresh(session.id) is False
+    
+    def test_summary_is_sent_after_system_prompt(self):
+        """O resumo entra como mensagem de sistema logo após o prompt principal."""
+        service = AIService()
+        history = [
+            {"role": "summary", "content": "Já falamos de Duna (2021)."},
+            {"role": "user", "content": "e o segundo?"},
+        ]
+        
+        messages = service._build_messages("e o segundo?", chat_history=history)
+        
+        assert messages[1] == {"role": "system", "content": "Conversation so far: Já falamos de Duna (2021)."}
+        assert not service._is_single_turn(None, history)
+
+
+class TestModelTiering:
+    """Testes para o roteamento entre o modelo pequeno e o grande."""
+    
+    def _service_with_models(self, replies):
+        """AIService com um provedor local que responde conforme o nível do modelo."""
+        from services.llm_providers import LocalProvider, ProviderPool
+        
+        service = AIService()
+        service.llm = ProviderPool([LocalProvider(lambda tier, messages: replies[tier])])
+        return service
+    
+    def test_classifier_recognizes_easy_turns(self):
+        """Saudações e pedidos sobre um título são fáceis; o resto vai para o modelo grande."""
+        from services.model_router import classify_turn, KIND_GREETING, KIND_TITLE_LOOKUP
+        
+        assert classify_turn("Olá, tudo bem?") == KIND_GREETING
+        assert classify_turn("me fala sobre o filme Interestelar") == KIND_TITLE_LOOKUP
+        assert classify_turn("me recomenda filmes parecidos com Duna") is None
+        assert classify_turn("oi", has_image=True) is None
+    
+    def test_easy_turn_is_answered_by_small_model(self):
+        """Uma resposta válida do modelo pequeno é usada sem chamar o grande."""
+        movie = '{"type": "movie", "content": {"title": "Interestelar", "year": "2014"}}'
+        service = self._service_with_models({"small": movie, "large": "não deveria"})
+        
+        assert service.generate_response("fala sobre interestelar") == movie
+        tiers = service.get_stats()["model_tiers"]["tiers"]
+        assert tiers["small"]["routed"] == 1 and tiers["large"]["calls"] == 0
+    
+    def test_low_confidence_answer_is_escalated(self):
+        """Se o modelo pequeno não identifica o título, o turno vai para o grande."""
+        movie = '{"type": "movie", "content": {"title": "Duna", "year": "2021"}}'
+        service = self._service_with_models({
+            "small": '{"type": "text", "content": "Não sei qual é."}',
+            "large": movie
+        })
+        
+        assert service.generate_response("me fala sobre duna") == movie
+        stats = service.get_stats()["model_tiers"]
+        assert stats["escalation_reasons"] == {"low_confidence": 1}
+    
+    def test_slow_small_model_is_avoided(self):
+        """Quando o modelo pequeno fica mais lento que o grande, turnos fáceis vão para o grande."""
+        from services.model_router import ModelRouter, TIER_LARGE, TIER_SMALL
+        
+        router = ModelRouter("pequeno", "grande", min_samples=3, probe_every=5)
+        for _ in range(3):
+            router.record(TIER_SMALL, 2.0, ok=True)
+            router.record(TIER_LARGE, 0.5, ok=True)
+        
+        routes = [router.route("oi").tier for _ in range(5)]
+        
+        assert routes == [TIER_LARGE] * 4 + [TIER_SMALL]
+
+
+class TestProviderPool:
+    """Testes para o failover entre provedores de IA."""
+    
+    def _failing(self, name):
+        from services.llm_providers import LocalProvider
+        
+        def reply(tier, messages):
+            raise RuntimeError("503 indisponível")
+        return LocalProvider(reply, name=name)
+    
+    def test_fails_over_to_next_provider(self):
+        """Se o primeiro provedor falha, a mesma requisição é atendida pelo próximo."""
+        from services.llm_providers import LocalProvider, ProviderPool
+        
+        pool = ProviderPool([self._failing("groq"), LocalProvider("ok", name="reserva")])
+        
+        assert pool.complete("large", [{"role": "user", "content": "oi"}]) == "ok"
+        stats = pool.stats()
+        assert stats["failovers"] == 1
+        assert stats["providers"]["groq"]["failures"] == 1
+        assert stats["providers"]["reserva"]["served"] == 1
+    
+    def test_open_circuit_moves_provider_to_the_end(self):
+        """Um provedor com muitas falhas recentes passa a ser tentado por último."""
+        from services.llm_providers import LocalProvider, ProviderPool
+        
+        pool = ProviderPool([self._failing("groq"), LocalProvider("ok", name="reserva")])
+        for _ in range(5):
+            pool.complete("large", [{"role": "user", "content": "oi"}])
+        
+        assert [p.name for p in pool.candidates()] == ["reserva", "groq"]
+        assert pool.stats()["providers"]["groq"]["circuit"] == "open"
+    
+    def test_all_providers_failing_raises(self):
+        """Sem nenhum provedor disponível, a falha vira ExternalAPIError."""
+        from services.llm_providers import ProviderPool
+        
+        pool = ProviderPool([self._failing("groq"), self._failing("openai")])
+        
+        with pytest.raises(ExternalAPIError):
+            list(pool.stream("large", [{"role": "user", "content": "oi"}]))
+        assert pool.stats()["exhausted"] == 1
+    
+    def test_openai_compatible_provider_parses_stream(self):
+        """O provedor compatível com a OpenAI lê os eventos SSE até o [DONE]."""
+        from services.llm_providers import OpenAICompatibleProvider
+        
+        body = (
+            'data: {"choices": [{"delta": {"content": "{\\"type\\""}}]}\n\n'
+            'data: {"choices": [{"delta": {"content": ": \\"text\\"}"}}]}\n\n'
+            'data: [DONE]\n\n'
+        )
+        provider = OpenAICompatibleProvider("https://llm.exemplo", "chave", {"large": "modelo"})
+        provider.client = httpx.Client(
+            base_url="https://llm.exemplo",
+            transport=httpx.MockTransport(lambda request: httpx.Response(200, text=body))
+        )
+        
+        assert "".join(provider.stream("large", [], timeout=5)) == '{"type": "text"}'
+
+
+class TestResponseRepair:
+    """Testes para o reparo de respostas da IA fora do formato JSON."""
+    
+    def test_local_fixup_handles_common_defects(self):
+        """Vírgulas sobrando, aspas simples e respostas truncadas são consertadas sem chamar a IA."""
+        from utils.json_repair import repair_json
+        
+        assert repair_json('Claro! {"type": "text", "content": "oi",}') == {"type": "text", "content": "oi"}
+        assert repair_json("{'type': 'text', 'content': 'ok'}") == {"type": "text", "content": "ok"}
+        assert repair_json('{"type": "text", "content": "Duna é') == {"type": "text", "content": "Duna é"}
+        assert repair_json("não tem JSON aqui") is None
+    
+    def test_unquoted_accented_word_does_not_crash(self):
+        """Palavras soltas com acento não derrubam o reparo: o turno segue para a próxima etapa."""
+        from utils.json_repair import repair_json
+        from services.response_repair import ResponseRepairer, OUTCOME_REPAIRED
+        
+        text = '{"type":"text","content": ótimo}'
+        reask = MagicMock(return_value='{"type": "text", "content": "ótimo"}')
+        
+        assert repair_json(text) is None
+        assert repair_json("{'type': 'text', 'content': 'x', 'ok': True, 'ação': None}")["ação"] is None
+        data, outcome = ResponseRepairer(reask=reask).resolve(text)
+        assert data == {"type": "text", "content": "ótimo"} and outcome == OUTCOME_REPAIRED
+    
+    def test_reask_happens_at_most_once(self):
+        """Sem conserto local, a IA é consultada uma única vez com o erro encontrado."""
+        from services.response_repair import ResponseRepairer, OUTCOME_REPAIRED
+        
+        reask = MagicMock(return_value='{"type": "text", "content": "Oi!"}')
+        repairer = ResponseRepairer(reask=reask, max_reasks=1)
+        
+        data, outcome = repairer.resolve('{"type": "filme", "content": 1}')
+        
+        assert data == {"type": "text", "content": "Oi!"} and outcome == OUTCOME_REPAIRED
+        assert reask.call_count == 1
+        assert repairer.stats()["repaired_by"]["reask"] == 1
+    
+    def test_outcomes_are_recorded(self):
+        """Cada turno conta como limpo, reparado ou falho."""
+        from services.response_repair import ResponseRepairer
+        
+        repairer = ResponseRepairer(reask=MagicMock(return_value="{ainda quebrado"))
+        repairer.resolve('{"type": "text", "content": "ok"}')
+        repairer.resolve('Só texto, sem JSON.')
+        repairer.resolve('{"type": "movie", "content": "x"}')
+        
+        stats = repairer.stats()
+        assert (stats["clean"], stats["repaired"], stats["failed"]) == (1, 1, 1)
+        assert stats["repaired_by"]["prose"] == 1
+    
+    def test_json_mode_is_requested_when_supported(self):
+        """O modo JSON só é pedido aos provedores que o oferecem (o Groq, sem streaming)."""
+        from services.llm_providers import GroqProvider, LocalProvider
+        
+        groq = GroqProvider("chave", {"large": "modelo"})
+        
+        assert groq._json_params(True) == {"response_format": {"type": "json_object"}}
+        assert groq._json_params(True, stream=True) == {}
+        assert LocalProvider()._json_params(True) == {}
+
+
+class TestImagePreprocessor:
+    """Testes para a preparação das imagens enviadas ao modelo de visão."""
+    
+    def _photo(self, size=(3000, 2000)):
+        """PNG grande com metadados EXIF."""
+        from io import BytesIO
+        from PIL import Image
+        
+        image = Image.new("RGB", size, (200, 30, 30))
+        exif = Image.Exif()
+        exif[0x010F] = "Câmera do usuário"
+        buffered = BytesIO()
+        image.save(buffered, format="PNG", exif=exif)
+        return buffered.getvalue()
+    
+    def test_downscales_and_strips_metadata(self):
+        """A imagem cabe no lado máximo, vira JPEG menor e perde o EXIF."""
+        from io import BytesIO
+        from PIL import Image
+        from services.image_preprocessor import ImagePreprocessor
+        
+        raw = self._photo()
+        prepared = ImagePreprocessor(max_edge=512, image_format="jpeg", quality=80).prepare(raw)
+        
+        image = Image.open(BytesIO(prepared.data))
+        assert (image.format, image.size) == ("JPEG", (512, 341))
+        assert not image.getexif()
+        assert len(prepared.data) < len(raw)
+        assert prepared.data_url.startswith("data:image/jpeg;base64,")
+    
+    def test_repeated_upload_is_served_from_cache(self):
+        """O mesmo conteúdo só é processado uma vez."""
+        from services.image_preprocessor import ImagePreprocessor
+        
+        preprocessor = ImagePreprocessor(max_edge=256)
+        raw = self._photo((800, 600))
+        
+        first, second = preprocessor.prepare(raw), preprocessor.prepare(raw)
+        
+        assert first is second
+        stats = preprocessor.stats()
+        assert (stats["processed"], stats["cache_hits"]) == (1, 1)
+    
+    def test_image_goes_to_vision_model(self):
+        """Turnos com imagem mandam a imagem preparada ao modelo de visão."""
+        from services.llm_providers import LocalProvider, ProviderPool
+        from werkzeug.datastructures import FileStorage
+        from io import BytesIO
+        
+        seen = {}
+        
+        def reply(tier, messages):
+            seen["tier"], seen["content"] = tier, messages[-1]["content"]
+            return '{"type": "text", "content": "Parece Matrix."}'
+        
+        service = AIService()
+        service.llm = ProviderPool([LocalProvider(reply)])
+        upload = FileStorage(BytesIO(self._photo((640, 480))), filename="cena.png", content_type="image/png")
+        
+        service.generate_response("que filme é esse?", service.images.submit(upload))
+        
+        assert seen["tier"] == "vision"
+        assert seen["content"][0] == {"type": "text", "text": "que filme é esse?"}
+        assert seen["content"][1]["image_url"]["url"].startswith("data:image/jpeg;base64,")
+
+
+class TestFastPath:
+    """Testes para o atalho de pedidos diretos de um título."""
+    
+    def test_rules_extract_title_and_year(self):
+        """Pedidos diretos são reconhecidos; genéricos e ambíguos ficam com a IA."""
+        from services.fast_path import FastPath, RULE_EXPLICIT, RULE_YEAR, RULE_CATALOG
+        
+        catalog = MagicMock()
+        catalog.exact_count.side_effect = lambda title: {"halloween": 3, "interestelar": 1}.get(title.lower(), 0)
+        fast_path = FastPath(catalog=catalog)
+        
+        assert fast_path.match("me fala sobre o filme Duna").title == "Duna"
+        match = fast_path.match("sobre Interestelar (2014)")
+        assert (match.rule, match.title, match.year) == (RULE_YEAR, "Interestelar", "2014")
+        assert fast_path.match("Interestelar").rule == RULE_CATALOG
+        assert fast_path.match("filme Halloween") is None
+        assert fast_path.match("filme Halloween 2018").rule == RULE_EXPLICIT
+        assert fast_path.match("melhores filmes de terror (2014)") is None
+        assert fast_path.match("filme de terror dos anos 80") is None
+        assert fast_path.match("série com o Tom Hanks") is None
+        assert FastPath(rules=[RULE_YEAR]).match("filme Duna") is None
+    
+    def test_on_mode_skips_the_llm(self, app, monkeypatch):
+        """No modo "on", o pedido direto é respondido só com o MovieService."""
+        monkeypatch.setenv("CHAT_FAST_PATH_MODE", "on")
+        from services.chat_service import ChatService
+        from dto.chat_dto import ChatRequestDTO
+        from dto.movie_dto import MovieDTO
+        
+        service = ChatService()
+        generate = MagicMock()
+        monkeypatch.setattr(service.ai_service, "generate_response", generate)
+        monkeypatch.setattr(service.ai_service, "generate_response_stream", generate)
+        search = MagicMock(return_value=MovieDTO(id=438631, title="Duna", year="2021"))
+        monkeypatch.setattr(service.movie_service, "search_movie", search)
+        
+        result = service.process_message(request=ChatRequestDTO(message="filme Duna"))
+        
+        assert result["content"]["id"] == 438631
+        generate.assert_not_called()
+        search.assert_called_once_with("Duna", year=None)
+        assert service.fast_path.stats()["served"] == 1
+    
+    def test_on_mode_ignores_unknown_tmdb_year(self, app, monkeypatch):
+        """Um ano "N/A" do TMDB não vira resposta: vale o ano do pedido ou o turno segue para a IA."""
+        monkeypatch.setenv("CHAT_FAST_PATH_MODE", "on")
+        from services.chat_service import ChatService
+        from dto.chat_dto import ChatRequestDTO
+        from dto.movie_dto import MovieDTO
+        
+        service = ChatService()
+        service.speculative_search = False
+        generate = MagicMock(return_value='{"type": "text", "content": "Qual deles?"}')
+        monkeypatch.setattr(service.ai_service, "generate_response", generate)
+        resolve = MagicMock(side_effect=service.ai_service.resolve_response)
+        monkeypatch.setattr(service.ai_service, "resolve_response", resolve)
+        monkeypatch.setattr(
+            service.movie_service,
+            "search_movie",
+            MagicMock(return_value=MovieDTO(id=1, title="Duna", year="N/A"))
+        )
+        
+        served = service.process_message(request=ChatRequestDTO(message="filme Duna 2021"))
+        
+        assert served["type"] == "movie" and resolve.call_count == 0
+        generate.assert_not_called()
+        
+        result = service.process_message(request=ChatRequestDTO(message="filme Duna"))
+        
+        assert result["content"] == "Qual deles?"
+        generate.assert_called_once()
+    
+    def test_on_mode_falls_back_to_the_llm_when_tmdb_fails(self, app, monkeypatch):
+        """Com o TMDB fora do ar, o pedido direto segue para a IA em vez de falhar o turno."""
+        monkeypatch.setenv("CHAT_FAST_PATH_MODE", "on")
+        from services.chat_service import ChatService
+        from dto.chat_dto import ChatRequestDTO
+        from core.exceptions import ExternalAPIError
+        
+        service = ChatService()
+        service.speculative_search = False
+        generate = MagicMock(return_value='{"type": "text", "content": "Duna é uma ficção científica."}')
+        monkeypatch.setattr(service.ai_service, "generate_response", generate)
+        monkeypatch.setattr(
+            service.movie_service,
+            "search_movie",
+            MagicMock(side_effect=ExternalAPIError("Circuito aberto."))
+        )
+        
+        result = service.process_message(request=ChatRequestDTO(message="filme Duna"))
+        
+        assert result["content"] == "Duna é uma ficção científica."
+        generate.assert_called_once()
+        assert service.fast_path.stats()["fallbacks"] == 1
+    
+    def test_shadow_mode_measures_agreement(self, app, monkeypatch):
+        """No modo sombra, a IA responde e a concordância com o atalho é registrada."""
+        monkeypatch.setenv("CHAT_FAST_PATH_MODE", "shadow")
+        from services.chat_service import ChatService
+        from dto.chat_dto import ChatRequestDTO
+        from dto.movie_dto import MovieDTO
+        
+        service = ChatService()
+        service.speculative_search = False
+        monkeypatch.setattr(
+            service.ai_service,
+            "generate_response",
+            MagicMock(return_value='{"type": "movie", "content": {"title": "Duna", "year": "2021"}}')
+        )
+        monkeypatch.setattr(
+            service.movie_service,
+            "search_movie",
+            lambda title, year=None: MovieDTO(id=438631, title=title, year=year)
+        )
+        
+        service.process_message(request=ChatRequestDTO(message="filme Duna"))
+        
+        shadow = service.fast_path.stats()["shadow"]
+        assert shadow["compared"] == 1 and shadow["agreement_rate"] == 1.0
+
+
+class TestSchemaUpgrade:
+    """Testes para a atualização de bancos criados antes das colunas novas."""
+    
+    def test_missing_columns_are_added_once(self, tmp_path):
+        """Colunas que faltam são acrescentadas sem perder dados; rodar de novo não muda nada."""
+        from sqlalchemy import create_engine, inspect, text
+        from models import ADDED_COLUMNS, add_missing_columns
+        
+        engine = create_engine(f"sqlite:///{tmp_path / 'antigo.db'}")
+        with engine.begin() as connection:
+            connection.execute(text("CREATE TABLE chat_sessions (id INTEGER PRIMARY KEY, session_key VARCHAR(255))"))
+            connection.execute(text("CREATE TABLE chat_messages (id INTEGER PRIMARY KEY, role VARCHAR(20), content TEXT)"))
+            connection.execute(text("INSERT INTO chat_messages (role, content) VALUES ('user', 'oi')"))
+        
+        added = add_missing_columns(engine)
+        
+        assert added == [f"{table}.{column}" for table, column, _ in ADDED_COLUMNS]
+        assert add_missing_columns(engine) == []
+        columns = {column['name'] for column in inspect(engine).get_columns('chat_messages')}
+        assert 'token_count' in columns
+        columns = {column['name'] for column in inspect(engine).get_columns('chat_sessions')}
+        assert {'summary', 'summary_message_id'} <= columns
+        with engine.connect() as connection:
+            assert connection.execute(text("SELECT content, token_count FROM chat_messages")).one() == ('oi', None)
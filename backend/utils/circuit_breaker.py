@@ -0,0 +1,170 @@
+"""
+Circuit breaker para chamadas a serviços externos.
+
+Estados:
+    closed: as chamadas passam e os resultados entram na janela de medição
+    open: as chamadas falham rápido até o fim do intervalo de espera
+    half_open: uma chamada de teste decide se o circuito fecha ou reabre
+
+Cada abertura seguida de um teste com falha dobra o intervalo de espera
+(até `max_open_seconds`). Um Retry-After informado pelo servidor abre o
+circuito pelo tempo pedido. Uma chamada de teste que nunca informa o
+resultado (cancelada, abandonada) deixa de valer depois do intervalo de
+espera, e um novo teste é liberado.
+"""
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitBreaker:
+    """Circuit breaker thread-safe baseado em taxa de falhas."""
+
+    def __init__(
+        self,
+        failure_rate: float = 0.5,
+        min_calls: int = 5,
+        window_size: int = 20,
+        window_seconds: float = 60,
+        open_seconds: float = 15,
+        max_open_seconds: float = 300
+    ):
+        """
+        Inicializa o circuit breaker.
+
+        Args:
+            failure_rate: Taxa de falhas (0-1) que abre o circuito
+            min_calls: Chamadas mínimas na janela antes de avaliar a taxa
+            window_size: Número máximo de resultados na janela
+            window_seconds: Idade máxima dos resultados na janela
+            open_seconds: Espera inicial com o circuito aberto
+            max_open_seconds: Espera máxima após aberturas consecutivas
+        """
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.window_seconds = window_seconds
+        self.open_seconds = open_seconds
+        self.max_open_seconds = max_open_seconds
+        self._lock = threading.Lock()
+        self._window: Deque[Tuple[float, bool]] = deque(maxlen=window_size)
+        self._state = CLOSED
+        self._opened_until = 0.0
+        self._cooldown = open_seconds
+        self._probe_in_flight = False
+        self._probe_started = 0.0
+        self._opens = 0
+        self._rejected = 0
+
+    @property
+    def state(self) -> str:
+        """Estado atual (um circuito aberto vencido passa a half_open)."""
+        with self._lock:
+            return self._current_state(time.monotonic())
+
+    def _current_state(self, now: float) -> str:
+        if self._state == OPEN and now >= self._opened_until:
+            self._state = HALF_OPEN
+            self._probe_in_flight = False
+        return self._state
+
+    def allow_request(self) -> bool:
+        """Indica se uma chamada pode ser feita agora (registrando a recusa)."""
+        with self._lock:
+            now = time.monotonic()
+            state = self._current_state(now)
+            if state == CLOSED:
+                return True
+            # Teste abandonado (sem resultado dentro do intervalo de espera): libera outro
+            if state == HALF_OPEN and (not self._probe_in_flight or now - self._probe_started >= self._cooldown):
+                self._probe_in_flight = True
+                self._probe_started = now
+                return True
+            self._rejected += 1
+            return False
+
+    def retry_in(self) -> float:
+        """Segundos até o circuito aceitar uma chamada de teste."""
+        with self._lock:
+            if self._current_state(time.monotonic()) != OPEN:
+                return 0.0
+            return max(0.0, self._opened_until - time.monotonic())
+
+    def record_success(self) -> None:
+        """Registra uma chamada bem-sucedida."""
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._state = CLOSED
+                self._cooldown = self.open_seconds
+                self._window.clear()
+            self._probe_in_flight = False
+            self._window.append((time.monotonic(), True))
+
+    def release(self) -> None:
+        """Desiste de uma chamada liberada por allow_request sem registrar resultado (libera o teste)."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_failure(self, retry_after: Optional[float] = None) -> None:
+        """
+        Registra uma chamada com falha.
+
+        Args:
+            retry_after: Tempo de espera pedido pelo servidor (abre o circuito)
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._probe_in_flight = False
+            if self._current_state(now) == HALF_OPEN:
+                self._cooldown = min(self._cooldown * 2, self.max_open_seconds)
+                self._open(now, self._cooldown)
+                return
+
+            self._window.append((now, False))
+            if retry_after:
+                self._open(now, min(retry_after, self.max_open_seconds))
+            elif self._state == CLOSED and self._failure_rate(now) >= self.failure_rate:
+                self._open(now, self._cooldown)
+
+    def _failure_rate(self, now: float) -> float:
+        while self._window and now - self._window[0][0] > self.window_seconds:
+            self._window.popleft()
+        if len(self._window) < self.min_calls:
+            return 0.0
+        failures = sum(1 for _, ok in self._window if not ok)
+        return failures / len(self._window)
+
+    def _open(self, now: float, seconds: float) -> None:
+        self._state = OPEN
+        self._opened_until = max(self._opened_until, now + seconds)
+        self._opens += 1
+        self._window.clear()
+
+    def reset(self) -> None:
+        """Volta ao estado inicial (usado em testes)."""
+        with self._lock:
+            self._window.clear()
+            self._state = CLOSED
+            self._opened_until = 0.0
+            self._cooldown = self.open_seconds
+            self._probe_in_flight = False
+            self._opens = 0
+            self._rejected = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Retorna o estado e os contadores do circuito."""
+        with self._lock:
+            now = time.monotonic()
+            state = self._current_state(now)
+            return {
+                'state': state,
+                'failure_rate': round(self._failure_rate(now), 3),
+                'window_calls': len(self._window),
+                'retry_in': round(max(0.0, self._opened_until - now), 1) if state == OPEN else 0.0,
+                'opens': self._opens,
+                'rejected': self._rejected
+            }
@@ -0,0 +1,142 @@
+"""
+Requisições com hedge para reduzir a latência de cauda.
+
+Se uma chamada não responde até um percentil da latência recente, uma
+cópia é disparada e vale a primeira resposta bem-sucedida. A fração de
+chamadas com hedge é limitada para não gastar a cota da API.
+"""
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Deque, Dict, Optional
+
+
+class Hedger:
+    """Executa chamadas bloqueantes com hedge baseado em percentil de latência."""
+
+    def __init__(
+        self,
+        percentile: float = 0.95,
+        max_hedge_rate: float = 0.1,
+        min_samples: int = 20,
+        min_delay: float = 0.05,
+        window_size: int = 200,
+        max_workers: int = 10
+    ):
+        """
+        Inicializa o hedger.
+
+        Args:
+            percentile: Percentil (0-1) da latência recente após o qual o hedge é disparado
+            max_hedge_rate: Fração máxima de chamadas recentes com hedge
+            min_samples: Latências mínimas medidas antes de fazer hedge
+            min_delay: Espera mínima antes do hedge, em segundos
+            window_size: Número de chamadas consideradas nas estatísticas recentes
+            max_workers: Threads para as chamadas
+        """
+        self.percentile = percentile
+        self.max_hedge_rate = max_hedge_rate
+        self.min_samples = min_samples
+        self.min_delay = min_delay
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='hedge')
+        self._lock = threading.Lock()
+        self._latencies: Deque[float] = deque(maxlen=window_size)
+        self._recent_hedges: Deque[bool] = deque(maxlen=window_size)
+        self._requests = 0
+        self._hedged = 0
+        self._wins = 0
+
+    def hedge_delay(self) -> Optional[float]:
+        """Espera antes do hedge, ou None se ainda não há amostras suficientes."""
+        with self._lock:
+            if len(self._latencies) < self.min_samples:
+                return None
+            ordered = sorted(self._latencies)
+            idx = min(int(len(ordered) * self.percentile), len(ordered) - 1)
+            return max(ordered[idx], self.min_delay)
+
+    def _hedge_allowed(self) -> bool:
+        """Verifica se mais um hedge mantém a taxa recente abaixo do limite."""
+        with self._lock:
+            window = len(self._recent_hedges) + 1
+            return sum(self._recent_hedges) + 1 <= self.max_hedge_rate * window
+
+    def _note(self, hedged: bool) -> None:
+        with self._lock:
+            self._recent_hedges.append(hedged)
+            if hedged:
+                self._hedged += 1
+
+    def _submit(self, fn: Callable[[], Any]) -> Future:
+        """Agenda uma tentativa e registra a latência se ela tiver sucesso."""
+        started = time.monotonic()
+
+        def record(future: Future) -> None:
+            if not future.cancelled() and future.exception() is None:
+                with self._lock:
+                    self._latencies.append(time.monotonic() - started)
+
+        future = self._executor.submit(fn)
+        future.add_done_callback(record)
+        return future
+
+    def run(self, fn: Callable[[], Any], can_hedge: Callable[[], bool] = lambda: True) -> Any:
+        """
+        Executa `fn`, disparando uma cópia se a resposta demorar.
+
+        Args:
+            fn: Chamada sem argumentos (precisa ser segura para repetir)
+            can_hedge: Verificação extra antes de disparar a cópia (ex: cota)
+
+        Returns:
+            Resultado da primeira tentativa bem-sucedida
+
+        Raises:
+            A exceção da tentativa original, se todas falharem
+        """
+        delay = self.hedge_delay()
+        with self._lock:
+            self._requests += 1
+
+        primary = self._submit(fn)
+        if delay is not None:
+            done, _ = wait([primary], timeout=delay)
+        if delay is None or done or not self._hedge_allowed() or not can_hedge():
+            self._note(False)
+            return primary.result()
+
+        self._note(True)
+        hedge = self._submit(fn)
+        pending = {primary, hedge}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is hedge:
+                        with self._lock:
+                            self._wins += 1
+                    return future.result()
+        return primary.result()
+
+    def stats(self) -> Dict[str, Any]:
+        """Taxa de hedge, taxa de vitória do hedge e latências recentes."""
+        delay = self.hedge_delay()
+        with self._lock:
+            ordered = sorted(self._latencies)
+
+            def latency_ms(p: float) -> Optional[float]:
+                if not ordered:
+                    return None
+                return round(ordered[min(int(len(ordered) * p), len(ordered) - 1)] * 1000, 1)
+
+            return {
+                'requests': self._requests,
+                'hedged': self._hedged,
+                'hedge_rate': round(self._hedged / self._requests, 3) if self._requests else 0.0,
+                'hedge_wins': self._wins,
+                'win_rate': round(self._wins / self._hedged, 3) if self._hedged else 0.0,
+                'p50_ms': latency_ms(0.5),
+                'p99_ms': latency_ms(0.99),
+                'hedge_delay_ms': round(delay * 1000, 1) if delay is not None else None
+            }
@@ -0,0 +1,68 @@
+"""
+Versão compacta das mensagens do histórico enviada de volta à IA.
+
+As respostas salvas do assistente guardam o filme já enriquecido com os dados
+do TMDB (sinopse, pôster, gêneros...). Para o contexto da conversa a IA só
+precisa saber o que respondeu, então o histórico leva apenas título, ano e
+ID do TMDB, em JSON sem espaços.
+"""
+import json
+from typing import Any, Dict
+
+# Campos de cada título mantidos no histórico
+_TITLE_FIELDS = ('title', 'year')
+
+
+def _compact_title(item: Dict[str, Any]) -> Dict[str, Any]:
+    compact = {key: item[key] for key in _TITLE_FIELDS if item.get(key)}
+    if item.get('id'):
+        compact['tmdb_id'] = item['id']
+    if item.get('media_type') and item['media_type'] != 'movie':
+        compact['media_type'] = item['media_type']
+    return compact
+
+
+def compact_assistant_content(content: Any) -> Any:
+    """
+    Reduz uma resposta do assistente ao que importa para o contexto.
+
+    Args:
+        content: Resposta salva ({"type": ..., "content": ...})
+
+    Returns:
+        Resposta com os títulos reduzidos a título, ano e ID do TMDB
+    """
+    if not isinstance(content, dict):
+        return content
+    body = content.get('content')
+    if content.get('type') == 'movie' and isinstance(body, dict):
+        return {'type': 'movie', 'content': _compact_title(body)}
+    if content.get('type') == 'recommendations' and isinstance(body, list):
+        return {
+            'type': 'recommendations',
+            'content': [_compact_title(item) if isinstance(item, dict) else item for item in body]
+        }
+    return content
+
+
+def history_text(role: str, content: Any) -> str:
+    """
+    Texto de uma mensagem do histórico como vai para o prompt.
+
+    Args:
+        role: 'user' ou 'assistant'
+        content: Conteúdo da mensagem (respostas do assistente como dict ou string JSON)
+
+    Returns:
+        Texto da mensagem (respostas do assistente em JSON compacto)
+    """
+    if role != 'assistant':
+        return str(content)
+    if isinstance(content, str):
+        try:
+            content = json.loads(content)
+        except json.JSONDecodeError:
+            return content
+    if not isinstance(content, dict):
+        return str(content)
+    return json.dumps(compact_assistant_content(content), ensure_ascii=False, separators=(',', ':'))
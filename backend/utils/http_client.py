@@ -0,0 +1,111 @@
+"""
+Sessões HTTP compartilhadas com pool de conexões, keep-alive e retry.
+"""
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Status HTTP que disparam nova tentativa com backoff
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+# Espera máxima dentro de uma chamada quando o servidor envia Retry-After.
+# Esperas maiores ficam a cargo do circuit breaker, sem prender o worker.
+MAX_RETRY_AFTER_SLEEP = 2.0
+
+_sessions: Dict[str, requests.Session] = {}
+_sessions_lock = threading.Lock()
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Converte um cabeçalho Retry-After (segundos ou data HTTP) em segundos."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class _CappedRetry(Retry):
+    """Retry do urllib3 que limita a espera pedida via Retry-After."""
+
+    def get_retry_after(self, response) -> Optional[float]:
+        retry_after = super().get_retry_after(response)
+        if retry_after is None:
+            return None
+        return min(retry_after, MAX_RETRY_AFTER_SLEEP)
+
+
+def _build_session(pool_size: int, max_retries: int, backoff_factor: float) -> requests.Session:
+    """Cria uma sessão com adapter de pool e política de retry."""
+    retry = _CappedRetry(
+        total=max_retries,
+        connect=max_retries,
+        read=max_retries,
+        status=max_retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=RETRY_STATUS_CODES,
+        allowed_methods=frozenset(['GET', 'HEAD']),
+        respect_retry_after_header=True,
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(
+        pool_connections=pool_size,
+        pool_maxsize=pool_size,
+        max_retries=retry,
+        pool_block=False
+    )
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def get_pooled_session(
+    name: str,
+    pool_size: int = 10,
+    max_retries: int = 2,
+    backoff_factor: float = 0.3
+) -> requests.Session:
+    """
+    Retorna a sessão HTTP compartilhada identificada por `name`.
+
+    A sessão é criada na primeira chamada e reutilizada por todas as
+    instâncias do processo, mantendo as conexões abertas (keep-alive)
+    entre requisições. O pool do urllib3 é thread-safe.
+
+    Args:
+        name: Nome lógico da sessão (ex: 'tmdb')
+        pool_size: Conexões mantidas por host
+        max_retries: Número máximo de novas tentativas
+        backoff_factor: Fator de backoff exponencial entre tentativas
+
+    Returns:
+        Sessão requests configurada
+    """
+    session = _sessions.get(name)
+    if session is not None:
+        return session
+
+    with _sessions_lock:
+        session = _sessions.get(name)
+        if session is None:
+            session = _build_session(pool_size, max_retries, backoff_factor)
+            _sessions[name] = session
+        return session
+
+
+def close_pooled_sessions() -> None:
+    """Fecha todas as sessões compartilhadas (usado em testes e shutdown)."""
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
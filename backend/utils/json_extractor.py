@@ -0,0 +1,149 @@
+"""
+Extração do objeto JSON de uma resposta da IA, em uma única passada.
+
+A IA deveria responder só com JSON, mas às vezes envolve o objeto em
+blocos de código markdown ou em texto. O extrator percorre o texto uma vez,
+entende strings e escapes (chaves dentro de strings não contam), e
+decodifica o objeto de nível superior assim que ele fecha. Aceita o texto
+inteiro ou pedaços vindos de streaming.
+"""
+import json
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+# Caracteres que mudam o estado fora e dentro de strings
+_STRUCTURAL = re.compile(r'[{}"\\]')
+_IN_STRING = re.compile(r'["\\]')
+# Um objeto JSON começa com uma chave entre aspas ou é vazio; "{type: movie}" nem é decodificado
+_OBJECT_START = re.compile(r'\{\s*["}]')
+
+_decoder = json.JSONDecoder()
+
+
+class JSONExtractor:
+    """Extrator incremental do primeiro objeto JSON válido de um texto."""
+
+    def __init__(self):
+        self.result: Optional[Dict[str, Any]] = None
+        self.span: Optional[Tuple[int, int]] = None  # posição do objeto no texto recebido
+        self._parts: List[str] = []  # pedaços recebidos (juntados só quando o texto é pedido)
+        self._length = 0  # caracteres recebidos
+        self._start = -1  # início do objeto em andamento
+        self._candidate: List[str] = []  # texto do objeto em andamento, a partir de _start
+        self._depth = 0
+        self._in_string = False
+        self._skip_next = False  # o pedaço anterior terminou no meio de um escape
+
+    @property
+    def buffer(self) -> str:
+        """Texto recebido até agora."""
+        if len(self._parts) > 1:
+            self._parts = [''.join(self._parts)]
+        return self._parts[0] if self._parts else ''
+
+    @property
+    def done(self) -> bool:
+        """Indica se um objeto de nível superior completo já foi decodificado."""
+        return self.result is not None
+
+    def feed(self, chunk: str) -> Optional[Dict[str, Any]]:
+        """
+        Acrescenta um pedaço do texto.
+
+        Args:
+            chunk: Próximo trecho da resposta
+
+        Returns:
+            O objeto decodificado, quando ficar completo (e nas chamadas
+            seguintes); None enquanto ainda não houver objeto completo
+        """
+        if self.result is not None:
+            return self.result
+        offset = self._length
+        self._parts.append(chunk)
+        self._length += len(chunk)
+        self._scan(chunk, offset)
+        return self.result
+
+    def _scan(self, chunk: str, offset: int) -> None:
+        """Examina só o pedaço novo; o estado (profundidade, string, escape) vem dos anteriores."""
+        pos, length = 0, len(chunk)
+        if self._start >= 0:
+            self._candidate.append(chunk)
+        if self._skip_next and length:
+            pos, self._skip_next = 1, False
+        while pos < length:
+            if self._start < 0:
+                # Fora de um objeto: pula direto para a próxima chave de abertura
+                pos = chunk.find('{', pos)
+                if pos < 0:
+                    return
+                self._start, self._candidate = offset + pos, [chunk[pos:]]
+                self._depth, self._in_string = 1, False
+                pos += 1
+                continue
+
+            match = (_IN_STRING if self._in_string else _STRUCTURAL).search(chunk, pos)
+            if match is None:
+                return
+            pos = match.start()
+            char = chunk[pos]
+            if char == '\\':
+                # Escape no fim do pedaço: o caractere escapado vem no próximo
+                if pos + 1 >= length:
+                    self._skip_next = True
+                    return
+                pos += 2
+                continue
+            pos += 1
+            if char == '"':
+                self._in_string = not self._in_string
+            elif char == '{':
+                self._depth += 1
+            else:
+                self._depth -= 1
+                if self._depth == 0:
+                    if self._decode(offset + pos):
+                        return
+                    # Objeto malformado: descarta o candidato e segue daqui, sem voltar
+                    self._start, self._candidate = -1, []
+
+    def _decode(self, end: int) -> bool:
+        text = ''.join(self._candidate)[:end - self._start]
+        if not _OBJECT_START.match(text):
+            return False
+        try:
+            value = json.loads(text)
+        except json.JSONDecodeError:
+            return False
+        if not isinstance(value, dict):
+            return False
+        self.result = value
+        self.span = (self._start, end)
+        return True
+
+
+def extract_json(text: Optional[str]) -> Optional[Dict[str, Any]]:
+    """
+    Extrai e decodifica o primeiro objeto JSON válido de um texto.
+
+    Args:
+        text: Texto que pode conter JSON (com ou sem markdown em volta)
+
+    Returns:
+        Objeto decodificado ou None
+    """
+    if not text:
+        return None
+    # Caso comum: o texto a partir da primeira chave é um objeto válido, e o
+    # decodificador (em C) resolve tudo em uma passada
+    start = text.find('{')
+    if start < 0:
+        return None
+    try:
+        value, _ = _decoder.raw_decode(text, start)
+        if isinstance(value, dict):
+            return value
+    except json.JSONDecodeError:
+        pass
+    return JSONExtractor().feed(text)
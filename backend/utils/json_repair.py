@@ -0,0 +1,114 @@
+"""
+Conserto local (sem chamar a IA) de respostas com JSON quase válido.
+
+Corrige, em uma passada, os defeitos mais comuns das respostas da IA:
+texto antes do objeto, strings com aspas simples, vírgulas sobrando antes
+de `}` ou `]`, literais do Python (True, False, None), quebras de linha
+cruas dentro de strings e respostas truncadas (strings e chaves abertas).
+"""
+import json
+import re
+from typing import Any, Dict, List, Optional
+
+_LITERALS = {'True': 'true', 'False': 'false', 'None': 'null'}
+_WORD = re.compile(r'[^\W\d]\w*')
+
+# strict=False aceita caracteres de controle (quebras de linha) dentro de strings
+_lenient_decoder = json.JSONDecoder(strict=False)
+
+
+def repair_json(text: str) -> Optional[Dict[str, Any]]:
+    """
+    Tenta consertar e decodificar o objeto JSON de uma resposta.
+
+    Args:
+        text: Resposta da IA (JSON inválido, truncado ou com texto em volta)
+
+    Returns:
+        Objeto decodificado ou None se o texto não tiver conserto local
+    """
+    if not text:
+        return None
+    start = text.find('{')
+    if start < 0:
+        return None
+    try:
+        data, _ = _lenient_decoder.raw_decode(_fix(text[start:]))
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def _fix(text: str) -> str:
+    """Reescreve o primeiro objeto do texto como JSON estrito."""
+    out: List[str] = []
+    closers: List[str] = []
+    quote: Optional[str] = None  # delimitador da string em andamento
+    i, length = 0, len(text)
+    while i < length:
+        ch = text[i]
+        if quote:
+            if ch == '\\' and i + 1 < length:
+                escaped = text[i + 1]
+                out.append("'" if quote == "'" and escaped == "'" else ch + escaped)
+                i += 2
+                continue
+            if ch == quote:
+                out.append('"')
+                quote = None
+            elif ch == '"':
+                # Aspas duplas dentro de uma string com aspas simples
+                out.append('\\"')
+            else:
+                out.append(ch)
+            i += 1
+            continue
+
+        if ch in '"\'':
+            quote = ch
+            out.append('"')
+        elif ch in '{[':
+            closers.append('}' if ch == '{' else ']')
+            out.append(ch)
+        elif ch in '}]':
+            _drop_trailing_comma(out)
+            if closers:
+                closers.pop()
+            out.append(ch)
+            if not closers:
+                # Objeto de nível superior completo: o resto é texto em volta
+                return ''.join(out)
+        else:
+            # Palavra solta (inclusive com acentos): literal do Python ou texto sem aspas
+            word = _WORD.match(text, i)
+            if word:
+                out.append(_LITERALS.get(word.group(), word.group()))
+                i = word.end()
+                continue
+            out.append(ch)
+        i += 1
+
+    # Resposta truncada: fecha a string e as estruturas que ficaram abertas
+    if quote:
+        out.append('"')
+    _drop_trailing_comma(out)
+    if _last_token(out) == ':':
+        out.append('null')
+    out.extend(reversed(closers))
+    return ''.join(out)
+
+
+def _last_token(out: List[str]) -> Optional[str]:
+    for token in reversed(out):
+        if not token.isspace():
+            return token
+    return None
+
+
+def _drop_trailing_comma(out: List[str]) -> None:
+    """Remove uma vírgula sobrando no fim (ignorando espaços)."""
+    j = len(out) - 1
+    while j >= 0 and out[j].isspace():
+        j -= 1
+    if j >= 0 and out[j] == ',':
+        del out[j]
@@ -0,0 +1,164 @@
+"""
+Leitura incremental da resposta JSON da IA durante o streaming.
+
+A IA responde com `{"type": "...", "content": ...}`. Conforme os pedaços
+chegam, o parser descobre o tipo da resposta e, para respostas do tipo
+"text", devolve o texto de `content` já decodificado, pedaço a pedaço.
+Para respostas do tipo "movie", expõe título e ano assim que são emitidos.
+"""
+import json
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from utils.json_extractor import JSONExtractor
+
+_TYPE_PATTERN = re.compile(r'"type"\s*:\s*"(\w+)"')
+_TEXT_CONTENT_PATTERN = re.compile(r'"content"\s*:\s*"')
+_OBJECT_CONTENT_PATTERN = re.compile(r'"content"\s*:\s*\{')
+_TITLE_PATTERN = re.compile(r'"title"\s*:\s*"((?:[^"\\]|\\.)*)"')
+_YEAR_PATTERN = re.compile(r'"year"\s*:\s*"?(\d{4})')
+
+_ESCAPES = {'"': '"', '\\': '\\', '/': '/', 'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t'}
+
+# Tamanho máximo do trecho ainda não consumido em que as chaves são procuradas
+_WINDOW_LIMIT = 4096
+
+
+class AIResponseStream:
+    """Parser incremental da resposta da IA."""
+
+    def __init__(self):
+        self._parts: List[str] = []
+        self._window = ''  # texto recebido e ainda não consumido pelo parser
+        self._pending: List[str] = []  # texto de content decodificado antes de o tipo aparecer
+        self._in_content = False
+        self._content_done = False
+        self._settled = False
+        self.response_type: Optional[str] = None
+        self.movie_hint: Optional[Tuple[str, Optional[str]]] = None
+        self._extractor = JSONExtractor()
+
+    @property
+    def buffer(self) -> str:
+        """Resposta completa recebida até agora."""
+        if len(self._parts) > 1:
+            self._parts = [''.join(self._parts)]
+        return self._parts[0] if self._parts else ''
+
+    @property
+    def result(self) -> Optional[Dict[str, Any]]:
+        """Objeto da resposta já decodificado, quando estiver completo."""
+        return self._extractor.result
+
+    def feed(self, chunk: str) -> str:
+        """
+        Acrescenta um pedaço da resposta.
+
+        Cada pedaço é examinado uma vez: o texto de content é consumido conforme
+        é decodificado e as chaves só são procuradas no trecho que sobra.
+
+        Args:
+            chunk: Texto recebido da IA
+
+        Returns:
+            Novo trecho do texto de `content` (vazio se não houver)
+        """
+        self._parts.append(chunk)
+        self._extractor.feed(chunk)
+        if self._settled:
+            return ''
+        self._window += chunk
+
+        if self.response_type is None:
+            match = _TYPE_PATTERN.search(self._window)
+            if match:
+                self.response_type = match.group(1)
+        if self.response_type == 'movie' and self.movie_hint is None:
+            self.movie_hint = self._parse_movie_hint()
+
+        if not self._in_content and not self._content_done and self.response_type in (None, 'text'):
+            match = _TEXT_CONTENT_PATTERN.search(self._window)
+            if match:
+                self._in_content = True
+                self._window = self._window[match.end():]
+        if self._in_content:
+            self._pending.append(self._decode_content())
+
+        self._settle()
+        if self.response_type != 'text':
+            if self.response_type is not None:
+                self._pending = []
+            return ''
+        text, self._pending = ''.join(self._pending), []
+        return text
+
+    def _settle(self) -> None:
+        """Para de examinar os pedaços quando não há mais nada a extrair."""
+        if self.response_type == 'text':
+            self._settled = self._content_done
+        elif self.response_type == 'movie':
+            # Sem título nos primeiros _WINDOW_LIMIT caracteres: desiste da dica
+            self._settled = self.movie_hint is not None or len(self._window) > _WINDOW_LIMIT
+        elif self.response_type is not None:
+            self._settled = True
+        if self._settled:
+            self._window = ''
+        elif not self._in_content and len(self._window) > _WINDOW_LIMIT:
+            # Tipo ainda desconhecido: basta o fim do trecho para achar as chaves
+            self._window = self._window[-_WINDOW_LIMIT:]
+
+    def _parse_movie_hint(self) -> Optional[Tuple[str, Optional[str]]]:
+        """
+        Extrai (título, ano) do content de uma resposta "movie".
+
+        Só retorna quando o título está completo e o ano já foi emitido ou o
+        objeto de content terminou sem ele.
+        """
+        content = _OBJECT_CONTENT_PATTERN.search(self._window)
+        if not content:
+            return None
+        body = self._window[content.end():]
+        title = _TITLE_PATTERN.search(body)
+        if not title:
+            return None
+        year = _YEAR_PATTERN.search(body)
+        if not year and '}' not in body[title.end():]:
+            return None
+        try:
+            title_text = json.loads(f'"{title.group(1)}"')
+        except json.JSONDecodeError:
+            return None
+        return title_text, year.group(1) if year else None
+
+    def _decode_content(self) -> str:
+        """Decodifica a string de content até onde o trecho recebido permite."""
+        text: List[str] = []
+        pos, window = 0, self._window
+        while pos < len(window):
+            ch = window[pos]
+            if ch == '"':
+                self._content_done = True
+                self._in_content = False
+                pos += 1
+                break
+            if ch != '\\':
+                text.append(ch)
+                pos += 1
+                continue
+            # Escape incompleto: espera o próximo pedaço
+            if pos + 1 >= len(window):
+                break
+            code = window[pos + 1]
+            if code == 'u':
+                if pos + 6 > len(window):
+                    break
+                try:
+                    text.append(json.loads(f'"{window[pos:pos + 6]}"'))
+                except json.JSONDecodeError:
+                    text.append(window[pos:pos + 6])
+                pos += 6
+            else:
+                text.append(_ESCAPES.get(code, code))
+                pos += 2
+        self._window = window[pos:]
+        return ''.join(text)
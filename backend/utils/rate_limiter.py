@@ -0,0 +1,199 @@
+"""
+Token bucket compartilhado entre os processos de um mesmo host.
+
+O estado do balde (tokens disponíveis e instante da última recarga) fica em
+um arquivo pequeno protegido por `fcntl.flock`, de modo que todos os workers
+do host dividem a mesma cota da API. Sem `fcntl` (Windows), o balde vale
+apenas para o processo atual.
+
+Chamadas em segundo plano só consomem tokens acima de uma reserva, que fica
+disponível para as chamadas do chat.
+"""
+import asyncio
+import contextvars
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, Optional
+
+if sys.platform == 'win32':  # pragma: no cover - Windows
+    fcntl = None
+else:
+    import fcntl
+
+PRIORITY_CHAT = 'chat'
+PRIORITY_BACKGROUND = 'background'
+
+# Prioridade das chamadas feitas no contexto atual (thread ou task)
+_priority: contextvars.ContextVar = contextvars.ContextVar('rate_limit_priority', default=PRIORITY_CHAT)
+
+
+@contextmanager
+def background_priority() -> Iterator[None]:
+    """Marca as chamadas feitas dentro do bloco como de segundo plano."""
+    token = _priority.set(PRIORITY_BACKGROUND)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def current_priority() -> str:
+    """Prioridade das chamadas no contexto atual."""
+    return _priority.get()
+
+
+class HostTokenBucket:
+    """Token bucket com estado em arquivo, compartilhado pelos processos do host."""
+
+    def __init__(self, path: str, rate: float, burst: int, background_reserve: int = 0):
+        """
+        Inicializa o balde.
+
+        Args:
+            path: Arquivo de estado compartilhado
+            rate: Tokens recarregados por segundo
+            burst: Capacidade máxima do balde
+            background_reserve: Tokens que chamadas em segundo plano não podem usar
+        """
+        self.path = str(path)
+        self.rate = rate
+        self.burst = burst
+        self.background_reserve = min(background_reserve, max(burst - 1, 0))
+        self._lock = threading.Lock()
+        self._fd: Optional[int] = None
+        self._pid: Optional[int] = None
+        self._local_state = (float(burst), time.time())
+        self._stats = {
+            priority: {'acquired': 0, 'queued': 0, 'timeouts': 0, 'wait_ms_total': 0.0, 'wait_ms_max': 0.0}
+            for priority in (PRIORITY_CHAT, PRIORITY_BACKGROUND)
+        }
+
+    def _file(self) -> int:
+        """Descritor do arquivo de estado (reaberto após fork)."""
+        if self._fd is None or self._pid != os.getpid():
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            self._pid = os.getpid()
+        return self._fd
+
+    def _read_state(self, fd: int) -> tuple:
+        try:
+            tokens, updated_at = os.pread(fd, 64, 0).decode().split()
+            return float(tokens), float(updated_at)
+        except ValueError:
+            return float(self.burst), time.time()
+
+    def _write_state(self, fd: int, tokens: float, updated_at: float) -> None:
+        data = f"{tokens:.6f} {updated_at:.6f}".encode()
+        os.pwrite(fd, data, 0)
+        os.ftruncate(fd, len(data))
+
+    def try_acquire(self, priority: str = PRIORITY_CHAT) -> float:
+        """
+        Tenta retirar um token sem esperar.
+
+        Returns:
+            0 se o token foi retirado, senão os segundos estimados até haver um
+        """
+        needed = 1 + (self.background_reserve if priority == PRIORITY_BACKGROUND else 0)
+        with self._lock:
+            fd = self._file() if fcntl else None
+            if fd is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                tokens, updated_at = self._read_state(fd) if fd is not None else self._local_state
+                now = time.time()
+                tokens = min(float(self.burst), tokens + max(0.0, now - updated_at) * self.rate)
+                wait = 0.0
+                if tokens >= needed:
+                    tokens -= 1
+                else:
+                    wait = (needed - tokens) / self.rate
+                if fd is not None:
+                    self._write_state(fd, tokens, now)
+                else:
+                    self._local_state = (tokens, now)
+                return wait
+            finally:
+                if fd is not None:
+                    fcntl.flock(fd, fcntl.LOCK_UN)
+
+    def acquire(self, priority: str = PRIORITY_CHAT, max_wait: float = 2.0) -> bool:
+        """
+        Retira um token, esperando na fila até `max_wait` segundos.
+
+        Returns:
+            True se conseguiu o token, False se o tempo de espera acabou
+        """
+        started = time.monotonic()
+        while True:
+            wait = self.try_acquire(priority)
+            elapsed = time.monotonic() - started
+            if not wait:
+                self._record(priority, elapsed)
+                return True
+            if elapsed + wait > max_wait:
+                self._record(priority, elapsed, timed_out=True)
+                return False
+            time.sleep(wait)
+
+    async def acquire_async(self, priority: str = PRIORITY_CHAT, max_wait: float = 2.0) -> bool:
+        """Versão assíncrona de `acquire` (espera com asyncio.sleep)."""
+        started = time.monotonic()
+        while True:
+            wait = self.try_acquire(priority)
+            elapsed = time.monotonic() - started
+            if not wait:
+                self._record(priority, elapsed)
+                return True
+            if elapsed + wait > max_wait:
+                self._record(priority, elapsed, timed_out=True)
+                return False
+            await asyncio.sleep(wait)
+
+    def _record(self, priority: str, waited: float, timed_out: bool = False) -> None:
+        waited_ms = waited * 1000
+        with self._lock:
+            stats = self._stats[priority]
+            if timed_out:
+                stats['timeouts'] += 1
+                return
+            stats['acquired'] += 1
+            if waited_ms >= 1:
+                stats['queued'] += 1
+            stats['wait_ms_total'] += waited_ms
+            stats['wait_ms_max'] = max(stats['wait_ms_max'], waited_ms)
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Contadores de uso e tempo de espera na fila, por prioridade (deste processo)."""
+        with self._lock:
+            result = {}
+            for priority, stats in self._stats.items():
+                acquired = stats['acquired']
+                result[priority] = {
+                    'acquired': acquired,
+                    'queued': stats['queued'],
+                    'timeouts': stats['timeouts'],
+                    'avg_wait_ms': round(stats['wait_ms_total'] / acquired, 2) if acquired else 0.0,
+                    'max_wait_ms': round(stats['wait_ms_max'], 2)
+                }
+            return result
+
+
+_buckets: Dict[str, HostTokenBucket] = {}
+_buckets_lock = threading.Lock()
+
+
+def get_token_bucket(path: str, rate: float, burst: int, background_reserve: int = 0) -> HostTokenBucket:
+    """Retorna o balde do processo para o arquivo `path` (criado na primeira chamada)."""
+    path = str(path)
+    with _buckets_lock:
+        bucket = _buckets.get(path)
+        if bucket is None:
+            bucket = HostTokenBucket(path, rate, burst, background_reserve)
+            _buckets[path] = bucket
+        return bucket
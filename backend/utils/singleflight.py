@@ -0,0 +1,79 @@
+"""
+Coalescência de chamadas idênticas concorrentes (single-flight).
+
+Enquanto uma chamada para uma chave está em andamento, as demais chamadas
+com a mesma chave esperam por ela e recebem o mesmo resultado ou erro.
+"""
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class _Call:
+    """Chamada em andamento."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """Executa no máximo uma chamada por chave ao mesmo tempo."""
+
+    def __init__(self):
+        """Inicializa o grupo de chamadas."""
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self._executions = 0
+        self._coalesced = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """
+        Executa `fn` ou aguarda a execução já em andamento para `key`.
+
+        Args:
+            key: Chave que identifica chamadas equivalentes
+            fn: Função sem argumentos que faz o trabalho
+
+        Returns:
+            Resultado de `fn` (compartilhado entre os chamadores)
+
+        Raises:
+            A mesma exceção levantada por `fn`
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self._coalesced += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self._executions += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+    def stats(self) -> Dict[str, int]:
+        """Retorna os contadores de execuções e chamadas coalescidas."""
+        with self._lock:
+            return {
+                'executions': self._executions,
+                'coalesced': self._coalesced,
+                'in_flight': len(self._calls)
+            }
@@ -0,0 +1,152 @@
+"""
+Cache persistente em SQLite com TTL, janela de stale e limite LRU.
+
+O arquivo é compartilhado entre workers e sobrevive a reinícios.
+Cada thread usa sua própria conexão; o SQLite em modo WAL cuida da
+concorrência entre processos.
+"""
+import json
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Optional
+
+
+@dataclass
+class CacheEntry:
+    """Entrada lida do cache."""
+    value: Any
+    is_stale: bool = False
+
+
+class SQLiteCache:
+    """Cache chave/valor em disco, separado por namespace."""
+
+    def __init__(self, path: str, max_entries: int = 5000):
+        """
+        Inicializa o cache.
+
+        Args:
+            path: Caminho do arquivo SQLite
+            max_entries: Número máximo de entradas antes da remoção LRU
+        """
+        self.path = str(path)
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._writes = 0
+
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        conn = self._connection()
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS cache_entries (
+                namespace TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value TEXT NOT NULL,
+                expires_at REAL NOT NULL,
+                stale_until REAL NOT NULL,
+                last_access REAL NOT NULL,
+                PRIMARY KEY (namespace, key)
+            )
+            """
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS ix_cache_entries_last_access "
+            "ON cache_entries (last_access)"
+        )
+
+    def _connection(self) -> sqlite3.Connection:
+        """Retorna a conexão da thread atual."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, namespace: str, key: str) -> Optional[CacheEntry]:
+        """
+        Busca uma entrada.
+
+        Returns:
+            CacheEntry (com `is_stale=True` se expirada mas dentro da janela
+            de stale) ou None se ausente ou totalmente expirada
+        """
+        now = time.time()
+        try:
+            conn = self._connection()
+            row = conn.execute(
+                "SELECT value, expires_at, stale_until FROM cache_entries "
+                "WHERE namespace = ? AND key = ?",
+                (namespace, key)
+            ).fetchone()
+            if row is None:
+                return None
+
+            value, expires_at, stale_until = row
+            if now > stale_until:
+                conn.execute(
+                    "DELETE FROM cache_entries WHERE namespace = ? AND key = ?",
+                    (namespace, key)
+                )
+                return None
+
+            conn.execute(
+                "UPDATE cache_entries SET last_access = ? WHERE namespace = ? AND key = ?",
+                (now, namespace, key)
+            )
+            return CacheEntry(value=json.loads(value), is_stale=now > expires_at)
+        except sqlite3.Error as e:
+            print(f"⚠️ Falha ao ler cache ({namespace}): {e}")
+            return None
+
+    def set(self, namespace: str, key: str, value: Any, ttl: float, stale_ttl: float = 0) -> None:
+        """
+        Grava uma entrada.
+
+        Args:
+            namespace: Agrupamento lógico (ex: 'tmdb:search')
+            key: Chave dentro do namespace
+            value: Valor serializável em JSON
+            ttl: Segundos em que a entrada é considerada fresca
+            stale_ttl: Segundos extras em que pode ser servida como stale
+        """
+        now = time.time()
+        try:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO cache_entries "
+                "(namespace, key, value, expires_at, stale_until, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (namespace, key, json.dumps(value), now + ttl, now + ttl + stale_ttl, now)
+            )
+            self._writes += 1
+            self._evict(conn, purge_expired=self._writes % 100 == 0)
+        except sqlite3.Error as e:
+            print(f"⚠️ Falha ao gravar cache ({namespace}): {e}")
+
+    def delete(self, namespace: str, key: str) -> None:
+        """Remove uma entrada."""
+        try:
+            self._connection().execute(
+                "DELETE FROM cache_entries WHERE namespace = ? AND key = ?",
+                (namespace, key)
+            )
+        except sqlite3.Error as e:
+            print(f"⚠️ Falha ao remover do cache ({namespace}): {e}")
+
+    def _evict(self, conn: sqlite3.Connection, purge_expired: bool = False) -> None:
+        """Remove as entradas menos usadas recentemente acima do limite."""
+        if purge_expired:
+            conn.execute("DELETE FROM cache_entries WHERE stale_until < ?", (time.time(),))
+        (count,) = conn.execute("SELECT COUNT(*) FROM cache_entries").fetchone()
+        overflow = count - self.max_entries
+        if overflow > 0:
+            conn.execute(
+                "DELETE FROM cache_entries WHERE rowid IN ("
+                "SELECT rowid FROM cache_entries ORDER BY last_access ASC LIMIT ?)",
+                (overflow,)
+            )
@@ -0,0 +1,61 @@
+"""
+Funções auxiliares para normalização de texto.
+"""
+import re
+import unicodedata
+from typing import List, Set
+
+# Separadores: tudo que não é letra ou dígito, em qualquer alfabeto
+_NON_WORD = re.compile(r'[\W_]+')
+
+# Artigos iniciais ignorados na comparação ("The Matrix" == "Matrix").
+# Só inglês e português: em outras línguas a mesma palavra pode fazer parte
+# do título ("Die Hard", "Le Mans", "Das Boot")
+LEADING_ARTICLES = {
+    'the', 'a', 'an',  # inglês
+    'o', 'os', 'as', 'um', 'uma',  # português
+}
+
+
+def strip_accents(text: str) -> str:
+    """
+    Remove acentos e diacríticos das letras latinas (ex: 'Ação' -> 'Acao').
+
+    Outros alfabetos ficam intactos ('が' não vira 'か', 'й' não vira 'и').
+    """
+    kept: List[str] = []
+    for ch in unicodedata.normalize('NFKD', text):
+        if unicodedata.combining(ch) and kept and kept[-1].isascii():
+            continue
+        kept.append(ch)
+    return unicodedata.normalize('NFC', ''.join(kept))
+
+
+def normalize_title(title: str, keep_article: bool = False) -> str:
+    """
+    Gera a forma canônica de um título para comparação.
+
+    Converte para minúsculas, remove acentos, troca pontuação por espaço e
+    descarta um artigo inicial (em inglês ou português). Letras de qualquer
+    alfabeto são mantidas ('君の名は', 'Паразиты'). Títulos só com símbolos
+    ficam com a forma crua em minúsculas, nunca com a string vazia.
+
+    Args:
+        title: Título como escrito pelo usuário, pela IA ou pelo TMDB
+        keep_article: Mantém o artigo inicial; usado nas chaves de cache,
+            para que títulos diferentes ('The Hard' e 'Hard') nunca se misturem
+
+    Returns:
+        Título normalizado (ex: 'O Poderoso Chefão' -> 'poderoso chefao')
+    """
+    text = strip_accents(title or '').casefold().replace('&', ' and ')
+    words = _NON_WORD.sub(' ', text).split()
+    if not keep_article and len(words) > 1 and words[0] in LEADING_ARTICLES:
+        words = words[1:]
+    return ' '.join(words) or ' '.join((title or '').casefold().split())
+
+
+def trigrams(text: str) -> Set[str]:
+    """Retorna os trigramas de um texto já normalizado (com padding nas bordas)."""
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
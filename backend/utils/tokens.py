@@ -0,0 +1,25 @@
+"""
+Estimativa do número de tokens de um texto.
+
+Heurística barata (sem tokenizador): cerca de 4 caracteres por token, o que
+é próximo do tokenizador do Llama para português e JSON. Suficiente para
+orçar o tamanho do prompt.
+"""
+import math
+from typing import Optional
+
+CHARS_PER_TOKEN = 4
+MESSAGE_TOKEN_OVERHEAD = 4  # tokens de formatação de cada mensagem (role, separadores)
+
+
+def estimate_tokens(text: Optional[str]) -> int:
+    """
+    Estima os tokens de uma mensagem, já incluindo a formatação do chat.
+
+    Args:
+        text: Conteúdo da mensagem
+
+    Returns:
+        Número estimado de tokens
+    """
+    return MESSAGE_TOKEN_OVERHEAD + math.ceil(len(text or '') / CHARS_PER_TOKEN)
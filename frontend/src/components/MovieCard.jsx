@@ -1,12 +1,29 @@
-import { useState } from 'react'
+import { useEffect, useState } from 'react'
 import { chatService } from '../services/chatService'
 import '../styles/MovieCard.css'
 
-function MovieCard({ movie }) {
+function MovieCard({ movie: initialMovie }) {
+  const [movie, setMovie] = useState(initialMovie)
   const [showRecommendations, setShowRecommendations] = useState(false)
   const [recommendations, setRecommendations] = useState([])
   const [loading, setLoading] = useState(false)
 
+  useEffect(() => {
+    setMovie(initialMovie)
+
+    // Busca os campos que o backend marcou como pendentes (modo rápido)
+    if (!initialMovie.pending_fields?.length) return
+    let cancelled = false
+    chatService.getMovieDetails(initialMovie.id, initialMovie.media_type || 'movie')
+      .then((response) => {
+        if (!cancelled && response.type === 'movie') {
+          setMovie({ ...initialMovie, ...response.content })
+        }
+      })
+      .catch((error) => console.error('Erro ao completar detalhes do filme:', error))
+    return () => { cancelled = true }
+  }, [initialMovie])
+
   const handleGetRecommendations = async () => {
     if (recommendations.length > 0) {
       setShowRecommendations(!showRecommendations)
@@ -38,16 +38,34 @@ function ChatPage() {
     setInput('')
     setLoading(true)
 
-    try {
-      const response = await chatService.sendMessage(input, file)
-      
-      const aiMessage = {
-        role: 'assistant',
-        ...response,
-        timestamp: new Date().toISOString()
-      }
+    // Atualiza a resposta em andamento (sempre a última mensagem)
+    const updateReply = (update) => {
+      setMessages(prev => {
+        const last = prev[prev.length - 1]
+        if (last?.streaming) {
+          return [...prev.slice(0, -1), { ...last, ...update(last) }]
+        }
+        return [...prev, {
+          role: 'assistant',
+          type: 'text',
+          content: '',
+          streaming: true,
+          timestamp: new Date().toISOString(),
+          ...update({ content: '' })
+        }]
+      })
+    }
 
-      setMessages(prev => [...prev, aiMessage])
+    try {
+      await chatService.sendMessageStream(input, file, (event, data) => {
+        if (event === 'delta') {
+          updateReply(last => ({ content: last.content + data.content }))
+        } else if (event === 'status') {
+          updateReply(() => ({ content: data.content }))
+        } else if (event === 'final' || event === 'error') {
+          updateReply(() => ({ ...data, streaming: false }))
+        }
+      })
       setFile(null)
       if (fileInputRef.current) {
         fileInputRef.current.value = ''
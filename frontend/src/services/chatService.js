@@ -1,5 +1,43 @@
 import api from './api'
 
+// Converte um bloco SSE ("event: ...\ndata: ...") em { event, data }
+const parseSSE = (block) => {
+  let event = 'message'
+  let data = ''
+  for (const line of block.split('\n')) {
+    if (line.startsWith('event:')) event = line.slice(6).trim()
+    else if (line.startsWith('data:')) data += line.slice(5).trim()
+  }
+  return { event, data: data ? JSON.parse(data) : null }
+}
+
+// Detalhes pedidos no mesmo ciclo (vários cards na tela) saem em uma só
+// requisição ao endpoint em lote (GET /movies), com até 50 IDs por vez
+const MOVIES_BATCH_MAX_IDS = 50
+let pendingDetails = []
+
+const flushPendingDetails = async () => {
+  const queued = pendingDetails
+  pendingDetails = []
+  for (let i = 0; i < queued.length; i += MOVIES_BATCH_MAX_IDS) {
+    const batch = queued.slice(i, i + MOVIES_BATCH_MAX_IDS)
+    const ids = [...new Set(batch.map(({ movieId, mediaType }) => `${mediaType}:${movieId}`))]
+    try {
+      const response = await chatService.getMoviesByIds(ids)
+      const results = new Map(
+        response.content.map((item) => [`${item.media_type}:${item.id}`, item])
+      )
+      for (const { movieId, mediaType, resolve, reject } of batch) {
+        const item = results.get(`${mediaType}:${movieId}`)
+        if (item?.content) resolve({ type: 'movie', content: item.content })
+        else reject(new Error(item?.error || 'Filme não encontrado'))
+      }
+    } catch (error) {
+      batch.forEach(({ reject }) => reject(error))
+    }
+  }
+}
+
 export const chatService = {
   sendMessage: async (message, file = null) => {
     const formData = new FormData()
@@ -16,11 +54,67 @@ export const chatService = {
     return response.data
   },
 
-  getMovieById: async (movieId) => {
-    const response = await api.get(`/movie/${movieId}`)
+  // Envia a mensagem e recebe a resposta em streaming (Server-Sent Events).
+  // onEvent(event, data) recebe 'delta', 'status', 'final' e 'error'.
+  sendMessageStream: async (message, file = null, onEvent = () => {}) => {
+    const formData = new FormData()
+    formData.append('message', message)
+    if (file) {
+      formData.append('file', file)
+    }
+
+    const response = await fetch(`${api.defaults.baseURL}/chat/stream`, {
+      method: 'POST',
+      body: formData,
+    })
+    if (!response.ok || !response.body) {
+      const data = await response.json().catch(() => null)
+      throw new Error(data?.content || 'Erro ao enviar mensagem')
+    }
+
+    const reader = response.body.getReader()
+    const decoder = new TextDecoder()
+    let buffer = ''
+    let result = null
+    while (true) {
+      const { value, done } = await reader.read()
+      if (done) break
+      buffer += decoder.decode(value, { stream: true })
+      const blocks = buffer.split('\n\n')
+      buffer = blocks.pop()
+      for (const block of blocks) {
+        const { event, data } = parseSSE(block)
+        onEvent(event, data)
+        if (event === 'final' || event === 'error') {
+          result = data
+        }
+      }
+    }
+    return result
+  },
+
+  getMovieById: async (movieId, mediaType = 'movie') => {
+    const response = await api.get(`/movie/${movieId}`, {
+      params: { media_type: mediaType },
+    })
+    return response.data
+  },
+
+  // movieIds aceita o prefixo de tipo (ex: ['603', 'tv:1399'])
+  getMoviesByIds: async (movieIds, mediaType = 'movie') => {
+    const response = await api.get('/movies', {
+      params: { ids: movieIds.join(','), media_type: mediaType },
+    })
     return response.data
   },
 
+  // Como getMovieById, mas agrupa os pedidos do mesmo ciclo em getMoviesByIds
+  getMovieDetails: (movieId, mediaType = 'movie') =>
+    new Promise((resolve, reject) => {
+      if (pendingDetails.length === 0) setTimeout(flushPendingDetails, 0)
+      pendingDetails.push({ movieId, mediaType, resolve, reject })
+    }),
+
   getRecommendations: async (movieId) => {
     const response = await api.get(`/recommendations/${movieId}`)
     return response.data